@@ -8,9 +8,13 @@
 Load environment variables from project.env for GitHub Actions.
 
 Writes variables to GITHUB_ENV and generates gcloud --set-env-vars string.
+With --settings-snapshot, also validates the app's Settings against exactly these variables
+and writes the frozen snapshot app/config.py loads at cold start (needs pydantic-settings).
 """
 
+import argparse
 import os
+import sys
 from pathlib import Path
 
 
@@ -78,8 +82,45 @@ def write_gcloud_env_to_output(env_vars: dict[str, str]) -> None:
         f.write("gcloud_vars_generated=true\n")
 
 
+def write_settings_snapshot(env_vars: dict[str, str], snapshot_path: Path) -> bool:
+    """
+    Validate Settings with only ``env_vars`` in the environment, as the deployed function
+    sees them, and write the snapshot. When validation fails any old snapshot is removed,
+    so the function validates at runtime instead of trusting stale values.
+    """
+    sys.path.insert(0, str(snapshot_path.resolve().parent))
+    try:
+        # pylint: disable=import-outside-toplevel
+        from settings_model import Settings
+        from settings_snapshot import build_snapshot, write_snapshot
+    except ImportError as e:
+        print(f"Warning: cannot build settings snapshot: {e}")
+        return False
+
+    saved = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env_vars)
+    try:
+        settings = Settings(_env_file=None)
+    except Exception as e:  # pylint: disable=W0718
+        print(f"Warning: settings do not validate, no snapshot written:\n{e}")
+        snapshot_path.unlink(missing_ok=True)
+        return False
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+    write_snapshot(build_snapshot(settings, env_vars), snapshot_path)
+    print(f"Wrote settings snapshot to {snapshot_path}.")
+    return True
+
+
 def main() -> None:
-    env_path = Path("project.env")
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("env_file", nargs="?", type=Path, default=Path("project.env"))
+    parser.add_argument("--settings-snapshot", type=Path, default=None, help="Write the validated settings snapshot here.")
+    args = parser.parse_args()
+    env_path = args.env_file
 
     try:
         env_vars = parse_env_file(env_path)
@@ -95,6 +136,8 @@ def main() -> None:
     write_to_github_env(env_vars)
     write_gcloud_env_to_output(env_vars)
     print(f"Processed {len(env_vars)} variables from {env_path}.")
+    if args.settings_snapshot:
+        write_settings_snapshot(env_vars, args.settings_snapshot)
 
 
 if __name__ == "__main__":
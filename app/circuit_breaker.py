@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: circuit_breaker.py
+
+Circuit breakers for outbound dependencies.
+
+One breaker per dependency ("bigquery", "gcs", "secretmanager", "discord") is shared by the
+whole instance. A breaker is closed while the dependency behaves. It records every call in a
+rolling window of ``window`` seconds. Once the window holds at least ``min_calls`` calls and
+``failure_rate`` of them failed, or ``slow_rate`` of them took ``slow_call_seconds`` or longer,
+it opens. While open, calls fail at once with CircuitOpenError instead of waiting out their
+timeouts. After ``open_seconds`` the breaker is half-open: ``half_open_calls`` probe calls
+go through. The breaker closes when they all succeed and opens again on the first failure.
+
+Only outages count as failures: timeouts, connection errors, HTTP 429 and 5xx. A 400 or
+404 is an answer from a healthy dependency. A call that timed out because the request
+deadline capped its timeout (see deadline) is not counted either way: the request ran out
+of time, not the dependency.
+
+with breaker("gcs").guard():
+    blob.download_to_filename(path)
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from loguru import logger as log
+
+import deadline
+from custom_exceptions import CircuitOpenError
+from metrics import counter, gauge
+from registry import Registry
+
+T = TypeVar("T")
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+BREAKER_STATE = gauge("circuit_breaker_state", "Breaker state: 0 closed, 1 half-open, 2 open.", ["breaker"])
+BREAKER_TRANSITIONS = counter("circuit_breaker_transitions", "Breaker state changes.", ["breaker", "state"])
+BREAKER_REJECTED = counter("circuit_breaker_rejected_calls", "Calls failed fast by an open breaker.", ["breaker"])
+
+# Exceptions from these packages without an HTTP status are transport failures.
+_TRANSPORT_MODULES = ("google.api_core", "google.auth", "requests", "urllib3", "httpx", "httpcore")
+
+
+def is_outage(error: BaseException) -> bool:
+    """True for errors that mean the dependency is unavailable rather than the call being wrong."""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "code", None)  # google.api_core.exceptions.GoogleAPICallError
+    if status is None and (response := getattr(error, "response", None)) is not None:
+        status = getattr(response, "status_code", None)  # httpx / requests
+    if isinstance(status, int):
+        return status == HTTPStatus.TOO_MANY_REQUESTS or status >= HTTPStatus.INTERNAL_SERVER_ERROR
+    return type(error).__module__.startswith(_TRANSPORT_MODULES)
+
+
+def is_timeout(error: BaseException) -> bool:
+    """True for client-side timeouts and 504s, in whatever form the client library raises them."""
+    if isinstance(error, TimeoutError):
+        return True
+    name = type(error).__name__
+    return type(error).__module__.startswith(_TRANSPORT_MODULES) and ("Timeout" in name or name == "DeadlineExceeded")
+
+
+class _Window:
+    """
+    Call, failure and slow-call counts over the last ``seconds``, in ``buckets`` slices.
+    """
+
+    __slots__ = ("width", "epochs", "counts")
+
+    def __init__(self, seconds: float, buckets: int) -> None:
+        self.width = seconds / buckets
+        self.epochs = [-1] * buckets
+        self.counts = [[0, 0, 0] for _ in range(buckets)]
+
+    def add(self, now: float, failed: bool, slow: bool) -> None:
+        epoch = int(now / self.width)
+        slot = epoch % len(self.epochs)
+        if self.epochs[slot] != epoch:
+            self.epochs[slot] = epoch
+            self.counts[slot] = [0, 0, 0]
+        counts = self.counts[slot]
+        counts[0] += 1
+        counts[1] += failed
+        counts[2] += slow
+
+    def totals(self, now: float) -> tuple[int, int, int]:
+        oldest = int(now / self.width) - len(self.epochs)
+        live = [counts for epoch, counts in zip(self.epochs, self.counts) if epoch > oldest]
+        return sum(c[0] for c in live), sum(c[1] for c in live), sum(c[2] for c in live)
+
+    def clear(self) -> None:
+        self.epochs = [-1] * len(self.epochs)
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker over a rolling error-rate and latency window.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        name: str,
+        failure_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_rate: float = 0.8,
+        window: float = 30.0,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1,
+        is_failure: Callable[[BaseException], bool] = is_outage,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        :param name: Dependency name, used in logs and metric labels.
+        :param failure_rate: Fraction of failed calls in the window that opens the breaker.
+        :param slow_call_seconds: Calls at least this long count as slow.
+        :param slow_rate: Fraction of slow calls in the window that opens the breaker.
+        :param window: Seconds of calls the rates are computed over.
+        :param min_calls: Calls the window needs before the rates are judged.
+        :param open_seconds: Seconds calls fail fast before probes are let through.
+        :param half_open_calls: Successful probes needed to close again.
+        :param is_failure: Which exceptions count as failures (default: outages only).
+        :param clock: Monotonic time source.
+        """
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate = slow_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.is_failure = is_failure
+        self.clock = clock
+        self.state = CLOSED
+        self._window = _Window(window, 10)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, breaker=name)
+
+    def _transition(self, state: str) -> None:
+        """Caller holds the lock."""
+        if state == self.state:
+            return
+        self.state = state
+        self._probes = self._probe_successes = 0
+        if state == OPEN:
+            self._opened_at = self.clock()
+        else:
+            self._window.clear()
+        BREAKER_STATE.set(_STATE_VALUES[state], breaker=self.name)
+        BREAKER_TRANSITIONS.inc(breaker=self.name, state=state)
+        if state == OPEN:
+            log.warning("Circuit {} open: failing calls fast for {}s.", self.name, self.open_seconds)
+        else:
+            log.info("Circuit {} {}.", self.name, state.replace("_", "-"))
+
+    def retry_after(self) -> float:
+        """Seconds until an open breaker lets a probe through; 0.0 otherwise."""
+        if self.state != OPEN:
+            return 0.0
+        return max(self._opened_at + self.open_seconds - self.clock(), 0.0)
+
+    def allow(self) -> None:
+        """
+        Admit one call, which must be followed by record().
+
+        :raises CircuitOpenError: While open, or half-open with every probe slot taken.
+        """
+        with self._lock:
+            if self.state == OPEN and self.clock() >= self._opened_at + self.open_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return
+            retry_after = max(self._opened_at + self.open_seconds - self.clock(), 0.0)
+        BREAKER_REJECTED.inc(breaker=self.name)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record(self, elapsed: float, error: Optional[BaseException] = None) -> None:
+        """
+        Record the outcome of a call admitted by allow().
+
+        :param elapsed: Call duration in seconds.
+        :param error: The exception the call raised, if any.
+        """
+        failed = error is not None and self.is_failure(error)
+        slow = elapsed >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._transition(CLOSED)
+                return
+            if self.state == OPEN:
+                return  # admitted before the breaker opened
+            now = self.clock()
+            self._window.add(now, failed, slow)
+            calls, failures, slow_calls = self._window.totals(now)
+            if calls >= self.min_calls and (
+                failures >= self.failure_rate * calls or slow_calls >= self.slow_rate * calls
+            ):
+                self._transition(OPEN)
+
+    def abandon(self) -> None:
+        """Give back a call admitted by allow() without judging its outcome."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    @contextmanager
+    def guard(self, timeout: Optional[float] = None) -> Iterator[None]:
+        """
+        Run the block as one call: fail fast while open, record its outcome otherwise.
+        Works around awaits too, as the breaker is shared across threads and loops.
+
+        :param timeout: The timeout given to the call. When the request deadline left no
+                        more than that, a timeout of the call is not recorded.
+        :raises CircuitOpenError: Without running the block.
+        """
+        self.allow()
+        budget = deadline.budget()
+        start = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            if timeout is not None and budget <= timeout and is_timeout(e):
+                self.abandon()
+            else:
+                self.record(time.monotonic() - start, e)
+            raise
+        self.record(time.monotonic() - start)
+
+    def call(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """``func(*args, **kwargs)`` inside guard(), with its ``timeout`` keyword if any."""
+        with self.guard(kwargs.get("timeout")):
+            return func(*args, **kwargs)
+
+    def reset(self) -> None:
+        """Close and forget the window (tests, manual recovery)."""
+        with self._lock:
+            self._transition(CLOSED)
+            self._window.clear()
+
+
+def _apply(existing: CircuitBreaker, options: dict[str, Any]) -> None:
+    for key, value in options.items():
+        if key == "window":
+            existing._window = _Window(value, 10)  # pylint: disable=protected-access
+        else:
+            setattr(existing, key, value)
+
+
+_breakers: Registry[CircuitBreaker] = Registry(CircuitBreaker, _apply)
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """The instance-wide breaker of dependency ``name``, created on first use."""
+    return _breakers.get(name)
+
+
+def configure(**options: Any) -> None:
+    """
+    Sets CircuitBreaker options for every breaker (e.g. from settings at startup).
+
+    :param options: CircuitBreaker keyword arguments except ``name``.
+    :raises TypeError: If an option is not a CircuitBreaker argument.
+    """
+    _breakers.configure(**options)
+
+
+def reset_all() -> None:
+    """Close every breaker."""
+    for existing in _breakers:
+        existing.reset()
@@ -0,0 +1,61 @@
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: cloud_tools/__init__.py
+
+Managers are exposed as lazy module attributes: ``import cloud_tools`` is free,
+and each google-cloud SDK is only imported the first time one of its names is used.
+"""
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .google_bigquerymanager import BigQueryManager, batch_generator
+    from .google_bucketmanager import BucketManager, validate_bucket_name
+    from .google_secretmanager import get_secret, get_secret_env, prefetch_secrets
+    from .row_schema import ColumnBatch, RowSchema
+
+_LAZY_ATTRIBUTES: dict[str, str] = {
+    "BigQueryManager": ".google_bigquerymanager",
+    "batch_generator": ".google_bigquerymanager",
+    "BucketManager": ".google_bucketmanager",
+    "validate_bucket_name": ".google_bucketmanager",
+    "get_secret": ".google_secretmanager",
+    "get_secret_env": ".google_secretmanager",
+    "prefetch_secrets": ".google_secretmanager",
+    "RowSchema": ".row_schema",
+    "ColumnBatch": ".row_schema",
+}
+
+__all__ = [
+    "BigQueryManager",
+    "batch_generator",
+    "BucketManager",
+    "validate_bucket_name",
+    "get_secret",
+    "get_secret_env",
+    "prefetch_secrets",
+    "RowSchema",
+    "ColumnBatch",
+]
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Imports the submodule owning ``name`` on first access and caches the attribute.
+
+    :param name: Attribute requested from the package.
+    :return: The resolved attribute.
+    """
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
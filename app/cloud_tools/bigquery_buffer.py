@@ -0,0 +1,306 @@
+"""
+Write-behind buffer for BigQuery streaming inserts.
+
+Requests that insert a handful of rows each hand them to the instance-wide WriteBuffer
+instead of making their own insertAll round trip. Rows are collected per table and sent
+as one batch when the table reaches ``max_rows`` / ``max_batch_bytes``, when its oldest
+row is ``max_age`` seconds old, or on shutdown. ``max_buffered_bytes`` bounds the memory
+held by pending and in-flight rows; writers wait (backpressure) once it is reached.
+
+Rows are acknowledged before they reach BigQuery. Flush failures are logged and counted
+and, with a DeadLetterSink, kept in GCS; they are not reported back to the writer. While
+the BigQuery circuit breaker is open, rows that could not be sent stay buffered until it
+lets calls through again; writers wait once the buffer is full.
+
+await write_buffer().add("project.dataset.table", rows)      # from any event loop
+write_buffer().write("project.dataset.table", rows)          # from a request thread
+
+author: github.com/defmon3
+"""
+
+import asyncio
+import contextvars
+from dataclasses import dataclass, field
+from typing import Any, Coroutine, Iterable, Optional
+
+from loguru import logger as log
+
+import serialization
+from custom_exceptions import CircuitOpenError
+from memory_watchdog import watchdog
+from metrics import counter, gauge, histogram
+from timing import span
+
+FLUSHES = counter("bigquery_buffer_flushes", "Write-behind flushes by trigger.", ["table", "reason"])
+FLUSHED_ROWS = counter("bigquery_buffer_flushed_rows", "Rows sent by write-behind flushes.", ["table"])
+FLUSH_FAILED_ROWS = counter("bigquery_buffer_failed_rows", "Buffered rows that could not be inserted.", ["table"])
+FLUSH_SECONDS = histogram("bigquery_buffer_flush_seconds", "Duration of one write-behind flush.")
+BUFFERED_ROWS = gauge("bigquery_buffer_rows", "Rows waiting in the write-behind buffer.", ["table"])
+BUFFERED_BYTES = gauge("bigquery_buffer_bytes", "Encoded bytes held by the write-behind buffer, in flight included.")
+DEFERRED_ROWS = counter("bigquery_buffer_deferred_rows", "Rows kept buffered because BigQuery's circuit was open.", ["table"])
+BACKPRESSURE_WAITS = counter("bigquery_buffer_backpressure_waits", "add() calls that waited for buffer space.")
+
+
+@dataclass
+class _Pending:
+    rows: list[tuple[dict[str, Any], int]] = field(default_factory=list)
+    bytes: int = 0
+    since: float = 0.0
+
+
+class WriteBuffer:
+    """
+    Per-table row buffer flushed by size, age or shutdown from the event loop it is used on.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        max_rows: int = 500,
+        max_batch_bytes: int = 5 * 1024 * 1024,
+        max_age: float = 1.0,
+        max_buffered_bytes: int = 64 * 1024 * 1024,
+        max_in_flight: int = 4,
+        manager: Optional[Any] = None,
+        retry: Optional[Any] = None,
+        dead_letter: Optional[Any] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        """
+        :param max_rows: Rows per table that trigger a flush, and rows per insertAll call.
+        :param max_batch_bytes: Encoded bytes per table that trigger a flush, and per insertAll call.
+        :param max_age: Seconds the oldest row of a table may wait.
+        :param max_buffered_bytes: Memory bound for pending plus in-flight rows.
+        :param max_in_flight: Concurrent flushes.
+        :param manager: BigQueryManager used to flush. Built on first flush when omitted.
+        :param retry: RetryPolicy passed to insert_to_bq.
+        :param dead_letter: DeadLetterSink passed to insert_to_bq.
+        :param loop: Long-lived loop the buffer runs on; add() calls made on other loops are
+                     forwarded to it. Without it the buffer runs on whichever loop uses it.
+        """
+        self.max_rows = max_rows
+        self.max_batch_bytes = max_batch_bytes
+        self.max_age = max_age
+        self.max_buffered_bytes = max_buffered_bytes
+        self.max_in_flight = max_in_flight
+        self.manager = manager
+        self.retry = retry
+        self.dead_letter = dead_letter
+        self.loop = loop
+        self.buffered_bytes = 0
+        self._tables: dict[str, _Pending] = {}
+        self._flushing: set[asyncio.Task] = set()
+        self._timer: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._closing = False
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(len(pending.rows) for pending in self._tables.values())
+
+    async def add(self, table_name: str, rows: Iterable[dict[str, Any]]) -> None:
+        """
+        Queue rows for ``table_name``. Returns as soon as they are buffered; waits only while
+        the buffer holds ``max_buffered_bytes``.
+
+        :param table_name: Fully qualified table.
+        :param rows: JSON-ready dicts.
+        """
+        if self.loop is not None and asyncio.get_running_loop() is not self.loop:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.add(table_name, list(rows)), self.loop))
+            return
+        dumps = serialization.dumps
+        sized = [(row, len(dumps(row)) + 1) for row in rows]
+        if not sized:
+            return
+        size = sum(row_size for _, row_size in sized)
+        space = self._space = self._space or asyncio.Condition()
+        # Under memory pressure the bound shrinks, so writers wait and flushes start sooner.
+        limit = watchdog.scaled(self.max_buffered_bytes, self.max_batch_bytes)
+        async with space:
+            if self.buffered_bytes and self.buffered_bytes + size > limit:
+                BACKPRESSURE_WAITS.inc()
+                log.debug("[{}] Write buffer full ({} bytes), waiting.", table_name, self.buffered_bytes)
+                while self.buffered_bytes and self.buffered_bytes + size > limit:
+                    if self._tables:
+                        self._start_flush(max(self._tables, key=lambda name: self._tables[name].bytes), "memory")
+                    await space.wait()
+
+            loop = asyncio.get_running_loop()
+            pending = self._tables.get(table_name)
+            if pending is None:
+                pending = self._tables[table_name] = _Pending(since=loop.time())
+            pending.rows.extend(sized)
+            pending.bytes += size
+            self.buffered_bytes += size
+        BUFFERED_ROWS.inc(len(sized), table=table_name)
+        BUFFERED_BYTES.inc(size)
+
+        if len(pending.rows) >= self.max_rows or pending.bytes >= self.max_batch_bytes:
+            self._start_flush(table_name, "size")
+        elif self._timer is None or self._timer.done():
+            self._wake = asyncio.Event()
+            self._timer = self._background(loop, self._flush_aged(), "bigquery-write-buffer")
+        else:
+            self._wake.set()  # type: ignore[union-attr]
+
+    def write(self, table_name: str, rows: Iterable[dict[str, Any]], timeout: Optional[float] = None) -> None:
+        """
+        add() from a thread outside the buffer's loop, blocking only while the buffer is full.
+
+        :param timeout: Seconds to wait for buffer space before TimeoutError.
+        """
+        if self.loop is None:
+            raise RuntimeError("write() needs a WriteBuffer bound to a loop; use write_buffer() or pass loop=.")
+        future = asyncio.run_coroutine_threadsafe(self.add(table_name, list(rows)), self.loop)
+        try:
+            future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    async def flush(self, reason: str = "manual") -> None:
+        """Sends every buffered row and waits for all flushes, including earlier ones."""
+        if self.loop is not None and asyncio.get_running_loop() is not self.loop:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(self.flush(reason), self.loop))
+            return
+        for table_name in list(self._tables):
+            self._start_flush(table_name, reason)
+        while self._flushing:
+            await asyncio.gather(*self._flushing)
+
+    async def close(self) -> None:
+        """Stops the age timer and flushes what is left (the shutdown hook)."""
+        self._closing = True
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        await self.flush("shutdown")
+
+    @staticmethod
+    def _background(loop: asyncio.AbstractEventLoop, coro: Coroutine[Any, Any, None], name: str) -> "asyncio.Task[None]":
+        # A fresh context: a flush outlives the request that triggered it and must not inherit
+        # its deadline (or its timer and trace), or it fails once that request's time is up.
+        return loop.create_task(coro, name=name, context=contextvars.Context())
+
+    def _start_flush(self, table_name: str, reason: str) -> None:
+        pending = self._tables.get(table_name)
+        if pending is None:
+            return
+        if pending.since > asyncio.get_running_loop().time() and not self._closing:
+            return  # deferred while the circuit is open; the age timer retries it
+        del self._tables[table_name]
+        BUFFERED_ROWS.dec(len(pending.rows), table=table_name)
+        FLUSHES.inc(table=table_name, reason=reason)
+        task = self._background(asyncio.get_running_loop(), self._flush(table_name, pending), "bigquery-write-flush")
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self, table_name: str, pending: _Pending) -> None:
+        # pylint: disable=import-outside-toplevel
+        from .google_bigquerymanager import BigQueryManager, sized_batches
+
+        loop = asyncio.get_running_loop()
+        slots = self._slots = self._slots or asyncio.Semaphore(self.max_in_flight)
+        sent = kept_bytes = 0
+        try:
+            async with slots:
+                if self.manager is None:
+                    self.manager = BigQueryManager()
+                start = loop.time()
+                with span("bigquery.buffer_flush"):
+                    for batch in sized_batches(pending.rows, self.max_rows, self.max_batch_bytes):
+                        errors = await self.manager.insert_to_bq(
+                            table_name, batch, batch_size=len(batch), retry=self.retry, dead_letter=self.dead_letter
+                        )
+                        sent += len(batch)
+                        FLUSHED_ROWS.inc(len(batch), table=table_name)
+                        if errors:
+                            FLUSH_FAILED_ROWS.inc(len(errors), table=table_name)
+                FLUSH_SECONDS.observe(loop.time() - start)
+        except CircuitOpenError as e:
+            if self._closing:
+                FLUSH_FAILED_ROWS.inc(len(pending.rows) - sent, table=table_name)
+                log.error("[{}] {} buffered rows lost at shutdown: {}", table_name, len(pending.rows) - sent, e)
+            else:
+                kept_bytes = self._defer(table_name, pending.rows[sent:], e.retry_after)
+        except Exception as e:  # pylint: disable=W0718
+            FLUSH_FAILED_ROWS.inc(len(pending.rows), table=table_name)
+            log.opt(exception=e).error("[{}] Write-behind flush of {} rows failed: {}", table_name, len(pending.rows), e)
+        finally:
+            space = self._space
+            assert space is not None
+            async with space:
+                self.buffered_bytes -= pending.bytes - kept_bytes
+                space.notify_all()
+            BUFFERED_BYTES.dec(pending.bytes - kept_bytes)
+
+    def _defer(self, table_name: str, rows: list[tuple[dict[str, Any], int]], retry_after: float) -> int:
+        """Puts unsent rows back in front of the table's queue, due when the circuit half-opens."""
+        loop = asyncio.get_running_loop()
+        size = sum(row_size for _, row_size in rows)
+        due = loop.time() + retry_after - self.max_age
+        pending = self._tables.get(table_name)
+        if pending is None:
+            pending = self._tables[table_name] = _Pending(since=due)
+        pending.rows[:0] = rows
+        pending.bytes += size
+        pending.since = due
+        BUFFERED_ROWS.inc(len(rows), table=table_name)
+        DEFERRED_ROWS.inc(len(rows), table=table_name)
+        log.warning("[{}] BigQuery circuit open, keeping {} rows buffered for {:.1f}s.", table_name, len(rows), retry_after)
+        if self._timer is None or self._timer.done():
+            self._wake = asyncio.Event()
+            self._timer = self._background(loop, self._flush_aged(), "bigquery-write-buffer")
+        else:
+            self._wake.set()  # type: ignore[union-attr]
+        return size
+
+    async def _flush_aged(self) -> None:
+        loop = asyncio.get_running_loop()
+        wake = self._wake
+        assert wake is not None
+        while self._tables:
+            wake.clear()
+            now = loop.time()
+            for table_name, pending in list(self._tables.items()):
+                if now - pending.since >= self.max_age:
+                    self._start_flush(table_name, "age")
+            if not self._tables:
+                break
+            delay = min(pending.since for pending in self._tables.values()) + self.max_age - loop.time()
+            try:
+                await asyncio.wait_for(wake.wait(), max(delay, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+
+_shared: Optional[WriteBuffer] = None
+_options: dict[str, Any] = {}
+
+
+def configure(**options: Any) -> None:
+    """
+    Sets WriteBuffer options for the instance-wide buffer (e.g. from settings at startup).
+
+    :param options: WriteBuffer keyword arguments.
+    """
+    _options.update(options)
+    if _shared is not None:
+        for name, value in options.items():
+            setattr(_shared, name, value)
+
+
+def write_buffer() -> WriteBuffer:
+    """
+    The instance-wide WriteBuffer, created on first use. It runs on the lifecycle loop, so it
+    outlives requests, and is flushed by a shutdown hook.
+    """
+    global _shared  # pylint: disable=global-statement  # noqa: PLW0603
+    if _shared is None:
+        from lifecycle import lifecycle  # pylint: disable=import-outside-toplevel
+
+        _shared = WriteBuffer(**_options, loop=lifecycle.get_loop())
+        lifecycle.on_shutdown(_shared.close)
+    return _shared
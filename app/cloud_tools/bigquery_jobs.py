@@ -0,0 +1,155 @@
+"""
+Non-blocking BigQuery job polling.
+
+``JobPoller`` tracks every outstanding job of one event loop and refreshes them from a
+single coroutine, a few ``jobs.get`` calls at a time, instead of parking one executor
+thread per job in ``job.result()``. Each job's poll interval grows with its age
+(``age * backoff_ratio``, clamped), so short queries finish with little delay while
+long-running jobs cost few requests.
+
+job = await shared_poller().wait(client.query(sql))
+
+author: github.com/defmon3
+"""
+
+import asyncio
+import contextvars
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from hedging import hedger
+from metrics import counter, gauge
+
+JOB_POLLS = counter("bigquery_job_polls", "jobs.get calls made by the job poller.")
+JOBS_IN_FLIGHT = gauge("bigquery_jobs_in_flight", "Jobs currently tracked by a job poller.")
+# jobs.get is idempotent; a slow status poll can be hedged (see hedging).
+POLL_HEDGER = hedger("bigquery.job_poll")
+
+
+@dataclass
+class _TrackedJob:
+    job: Any
+    future: asyncio.Future
+    started: float
+    next_poll: float = field(default=0.0)
+
+
+class JobPoller:
+    """
+    Polls all outstanding jobs of the running event loop from one background task.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.1,
+        max_interval: float = 5.0,
+        backoff_ratio: float = 0.25,
+        max_concurrent_polls: int = 4,
+    ) -> None:
+        """
+        :param min_interval: Shortest gap between two polls of the same job.
+        :param max_interval: Longest gap between two polls of the same job.
+        :param backoff_ratio: Poll interval as a fraction of the job's age.
+        :param max_concurrent_polls: jobs.get calls in flight at once (executor threads used).
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff_ratio = backoff_ratio
+        self.max_concurrent_polls = max_concurrent_polls
+        self._tracked: list[_TrackedJob] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+
+    @property
+    def outstanding(self) -> int:
+        return len(self._tracked)
+
+    async def wait(self, job: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Wait until ``job`` is done without holding a thread.
+
+        :param job: Any google.cloud.bigquery job (anything with ``done()``).
+        :param timeout: Seconds before TimeoutError; the job keeps running server-side.
+        :return: The finished job. Job failures are not raised here; ``job.result()`` raises them.
+        :raises Exception: Whatever ``job.done()`` raised (e.g. the job no longer exists).
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        tracked = _TrackedJob(job, loop.create_future(), started=now, next_poll=now)
+        self._tracked.append(tracked)
+        JOBS_IN_FLIGHT.inc()
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            # The poll task serves every later request too; keep the first one's deadline out of it.
+            self._task = loop.create_task(self._run(), name="bigquery-job-poller", context=contextvars.Context())
+        else:
+            self._wake.set()  # type: ignore[union-attr]
+        try:
+            return await asyncio.wait_for(tracked.future, timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Job {getattr(job, 'job_id', job)} not done after {timeout}s.") from None
+        finally:
+            self._untrack(tracked)
+
+    def _untrack(self, tracked: _TrackedJob) -> None:
+        if tracked in self._tracked:
+            self._tracked.remove(tracked)
+            JOBS_IN_FLIGHT.dec()
+
+    def _interval(self, age: float) -> float:
+        return min(self.max_interval, max(self.min_interval, age * self.backoff_ratio))
+
+    async def _poll(self, tracked: _TrackedJob, slots: asyncio.Semaphore) -> None:
+        loop = asyncio.get_running_loop()
+        async with slots:
+            if tracked.future.done():
+                return
+            try:
+                JOB_POLLS.inc()
+                done = await POLL_HEDGER.run(lambda: loop.run_in_executor(None, tracked.job.done))
+            except Exception as e:  # pylint: disable=W0718
+                if not tracked.future.done():
+                    tracked.future.set_exception(e)
+                return
+        now = loop.time()
+        if done:
+            if not tracked.future.done():
+                tracked.future.set_result(tracked.job)
+            return
+        tracked.next_poll = now + self._interval(now - tracked.started)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrent_polls)
+        wake = self._wake
+        assert wake is not None
+        while self._tracked:
+            wake.clear()
+            now = loop.time()
+            due = [tracked for tracked in self._tracked if tracked.next_poll <= now and not tracked.future.done()]
+            if due:
+                await asyncio.gather(*(self._poll(tracked, slots) for tracked in due))
+            pending = [tracked.next_poll for tracked in self._tracked if not tracked.future.done()]
+            if not pending:
+                # Every tracked future is resolved; let the waiters untrack themselves.
+                await asyncio.sleep(0)
+                continue
+            delay = min(pending) - loop.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(wake.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+
+_POLLERS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, JobPoller]" = weakref.WeakKeyDictionary()
+
+
+def shared_poller() -> JobPoller:
+    """The JobPoller of the running event loop, created on first use."""
+    loop = asyncio.get_running_loop()
+    poller = _POLLERS.get(loop)
+    if poller is None:
+        poller = _POLLERS[loop] = JobPoller()
+    return poller
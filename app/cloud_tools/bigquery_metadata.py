@@ -0,0 +1,187 @@
+"""
+Per-process cache of BigQuery table metadata.
+
+Tables (and the RowSchema compiled from them) are fetched with one tables.get call and
+then served from memory for ``ttl`` seconds, so schema-dependent code costs no RPC per
+request. Concurrent misses for the same table share one fetch. Entries are dropped early
+when an insert reports errors that point at a stale schema (see invalidate_on_errors), and
+prewarm() loads a list of tables at startup.
+
+table = table_cache.get_table(client, "project.dataset.table")
+schema = table_cache.row_schema(client, "project.dataset.table")
+
+author: github.com/defmon3
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional, Sequence
+
+from loguru import logger as log
+
+from metrics import counter
+
+if TYPE_CHECKING:
+    from .row_schema import RowSchema
+
+TABLE_CACHE = counter("bigquery_table_cache", "Table metadata lookups by outcome.", ["result"])
+
+# Row errors after which the cached schema may be out of date: the table is gone or was
+# recreated, or an "invalid" row names a column the table does not have (or lacks one it
+# now requires). Other "invalid" rows are just bad values and keep the cache.
+SCHEMA_ERROR_REASONS = frozenset({"notFound"})
+SCHEMA_ERROR_MESSAGE = re.compile(r"no such field|missing required field", re.IGNORECASE)
+
+
+def _schema_related(detail: dict[str, Any]) -> bool:
+    reason = detail.get("reason")
+    if reason in SCHEMA_ERROR_REASONS:
+        return True
+    return reason == "invalid" and SCHEMA_ERROR_MESSAGE.search(str(detail.get("message", ""))) is not None
+
+
+@dataclass
+class _Entry:
+    table: Any
+    expires: float
+    schema: Optional["RowSchema"] = None
+
+
+class TableCache:
+    """
+    Thread-safe table metadata cache with a TTL and one in-flight fetch per table.
+    """
+
+    def __init__(self, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param ttl: Seconds an entry is served before it is fetched again; 0 disables caching.
+        :param clock: Monotonic time source.
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: dict[str, _Entry] = {}
+        self._lock = threading.Lock()
+        self._fetching: dict[str, threading.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def fresh(self, table_name: str) -> Optional[_Entry]:
+        """The entry of ``table_name`` if it is cached and not expired; never fetches."""
+        entry = self._entries.get(table_name)
+        if entry is not None and entry.expires > self.clock():
+            return entry
+        return None
+
+    def entry(self, client: Any, table_name: str) -> _Entry:
+        """The cached entry of ``table_name``, fetching the table on a miss."""
+        if (entry := self.fresh(table_name)) is not None:
+            TABLE_CACHE.inc(result="hit")
+            return entry
+        with self._lock:
+            fetch_lock = self._fetching.setdefault(table_name, threading.Lock())
+        with fetch_lock:
+            # Another thread may have fetched it while this one waited.
+            if (entry := self.fresh(table_name)) is not None:
+                TABLE_CACHE.inc(result="hit")
+                return entry
+            TABLE_CACHE.inc(result="miss")
+            table = client.get_table(table_name)
+            entry = _Entry(table, self.clock() + self.ttl)
+            if self.ttl > 0:
+                self._entries[table_name] = entry
+            return entry
+
+    def get_table(self, client: Any, table_name: str) -> Any:
+        """
+        :param client: bigquery.Client used on a miss.
+        :param table_name: Fully qualified table id.
+        :return: The google.cloud.bigquery Table.
+        """
+        return self.entry(client, table_name).table
+
+    def row_schema(self, client: Any, table_name: str) -> "RowSchema":
+        """The RowSchema of ``table_name``, compiled once per cached table."""
+        # row_schema imports google-cloud-bigquery; keep it off the cold-start path of configure().
+        from .row_schema import RowSchema  # pylint: disable=import-outside-toplevel
+
+        entry = self.entry(client, table_name)
+        if entry.schema is None:
+            entry.schema = RowSchema.for_table(entry.table)
+        return entry.schema
+
+    def invalidate(self, table_name: Optional[str] = None) -> None:
+        """Drop one table, or every table when ``table_name`` is None."""
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+            elif self._entries.pop(table_name, None) is not None:
+                TABLE_CACHE.inc(result="invalidated")
+
+    def invalidate_on_errors(self, table_name: str, errors: Optional[Sequence[dict[str, Any]]]) -> bool:
+        """
+        Drop ``table_name`` when insert ``errors`` include a schema-related reason.
+
+        :param errors: Row errors in the ``insert_rows_json`` format.
+        :return: True when the entry was invalidated.
+        """
+        for error in errors or ():
+            for detail in error.get("errors") or ():
+                if isinstance(detail, dict) and _schema_related(detail):
+                    log.debug("[{}] Schema-related insert error, dropping cached metadata.", table_name)
+                    self.invalidate(table_name)
+                    return True
+        return False
+
+    def prewarm(self, client: Any, table_names: Iterable[str]) -> int:
+        """
+        Fetch several tables concurrently. Failures are logged, not raised.
+
+        :return: Tables now cached.
+        """
+        table_names = list(dict.fromkeys(table_names))
+        if not table_names:
+            return 0
+
+        def load(table_name: str) -> bool:
+            try:
+                self.row_schema(client, table_name)
+            except Exception as e:  # pylint: disable=W0718
+                log.warning("Could not prewarm table {}: {}", table_name, e)
+                return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=min(len(table_names), 8), thread_name_prefix="prewarm-table") as pool:
+            loaded = sum(pool.map(load, table_names))
+        log.debug("Prewarmed {} of {} tables.", loaded, len(table_names))
+        return loaded
+
+
+table_cache = TableCache()
+
+
+def configure(ttl: float) -> None:
+    """
+    Sets the TTL of the process-wide cache (e.g. TABLE_CACHE_TTL at startup).
+
+    :param ttl: Seconds an entry is served; 0 disables caching.
+    """
+    table_cache.ttl = ttl
+
+
+def prewarm_tables(table_names: Iterable[str], ttl: Optional[float] = None) -> int:
+    """
+    Load tables into the process-wide cache with the shared BigQuery client (startup hook).
+
+    :param table_names: Fully qualified table ids.
+    :param ttl: Overrides the cache TTL when given.
+    :return: Tables now cached.
+    """
+    from .shared_clients import get_client  # pylint: disable=import-outside-toplevel
+
+    if ttl is not None:
+        configure(ttl)
+    return table_cache.prewarm(get_client("bigquery"), table_names)
@@ -0,0 +1,137 @@
+"""
+Retry policy and dead-letter sink for BigQuery streaming inserts.
+
+insertAll reports failures per row. Rows that failed for a transient reason (backendError,
+rateLimitExceeded, or "stopped" because a neighbour in the same request was invalid) are
+resubmitted on their own, with exponential backoff, full jitter and their original insertIds
+so BigQuery de-duplicates any copy that did land. Rows that can never succeed are written to
+a DeadLetterSink (an NDJSON object in GCS) so a large ingest can finish.
+
+author: github.com/defmon3
+"""
+
+import datetime
+import os
+import random
+import tempfile
+import threading
+import uuid
+from dataclasses import dataclass
+from typing import Any, Optional, Sequence
+
+import requests
+from google.api_core.retry import if_transient_error
+from loguru import logger as log
+
+from deadline import DeadlineExceeded
+
+import serialization
+from metrics import counter
+
+DEAD_LETTER_ROWS = counter("bigquery_dead_letter_rows", "Rows written to a dead-letter sink.", ["table"])
+
+# Row error reasons worth another attempt. "stopped" rows were valid but not inserted
+# because another row of the same request was rejected.
+RETRYABLE_REASONS = frozenset({"backendError", "internalError", "rateLimitExceeded", "timeout", "stopped"})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How often and how patiently failed rows are resubmitted.
+
+    :param max_attempts: Insert attempts per row, the first one included.
+    :param initial_backoff: Upper bound of the first delay, in seconds.
+    :param max_backoff: Upper bound of any delay, in seconds.
+    :param multiplier: Growth of the upper bound per attempt.
+    :param retryable_reasons: Row error reasons that are retried.
+    """
+
+    max_attempts: int = 5
+    initial_backoff: float = 0.5
+    max_backoff: float = 30.0
+    multiplier: float = 2.0
+    retryable_reasons: frozenset[str] = RETRYABLE_REASONS
+
+    def backoff(self, attempt: int) -> float:
+        """Delay after failed attempt ``attempt`` (1-based), uniformly jittered ("full jitter")."""
+        return random.uniform(0.0, min(self.max_backoff, self.initial_backoff * self.multiplier ** (attempt - 1)))
+
+    def retryable(self, errors: Sequence[Any]) -> bool:
+        """True when every error of a row has a retryable reason."""
+        reasons = {error.get("reason") for error in errors if isinstance(error, dict)}
+        return bool(reasons) and reasons <= self.retryable_reasons
+
+    @staticmethod
+    def retryable_exception(exc: Exception) -> bool:
+        """
+        True for request-level failures that the whole batch may be retried after: 5xx, 429,
+        and transport failures (connection errors and resets, client-side timeouts). An
+        exhausted request deadline is not retried.
+        """
+        if isinstance(exc, DeadlineExceeded):
+            return False
+        return if_transient_error(exc) or isinstance(exc, (requests.exceptions.RequestException, ConnectionError, TimeoutError))
+
+
+class DeadLetterSink:
+    """
+    Collects rows that permanently failed to insert and uploads them as one NDJSON object
+    per ``flush()``. Rows are spooled to a local temp file, not kept in memory.
+    Each line is ``{"table", "row", "errors", "attempts"}``.
+    """
+
+    def __init__(self, bucket_name: str, prefix: str = "dead-letter") -> None:
+        """
+        :param bucket_name: Destination bucket.
+        :param prefix: Object name prefix; objects are named ``prefix/YYYY/MM/DD/HHMMSS-<id>.ndjson``.
+        """
+        self.bucket_name = bucket_name
+        self.prefix = prefix.rstrip("/")
+        self.rows = 0
+        self._file: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def add(self, table_name: str, rows: Sequence[dict[str, Any]], errors: Sequence[Any], attempts: int) -> None:
+        """
+        :param table_name: Table the rows were meant for.
+        :param rows: JSON-ready rows.
+        :param errors: The final errors of each row.
+        :param attempts: Insert attempts made.
+        """
+        dumps = serialization.dumps
+        lines = [
+            dumps({"table": table_name, "row": row, "errors": row_errors, "attempts": attempts}) + b"\n"
+            for row, row_errors in zip(rows, errors)
+        ]
+        with self._lock:
+            if self._file is None:
+                self._file = tempfile.NamedTemporaryFile(prefix="dead-letter-", suffix=".ndjson", delete=False)
+            self._file.writelines(lines)
+            self.rows += len(lines)
+        DEAD_LETTER_ROWS.inc(len(lines), table=table_name)
+
+    def flush(self) -> Optional[str]:
+        """
+        Uploads the rows added since the last flush. Blocking; run it in an executor.
+
+        :return: ``gs://`` URI of the object, None when there was nothing to upload or the
+                 upload failed (the local file is then kept and its path logged).
+        """
+        from .google_bucketmanager import BucketManager  # pylint: disable=import-outside-toplevel
+
+        with self._lock:
+            spool, self._file = self._file, None
+            count, self.rows = self.rows, 0
+        if spool is None:
+            return None
+        spool.close()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        name = f"{self.prefix}/{now:%Y/%m/%d/%H%M%S}-{uuid.uuid4().hex[:12]}.ndjson"
+        if not BucketManager(self.bucket_name).upload_file(spool.name, name):
+            log.error("Dead-letter upload failed; {} rows kept in {}.", count, spool.name)
+            return None
+        os.remove(spool.name)
+        uri = f"gs://{self.bucket_name}/{name}"
+        log.warning("{} rows dead-lettered to {}.", count, uri)
+        return uri
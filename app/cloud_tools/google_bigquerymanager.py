@@ -6,17 +6,79 @@ pip install google-cloud-bigquery google-auth loguru
 If run locally, BQM requires a path to the credentials file
 export GOOGLE_APPLICATION_CREDENTIALS="/path/to/credentials.json"
 
+Pre-encoded insertAll bodies (typed rows, ColumnBatches, fast JSON backends, gzip) are
+posted through ``Client._call_api``, a private method of google-cloud-bigquery whose
+signature tests/test_google_bigquerymanager.py checks against the installed release.
+_call_insert_all is the only place that uses it. _raw_insert_available repeats that check
+once, at first use; if a library upgrade changed it, inserts use the public
+``insert_rows_json`` instead, with a warning.
+
 author: github.com/defmon3
 """
 
 import asyncio
-from functools import partial
-from typing import Any, Generator, Sequence
+import contextvars
+import gzip
+import inspect
+import itertools
+import os
+import shutil
+import tempfile
+import uuid
+from functools import cache, partial
+from typing import Any, Callable, Generator, Iterable, Iterator, Optional, Sequence
 
 import google
 from google.cloud import bigquery
+from google.cloud.bigquery.retry import DEFAULT_RETRY
 from loguru import logger as log
 
+import compression
+import deadline
+import serialization
+from circuit_breaker import breaker
+from concurrency_limit import limiter, throttled_rows
+from memory_watchdog import watchdog
+from metrics import counter
+from timing import span, timed
+
+from .bigquery_buffer import write_buffer
+from .bigquery_jobs import JobPoller, shared_poller
+from .bigquery_metadata import TableCache, table_cache
+from .bigquery_retry import DeadLetterSink, RetryPolicy
+from .row_schema import ColumnBatch, RowSchema, as_json_rows, insert_ids, schema_of
+from .shared_clients import peek_client
+
+
+BREAKER = breaker("bigquery")
+INSERT_LIMIT = limiter("bigquery.insert")
+QUERY_LIMIT = limiter("bigquery.query")
+
+INSERT_ROWS = counter("bigquery_insert_rows", "Rows sent to insert_rows_json.", ["table"])
+INSERT_ROW_ERRORS = counter("bigquery_insert_row_errors", "Rows rejected by insert_rows_json.", ["table"])
+INSERT_BATCHES = counter("bigquery_insert_batches", "insert_rows_json round trips.", ["table"])
+INSERT_RETRIES = counter("bigquery_insert_retries", "Rows resubmitted after a transient error.", ["table"])
+QUERY_ROWS = counter("bigquery_query_rows", "Rows returned by query().")
+LOAD_JOBS = counter("bigquery_load_jobs", "Load jobs by outcome.", ["table", "status"])
+LOAD_ROWS = counter("bigquery_load_rows", "Rows staged for load jobs.", ["table"])
+STAGED_BYTES = counter("bigquery_staged_bytes", "Compressed bytes staged to GCS for load jobs.", ["table"])
+
+# insertAll rejects requests over 10 MB; leave headroom for insertIds and the envelope.
+MAX_INSERT_BYTES = 9 * 1024 * 1024
+# The raw insertAll path relies on Client internals (see _call_insert_all).
+_RAW_INSERT_CLIENT = bigquery.Client
+# bulk_load streams below this much encoded NDJSON and stages a load job above it.
+LOAD_THRESHOLD_BYTES = 32 * 1024 * 1024
+# Uncompressed size at which a staged file is closed and the next one started.
+MAX_STAGED_FILE_BYTES = 512 * 1024 * 1024
+STAGING_PREFIX = "bq-staging"
+_WRITE_BUFFER_BYTES = 1024 * 1024
+# Rows that fail without a retry policy still reach a dead-letter sink through _insert_batch.
+_SINGLE_ATTEMPT = RetryPolicy(max_attempts=1)
+# Floors for insert batches shrunk under memory pressure.
+MIN_ADAPTIVE_ROWS = 10
+MIN_ADAPTIVE_BYTES = 64 * 1024
+
 
 def batch_generator(data: list[dict[str, Any]], batch_size: int) -> Generator[list[dict[str, Any]], None, None]:
     """Yield successive batches from data."""
@@ -24,44 +86,661 @@ def batch_generator(data: list[dict[str, Any]], batch_size: int) -> Generator[li
         yield data[start : start + batch_size]
 
 
+def _adaptive_ranges(total: int, batch_size: int) -> Iterator[tuple[int, int]]:
+    """``(start, stop)`` of successive batches, each sized for the memory pressure when it starts."""
+    start = 0
+    while start < total:
+        stop = min(start + watchdog.scaled(batch_size, MIN_ADAPTIVE_ROWS), total)
+        yield start, stop
+        start = stop
+
+
+def sized_batches(
+    rows: Iterable[tuple[dict[str, Any], int]], max_rows: int, max_bytes: int = MAX_INSERT_BYTES
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Yield batches of at most ``max_rows`` rows and roughly ``max_bytes`` encoded bytes.
+    Both caps shrink under memory pressure (see memory_watchdog).
+
+    :param rows: ``(row, encoded_size)`` pairs, consumed lazily.
+    :param max_rows: Row cap per batch.
+    :param max_bytes: Size cap per batch. A single larger row becomes its own batch.
+    """
+    batch: list[dict[str, Any]] = []
+    batch_bytes = 0
+    limit_rows, limit_bytes = max_rows, max_bytes
+    for row, size in rows:
+        if not batch:
+            limit_rows = watchdog.scaled(max_rows, MIN_ADAPTIVE_ROWS)
+            limit_bytes = watchdog.scaled(max_bytes, MIN_ADAPTIVE_BYTES)
+        elif len(batch) >= limit_rows or batch_bytes + size > limit_bytes:
+            yield batch
+            batch, batch_bytes = [], 0
+            limit_rows = watchdog.scaled(max_rows, MIN_ADAPTIVE_ROWS)
+            limit_bytes = watchdog.scaled(max_bytes, MIN_ADAPTIVE_BYTES)
+        batch.append(row)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def _in_executor(loop: asyncio.AbstractEventLoop, func: Callable[[], Any]) -> "asyncio.Future[Any]":
+    """``func`` on the default executor in a copy of this context, so the breaker sees the request deadline."""
+    return loop.run_in_executor(None, contextvars.copy_context().run, func)
+
+
+@cache
+def _raw_insert_available() -> bool:
+    """True while Client._call_api and Connection.api_request take what _call_insert_all passes."""
+    from google.cloud.bigquery._http import Connection  # pylint: disable=import-outside-toplevel
+
+    try:
+        call_api = inspect.signature(_RAW_INSERT_CLIENT._call_api).parameters  # pylint: disable=protected-access
+        api_request = inspect.signature(Connection.api_request).parameters
+    except (AttributeError, TypeError, ValueError):
+        available = False
+    else:
+        available = (
+            {"retry", "span_name", "span_attributes", "headers"} <= set(call_api)
+            and any(param.kind is inspect.Parameter.VAR_KEYWORD for param in call_api.values())
+            and {"method", "path", "data", "content_type", "headers", "timeout"} <= set(api_request)
+        )
+    if not available:
+        log.warning("google-cloud-bigquery changed Client._call_api; inserting through insert_rows_json.")
+    return available
+
+
+def _raw_insert_supported(client: Any) -> bool:
+    """True for a Client (or subclass keeping insert_rows_json) while the installed library supports the raw path."""
+    return (
+        isinstance(client, _RAW_INSERT_CLIENT)
+        and type(client).insert_rows_json is _RAW_INSERT_CLIENT.insert_rows_json
+        and _raw_insert_available()
+    )
+
+
+def _call_insert_all(
+    client: bigquery.Client, path: str, body: bytes, headers: Optional[dict[str, str]], timeout: Optional[float]
+) -> dict[str, Any]:
+    """POST a pre-encoded insertAll body through the client's private, retrying ``_call_api``."""
+    return client._call_api(  # pylint: disable=protected-access
+        DEFAULT_RETRY if timeout is None else DEFAULT_RETRY.with_timeout(timeout),
+        span_name="BigQuery.insertRowsJson",
+        span_attributes={"path": path},
+        headers=headers,
+        method="POST",
+        path=path,
+        data=body,
+        content_type="application/json",
+        timeout=timeout,
+    )
+
+
+def _encode_line(row: Any) -> bytes:
+    row_schema = getattr(type(row), "__row_schema__", None)
+    return row_schema.encode(row) if row_schema is not None else serialization.dumps(row)
+
+
+def _ndjson_lines(rows: Any, schema: Optional[RowSchema]) -> Iterator[tuple[Any, bytes]]:
+    """``(row, json_line)`` pairs; the row is None for ColumnBatches, which encode column-wise."""
+    if isinstance(rows, ColumnBatch):
+        for line in rows.encode_rows():
+            yield None, line
+        return
+    encode = schema.encode if schema is not None else _encode_line
+    for row in rows:
+        yield row, encode(row)
+
+
+def _take(rows: Any, indexes: Sequence[int]) -> Any:
+    """The rows at ``indexes``, in the container type of ``rows``."""
+    if isinstance(rows, ColumnBatch):
+        dicts = rows.to_dicts()
+        return rows.schema.batch(dicts[i] for i in indexes)
+    return [rows[i] for i in indexes]
+
+
 class BigQueryManager:
     """
     Class to handle database operations for BigQuery.
     """
 
-    def __init__(self) -> None:
-        credentials, _ = google.auth.default()
-        self.client = bigquery.Client(credentials=credentials)
+    def __init__(
+        self, client: Optional[bigquery.Client] = None, jobs: Optional[JobPoller] = None, tables: Optional[TableCache] = None
+    ) -> None:
+        """
+        :param client: Client to use. Defaults to the shared client when one was
+                       pre-built at startup, otherwise a new client from ADC.
+        :param jobs: Poller for query and load jobs. Defaults to the one shared by
+                     every manager on the running event loop.
+        :param tables: Table metadata cache. Defaults to the process-wide one.
+        """
+        client = client or peek_client("bigquery")
+        if client is None:
+            credentials, _ = google.auth.default()
+            client = bigquery.Client(credentials=credentials)
+        self.client = client
+        self.jobs = jobs
+        self.tables = tables or table_cache
+
+    async def get_table(self, table_name: str) -> bigquery.Table:
+        """
+        Table metadata from the process-wide cache; tables.get only runs on a miss or after
+        the TTL or a schema-related insert error.
+
+        :param table_name: Fully qualified table id.
+        """
+        if self.tables.fresh(table_name) is not None:
+            return self.tables.get_table(self.client, table_name)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.tables.get_table, self.client, table_name)
+
+    async def get_row_schema(self, table_name: str) -> RowSchema:
+        """The cached RowSchema of ``table_name``, for typed rows and load job schemas."""
+        if self.tables.fresh(table_name) is not None:
+            return self.tables.row_schema(self.client, table_name)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.tables.row_schema, self.client, table_name)
+
+    def _insert_rows(
+        self, table_name: str, rows: Any, row_ids: Optional[Sequence[str]] = None, timeout: Optional[float] = None
+    ) -> Sequence[dict[str, Any]]:
+        """
+        insertAll one batch. With a real client the request body is encoded here: typed rows
+        and ColumnBatches by their RowSchema (validated in the same pass), dicts by
+        ``serialization`` unless that is the stdlib and the body goes uncompressed anyway.
+        Custom or mocked clients, and every client when the installed library no longer has
+        the internals _call_insert_all uses, get ``insert_rows_json`` with plain dicts.
+
+        :param rows: Dicts, RowSchema model instances or a ColumnBatch.
+        :param row_ids: insertIds, one per row. Generated when omitted.
+        :param timeout: Seconds for the call including the client's own retries.
+        :return: Row errors in the ``insert_rows_json`` format.
+        :raises CircuitOpenError: While BigQuery's circuit breaker is open.
+        """
+        ids: dict[str, Any] = {} if row_ids is None else {"row_ids": row_ids}
+        if timeout is not None:
+            ids.update(timeout=timeout, retry=DEFAULT_RETRY.with_timeout(timeout))
+        if not _raw_insert_supported(self.client):
+            return BREAKER.call(self.client.insert_rows_json, table_name, as_json_rows(rows), **ids)
+        if isinstance(rows, ColumnBatch):
+            body = rows.encode_insert_all(row_ids)
+        elif schema := schema_of(rows):
+            body = schema.encode_insert_all(rows, row_ids)
+        elif serialization.backend == "json" and not compression.enabled("bigquery"):
+            return BREAKER.call(self.client.insert_rows_json, table_name, rows, **ids)
+        else:
+            id_iter = iter(row_ids) if row_ids is not None else insert_ids()
+            body = serialization.dumps({"rows": [{"insertId": next(id_iter), "json": row} for row in rows]})
+        return BREAKER.call(self._post_insert_all, table_name, body, timeout=timeout)
+
+    async def _send(
+        self, table_name: str, rows: Any, row_ids: Optional[Sequence[str]] = None
+    ) -> Sequence[dict[str, Any]]:
+        """
+        _insert_rows on an executor thread, within the instance-wide insert concurrency limit
+        (see concurrency_limit). Its timeout is taken from the request deadline once a slot is free.
+        """
+        loop = asyncio.get_running_loop()
+        async with INSERT_LIMIT.async_slot() as slot:
+            timeout = deadline.rpc_timeout(operation="bigquery.insert")
+            errors = await _in_executor(loop, partial(self._insert_rows, table_name, rows, row_ids, timeout))
+            if throttled_rows(errors):
+                slot.throttled()
+        return errors
+
+    def _post_insert_all(self, table_name: str, body: bytes, timeout: Optional[float] = None) -> list[dict[str, Any]]:
+        """
+        Posts a pre-encoded insertAll body through the client's retrying transport, gzipped
+        with ``Content-Encoding: gzip`` when compression is enabled for "bigquery".
+        """
+        table = bigquery.TableReference.from_string(table_name, default_project=self.client.project)
+        path = f"{table.path}/insertAll"
+        body, encoding = compression.compress("bigquery", body)
+        headers = {"Content-Encoding": encoding} if encoding else None
+        response = _call_insert_all(self.client, path, body, headers, timeout)
+        return [{"index": int(error["index"]), "errors": error["errors"]} for error in response.get("insertErrors", ())]
 
     async def insert_to_bq(
-        self, table_name: str, data: list[dict[str, Any]], batch_size: int = 1000
+        self,
+        table_name: str,
+        data: list[dict[str, Any]] | Sequence[Any] | ColumnBatch,
+        batch_size: int = 1000,
+        retry: Optional[RetryPolicy] = None,
+        dead_letter: Optional[DeadLetterSink] = None,
     ) -> Sequence[dict[str, Any]] | None:
         """
         Split data in to batches and stream it to bigquery
         :param table_name:
-        :param data:
+        :param data: Dicts, RowSchema model instances or a ColumnBatch.
         :param batch_size:
-        :return:
+        :param retry: Resubmit rows that failed transiently (see _insert_batch). Without it
+                      and without ``dead_letter`` the first batch with errors ends the insert
+                      and its errors are returned.
+        :param dead_letter: Receives rows that finally failed; the remaining batches are
+                            still inserted. Flushed before returning.
+        :return: Row errors, None on success. With ``retry`` or ``dead_letter`` the indexes
+                 refer to ``data``.
+        :raises CircuitOpenError: While BigQuery's circuit breaker is open; nothing more is sent.
+        """
+        if retry is not None or dead_letter is not None:
+            return await self._insert_retrying(table_name, data, batch_size, retry or _SINGLE_ATTEMPT, dead_letter)
+        with span("bigquery.insert_to_bq"):
+            try:
+                for start, stop in _adaptive_ranges(len(data), batch_size):
+                    batch = data[start:stop]
+                    errors = await self._send(table_name, batch)
+                    INSERT_BATCHES.inc(table=table_name)
+                    INSERT_ROWS.inc(len(batch), table=table_name)
+                    if errors:
+                        INSERT_ROW_ERRORS.inc(len(errors), table=table_name)
+                        self.tables.invalidate_on_errors(table_name, errors)
+                        log.opt(depth=1).error("[{}] {}", table_name, errors)
+                        return errors
+            except google.api_core.exceptions.BadRequest as e:  # type: ignore
+                log.opt(depth=1).error("[{}] Insert: {}", table_name, e)
+        return None
+
+    async def _insert_retrying(
+        self,
+        table_name: str,
+        data: Sequence[Any] | ColumnBatch,
+        batch_size: int,
+        retry: RetryPolicy,
+        dead_letter: Optional[DeadLetterSink],
+    ) -> Sequence[dict[str, Any]] | None:
+        failed: list[dict[str, Any]] = []
+        with span("bigquery.insert_to_bq"):
+            try:
+                for start, stop in _adaptive_ranges(len(data), batch_size):
+                    errors = await self._insert_batch(table_name, data[start:stop], retry, dead_letter)
+                    failed.extend({"index": start + error["index"], "errors": error["errors"]} for error in errors)
+                    if errors and dead_letter is None:
+                        break
+            finally:
+                await self._flush_dead_letters(dead_letter)
+        if failed:
+            log.opt(depth=2).error("[{}] {} rows failed: {}", table_name, len(failed), failed[:10])
+            return failed
+        return None
+
+    async def _insert_batch(
+        self, table_name: str, rows: Any, retry: RetryPolicy, dead_letter: Optional[DeadLetterSink] = None
+    ) -> Sequence[dict[str, Any]]:
+        """
+        Insert one batch, resubmitting only the rows that failed for a retryable reason, after
+        a jittered backoff and with their original insertIds so BigQuery de-duplicates rows
+        that were stored despite an error. Transient request failures, including transport
+        errors such as connection resets and timeouts, retry every pending row; a BadRequest
+        fails them all. Anything else (e.g. CircuitOpenError) is raised. Retries stop early when the backoff would not fit in the
+        request deadline; the pending rows then fail with their last error.
+
+        :param rows: Dicts, RowSchema model instances or a ColumnBatch.
+        :return: Errors of the rows that failed for good, indexed into ``rows``. These rows
+                 were also handed to ``dead_letter``.
+        """
+        ids = list(itertools.islice(insert_ids(), len(rows)))
+        pending = list(range(len(rows)))
+        failed: list[dict[str, Any]] = []
+        attempt = 0
+        while pending:
+            attempt += 1
+            subset = rows if len(pending) == len(rows) else _take(rows, pending)
+            try:
+                result = await self._send(table_name, subset, [ids[i] for i in pending])
+                retry_all = False
+            except Exception as e:  # pylint: disable=W0718
+                if not (retry_all := retry.retryable_exception(e)) and not isinstance(
+                    e, google.api_core.exceptions.BadRequest  # type: ignore
+                ):
+                    raise
+                reason = "backendError" if retry_all else "badRequest"
+                result = [{"index": n, "errors": [{"reason": reason, "message": str(e)}]} for n in range(len(pending))]
+            INSERT_BATCHES.inc(table=table_name)
+            INSERT_ROWS.inc(len(pending), table=table_name)
+
+            again, final = [], []
+            for error in result:
+                index = pending[error["index"]]
+                if attempt < retry.max_attempts and (retry_all or retry.retryable(error["errors"])):
+                    again.append({"index": index, "errors": error["errors"]})
+                else:
+                    final.append({"index": index, "errors": error["errors"]})
+            delay = retry.backoff(attempt) if again else 0.0
+            if again and delay >= deadline.budget():
+                log.warning("[{}] No time left to retry {} rows (attempt {}).", table_name, len(again), attempt)
+                final.extend(again)
+                again = []
+            if final:
+                INSERT_ROW_ERRORS.inc(len(final), table=table_name)
+                failed.extend(final)
+                if dead_letter is not None:
+                    json_rows = as_json_rows(_take(rows, [error["index"] for error in final]))
+                    dead_letter.add(table_name, json_rows, [error["errors"] for error in final], attempt)
+            if again:
+                INSERT_RETRIES.inc(len(again), table=table_name)
+                log.debug("[{}] Retrying {} of {} rows (attempt {}).", table_name, len(again), len(pending), attempt)
+                await asyncio.sleep(delay)
+            pending = [error["index"] for error in again]
+        self.tables.invalidate_on_errors(table_name, failed)
+        return sorted(failed, key=lambda error: error["index"])
+
+    async def _flush_dead_letters(self, dead_letter: Optional[DeadLetterSink]) -> None:
+        if dead_letter is not None and dead_letter.rows:
+            await asyncio.get_running_loop().run_in_executor(None, dead_letter.flush)
+
+    async def insert_buffered(self, table_name: str, rows: Iterable[dict[str, Any]]) -> None:
+        """
+        Queue rows in the instance-wide write-behind buffer instead of inserting them now.
+        Rows from many requests are combined into few large insertAll calls; failures are
+        logged and counted, not returned (see bigquery_buffer).
+
+        :param table_name:
+        :param rows: JSON-ready dicts.
+        """
+        await write_buffer().add(table_name, rows)
+
+    async def insert_stream(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        table_name: str,
+        rows: Iterable[tuple[dict[str, Any], int]],
+        batch_size: int = 500,
+        max_batch_bytes: int = MAX_INSERT_BYTES,
+        max_in_flight: int = 2,
+        retry: Optional[RetryPolicy] = None,
+        dead_letter: Optional[DeadLetterSink] = None,
+    ) -> Sequence[dict[str, Any]] | None:
         """
+        Stream rows from a lazy, possibly blocking iterable (e.g. a request body parser) to
+        bigquery in size-capped batches. The next batch is only pulled once one of the
+        ``max_in_flight`` inserts has finished, so at most ``max_in_flight + 1`` batches are
+        held in memory regardless of the total input size.
+
+        :param table_name:
+        :param rows: ``(row, encoded_size)`` pairs. Iterated in executor threads.
+        :param batch_size: Row cap per insert_rows_json call.
+        :param max_batch_bytes: Size cap per insert_rows_json call.
+        :param max_in_flight: Concurrent insert_rows_json calls.
+        :param retry: Resubmit rows that failed transiently, see insert_to_bq.
+        :param dead_letter: Receives rows that finally failed, and streaming goes on;
+                            without it the first failure stops the stream.
+        :return: Row errors, None on success, indexed from the start of the stream. Without
+                 ``dead_letter`` these are the errors of the first failing batch(es).
+        """
+        policy = retry or (_SINGLE_ATTEMPT if dead_letter is not None else None)
         loop = asyncio.get_running_loop()
-        try:
-            for batch in batch_generator(data, batch_size):
-                errors = await loop.run_in_executor(
-                    None, partial(self.client.insert_rows_json, table_name, batch)
+        batches = sized_batches(rows, batch_size, max_batch_bytes)
+        slots = asyncio.Semaphore(max_in_flight)
+        pending: set[asyncio.Task] = set()
+        errors: list[dict[str, Any]] = []
+        offset = 0
+
+        def stopped() -> bool:
+            return bool(errors) and dead_letter is None
+
+        async def send(batch: list[dict[str, Any]], start: int) -> None:
+            try:
+                if policy is not None:
+                    result = await self._insert_batch(table_name, batch, policy, dead_letter)
+                else:
+                    result = await self._send(table_name, batch)
+                    INSERT_BATCHES.inc(table=table_name)
+                    INSERT_ROWS.inc(len(batch), table=table_name)
+                    if result:
+                        INSERT_ROW_ERRORS.inc(len(result), table=table_name)
+                        self.tables.invalidate_on_errors(table_name, result)
+                errors.extend({"index": start + error["index"], "errors": error["errors"]} for error in result)
+            except google.api_core.exceptions.BadRequest as e:  # type: ignore
+                log.error("[{}] Insert: {}", table_name, e)
+                errors.append({"index": None, "errors": [{"reason": "badRequest", "message": str(e)}]})
+            finally:
+                slots.release()
+
+        with span("bigquery.insert_stream"):
+            try:
+                while not stopped():
+                    await slots.acquire()
+                    try:
+                        deadline.check("bigquery.insert_stream")
+                    except deadline.DeadlineExceeded:
+                        slots.release()
+                        raise
+                    batch = await loop.run_in_executor(None, next, batches, None)
+                    if batch is None or stopped():
+                        slots.release()
+                        break
+                    task = asyncio.create_task(send(batch, offset))
+                    offset += len(batch)
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+            finally:
+                await asyncio.gather(*pending)
+                await self._flush_dead_letters(dead_letter)
+        if errors:
+            log.opt(depth=1).error("[{}] {}", table_name, errors[:10])
+            return errors
+        return None
+
+    async def bulk_load(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        table_name: str,
+        rows: Iterable[Any] | ColumnBatch,
+        staging_bucket: str,
+        schema: Optional[RowSchema] = None,
+        load_threshold_bytes: int = LOAD_THRESHOLD_BYTES,
+        max_file_bytes: int = MAX_STAGED_FILE_BYTES,
+        write_disposition: str = bigquery.WriteDisposition.WRITE_APPEND,
+        timeout: Optional[float] = None,
+    ) -> Sequence[dict[str, Any]] | None:
+        """
+        Load rows with whichever path is cheaper for their size. Rows are encoded lazily;
+        when the input ends before ``load_threshold_bytes`` of NDJSON it is streamed with
+        insert_to_bq, otherwise everything is written to gzip NDJSON files in
+        ``staging_bucket`` and loaded with a single load job, which is polled without
+        blocking the event loop. Staged files are removed once the job has finished.
+
+        :param table_name:
+        :param rows: Dicts, RowSchema model instances (any iterable) or a ColumnBatch.
+        :param staging_bucket: Bucket for the staged files.
+        :param schema: Validates/encodes rows and is passed to the load job (e.g. for new tables).
+        :param load_threshold_bytes: Encoded size above which a load job is used.
+        :param max_file_bytes: Uncompressed size per staged file.
+        :param write_disposition: Load job write disposition.
+        :param timeout: Seconds to wait for the load job.
+        :return: Row or job errors, None on success.
+        """
+        loop = asyncio.get_running_loop()
+        with span("bigquery.bulk_load"):
+            small_rows, uris = await loop.run_in_executor(
+                None,
+                partial(self._stage, table_name, rows, staging_bucket, schema, load_threshold_bytes, max_file_bytes),
+            )
+            if small_rows is not None:
+                log.debug("[{}] {} rows below the load threshold, streaming.", table_name, len(small_rows))
+                return await self.insert_to_bq(table_name, small_rows)
+
+            config = bigquery.LoadJobConfig(
+                source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON, write_disposition=write_disposition
+            )
+            if schema is not None:
+                config.schema = list(schema.fields)
+            job = None
+            try:
+                job = await _in_executor(
+                    loop,
+                    partial(
+                        BREAKER.call,
+                        self.client.load_table_from_uri,
+                        uris,
+                        table_name,
+                        job_config=config,
+                        **deadline.timeout_kwargs(operation="bigquery.load"),
+                    ),
                 )
-                if errors:
-                    log.opt(depth=1).error(f"[{table_name}] {errors}")
-                    return errors
-        except google.api_core.exceptions.BadRequest as e:  # type: ignore
-            log.opt(depth=1).error(f"[{table_name}] Insert: {e}")
+                await self.wait_for_job(job, timeout=timeout)
+            finally:
+                # A job that is still running would fail if its source files disappeared.
+                if job is None or job.state == "DONE":
+                    await loop.run_in_executor(None, self._delete_staged, staging_bucket, uris)
+
+            if job.error_result:
+                LOAD_JOBS.inc(table=table_name, status="failed")
+                log.opt(depth=1).error("[{}] Load job {}: {}", table_name, job.job_id, job.error_result)
+                return [{"index": None, "errors": job.errors or [job.error_result]}]
+            LOAD_JOBS.inc(table=table_name, status="ok")
+            log.info("[{}] Loaded {} rows from {} staged file(s).", table_name, job.output_rows, len(uris))
         return None
 
-    async def query(self, query_str: str) -> list[dict[str, Any]]:
+    def _stage(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        table_name: str,
+        rows: Any,
+        staging_bucket: str,
+        schema: Optional[RowSchema],
+        load_threshold_bytes: int,
+        max_file_bytes: int,
+    ) -> tuple[Optional[Any], list[str]]:
+        """
+        Encodes rows until the input ends or the threshold is crossed.
+
+        :return: ``(rows, [])`` when the input is small enough to stream, else ``(None, uris)``.
+        """
+        lines = _ndjson_lines(rows, schema)
+        head: list[tuple[Any, bytes]] = []
+        head_bytes = 0
+        for pair in lines:
+            head.append(pair)
+            head_bytes += len(pair[1]) + 1
+            if head_bytes > load_threshold_bytes:
+                break
+        else:
+            return (rows if isinstance(rows, ColumnBatch) else [row for row, _ in head]), []
+        return None, self._stage_files(table_name, itertools.chain(head, lines), staging_bucket, max_file_bytes)
+
+    def _stage_files(
+        self, table_name: str, lines: Iterator[tuple[Any, bytes]], staging_bucket: str, max_file_bytes: int
+    ) -> list[str]:
+        """Writes gzip NDJSON files of up to ``max_file_bytes`` (uncompressed) and uploads them."""
+        from .google_bucketmanager import BucketManager  # pylint: disable=import-outside-toplevel
+
+        bucket = BucketManager(staging_bucket)
+        run_prefix = f"{STAGING_PREFIX}/{table_name}/{uuid.uuid4().hex}"
+        workdir = tempfile.mkdtemp(prefix="bq-load-")
+        uris: list[str] = []
+        try:
+            while True:
+                path = os.path.join(workdir, f"{len(uris):05d}.json.gz")
+                written, row_count = self._write_ndjson_gzip(path, lines, max_file_bytes)
+                if not row_count:
+                    break
+                name = f"{run_prefix}/{len(uris):05d}.json.gz"
+                if not bucket.upload_file(path, name):
+                    raise OSError(f"Staging upload of gs://{staging_bucket}/{name} failed.")
+                uris.append(f"gs://{staging_bucket}/{name}")
+                LOAD_ROWS.inc(row_count, table=table_name)
+                STAGED_BYTES.inc(os.path.getsize(path), table=table_name)
+                os.unlink(path)
+                if written < max_file_bytes:
+                    break
+        except Exception:
+            self._delete_staged(staging_bucket, uris)
+            raise
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        return uris
+
+    @staticmethod
+    def _write_ndjson_gzip(path: str, lines: Iterator[tuple[Any, bytes]], max_file_bytes: int) -> tuple[int, int]:
+        """Writes lines until they run out or the file reaches ``max_file_bytes``; returns (bytes, rows)."""
+        written = row_count = 0
+        buffer: list[bytes] = []
+        buffered = 0
+        with gzip.open(path, "wb", compresslevel=6) as out:
+            for _, line in lines:
+                buffer.append(line)
+                buffered += len(line) + 1
+                row_count += 1
+                if buffered >= _WRITE_BUFFER_BYTES:
+                    out.write(b"\n".join(buffer) + b"\n")
+                    written += buffered
+                    buffer, buffered = [], 0
+                if written + buffered >= max_file_bytes:
+                    break
+            if buffer:
+                out.write(b"\n".join(buffer) + b"\n")
+                written += buffered
+        return written, row_count
+
+    @staticmethod
+    def _delete_staged(staging_bucket: str, uris: list[str]) -> None:
+        if not uris:
+            return
+        from .google_bucketmanager import BucketManager  # pylint: disable=import-outside-toplevel
+
+        bucket = BucketManager(staging_bucket)
+        for uri in uris:
+            try:
+                bucket.delete_file(uri.removeprefix(f"gs://{staging_bucket}/"))
+            except Exception as e:  # pylint: disable=W0718
+                log.warning("Could not delete staged file {}: {}", uri, e)
+
+    async def wait_for_job(self, job: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Wait until a job is done without blocking the event loop or an executor thread.
+        Status polls are batched with every other outstanding job (see JobPoller).
+
+        :param job: Any google.cloud.bigquery job.
+        :param timeout: Seconds before TimeoutError; the job keeps running server-side.
+                        Capped by the request deadline.
+        :return: The finished job.
+        """
+        timeout = deadline.rpc_timeout(timeout, "bigquery.job")
+        return await (self.jobs or shared_poller()).wait(job, timeout=timeout)
+
+    @timed("bigquery.query")
+    async def query(self, query_str: str, timeout: Optional[float] = None) -> list[dict[str, Any]]:
         """
         :param query_str: SQL query
+        :param timeout: Seconds to wait for the query job.
         :return: list of dictionaries with the result
         """
         loop = asyncio.get_running_loop()
-        query_job = await loop.run_in_executor(None, self.client.query, query_str)
-        result = await loop.run_in_executor(None, query_job.result)
-        return [dict(row) for row in result]
+        query_job = await _in_executor(
+            loop, partial(BREAKER.call, self.client.query, query_str, **deadline.timeout_kwargs(operation="bigquery.query"))
+        )
+        await self.wait_for_job(query_job, timeout=timeout)
+        # The job is done, so result() only fetches rows (and raises the job's error).
+        result = await _in_executor(
+            loop, partial(BREAKER.call, query_job.result, **deadline.timeout_kwargs(operation="bigquery.query"))
+        )
+        rows = [dict(row) for row in result]
+        QUERY_ROWS.inc(len(rows))
+        return rows
+
+    async def query_many(
+        self,
+        queries: Iterable[str],
+        max_concurrency: int = 8,
+        timeout: Optional[float] = None,
+        return_exceptions: bool = False,
+    ) -> list[Any]:
+        """
+        Run several queries concurrently. At most ``max_concurrency`` jobs are submitted or
+        running at once, fewer while BigQuery throttles queries (the adaptive "bigquery.query"
+        limit shared by every request, see concurrency_limit). All of them are polled by the
+        same JobPoller.
+
+        :param queries: SQL queries.
+        :param max_concurrency: Jobs in flight at once.
+        :param timeout: Seconds to wait for each query job.
+        :param return_exceptions: Put a failed query's exception in its slot instead of raising.
+        :return: One list of row dicts per query, in input order.
+        """
+        slots = asyncio.Semaphore(max_concurrency)
+
+        async def run(query_str: str) -> list[dict[str, Any]]:
+            async with slots, QUERY_LIMIT.async_slot():
+                return await self.query(query_str, timeout=timeout)
+
+        with span("bigquery.query_many"):
+            return await asyncio.gather(*(run(q) for q in queries), return_exceptions=return_exceptions)
@@ -9,13 +9,43 @@ SPDX-License-Identifier: LicenseRef-NonCommercial-Only
 © 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
 File: google_bucketmanager.py
 """
+import mimetypes
+import os
 import re
+import tempfile
+import uuid
 from typing import Optional
 
 from google.cloud import storage
 
 from loguru import logger as log
 
+import compression
+from circuit_breaker import breaker
+from concurrency_limit import limiter
+from deadline import timeout_kwargs
+from hedging import hedger
+from memory_watchdog import watchdog
+from metrics import counter
+from timing import timed
+
+from .shared_clients import peek_client
+
+
+BREAKER = breaker("gcs")
+HEDGED_DOWNLOADS = hedger("gcs.download")
+HEDGED_READS = hedger("gcs.read")
+# Transfers of every BucketManager share one adaptive in-flight limit (see concurrency_limit).
+TRANSFER_LIMIT = limiter("gcs")
+
+BYTES_TRANSFERRED = counter("gcs_bytes_transferred", "Bytes moved to/from GCS.", ["direction"])
+TRANSFER_FAILURES = counter("gcs_transfer_failures", "Failed GCS transfers.", ["direction"])
+
+# Resumable uploads buffer one chunk in memory; the library default is 100 MiB. Chunks must be
+# multiples of 256 KiB.
+UPLOAD_CHUNK_BYTES = 100 * 1024 * 1024
+_CHUNK_ALIGNMENT = 256 * 1024
+
 
 def validate_bucket_name(name: str) -> str:
     """
@@ -29,56 +59,170 @@ def validate_bucket_name(name: str) -> str:
     return name
 
 
+def upload_chunk_size() -> Optional[int]:
+    """Chunk size for resumable uploads under memory pressure; None keeps the library default."""
+    size = watchdog.scaled(UPLOAD_CHUNK_BYTES, _CHUNK_ALIGNMENT)
+    if size >= UPLOAD_CHUNK_BYTES:
+        return None
+    return max(size - size % _CHUNK_ALIGNMENT, _CHUNK_ALIGNMENT)
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _remove(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _gzip_copy(path: str) -> Optional[str]:
+    """A gzip copy of ``path`` in the temp dir when GCS compression applies to it, else None."""
+    fd, packed = tempfile.mkstemp(suffix=".gz")
+    os.close(fd)
+    try:
+        if compression.compress_file("gcs", path, packed):
+            return packed
+    except BaseException:
+        _remove(packed)
+        raise
+    _remove(packed)
+    return None
+
+
 class BucketManager:
     """
     Manages file operations within a Google Cloud Storage bucket.
     Allows specifying a default remote folder for convenience.
     """
 
-    def __init__(self, bucket_name: str):
+    def __init__(self, bucket_name: str, client: Optional[storage.Client] = None):
         """
         Initializes the BucketManager.
 
         :param bucket_name: Name of the GCS bucket.
+        :param client: Client to use. Defaults to the shared client when one was
+                       pre-built at startup, otherwise a new client.
         """
         validate_bucket_name(bucket_name)
         self.bucket_name = bucket_name
-        self.client = storage.Client()
+        self.client = client or peek_client("storage") or storage.Client()
         self.bucket = self.client.bucket(self.bucket_name)
 
-        log.debug(f"Initialized BucketManager for bucket: '{self.bucket_name}'")
+        log.debug("Initialized BucketManager for bucket: '{}'", self.bucket_name)
 
-    def upload_file(self, local_file_path: str, remote_file_name: Optional[str] = None) -> None:
+    @timed("gcs.upload_file")
+    def upload_file(self, local_file_path: str, remote_file_name: Optional[str] = None) -> bool:
         """
         Uploads a local file. If remote_file_name is None, defaults to the
         local filename placed within self.remote_folder (if set). If remote_file_name
         is provided, it's used directly (should be the full desired path).
 
+        With compression enabled for "gcs", compressible files are stored gzipped with
+        ``Content-Encoding: gzip`` and their own content type. GCS transcodes them on
+        download, and the client library inflates them transparently.
+
         :param local_file_path: Local path of the file to upload.
         :param remote_file_name: Optional full desired path in the bucket.
+        :return: True when the upload succeeded.
         """
-
+        packed = None
         try:
 
             blob = self.bucket.blob(remote_file_name)
-            blob.upload_from_filename(local_file_path)
+            if (chunk_size := upload_chunk_size()) is not None:
+                blob.chunk_size = chunk_size
+            source = local_file_path
+            if compression.enabled("gcs") and (packed := _gzip_copy(local_file_path)) is not None:
+                blob.content_encoding = "gzip"
+                blob.content_type = mimetypes.guess_type(local_file_path)[0] or "application/octet-stream"
+                source = packed
+            with TRANSFER_LIMIT.slot():
+                BREAKER.call(blob.upload_from_filename, source, **timeout_kwargs(operation="gcs.upload"))
+            BYTES_TRANSFERRED.inc(_file_size(source), direction="upload")
         except Exception as e:  # pylint: disable=W0718
-            log.warning(f"Failed to upload {local_file_path} to {self.bucket_name} {e}.")
-        log.info(f"Uploaded {local_file_path} to {self.bucket_name}/{remote_file_name}.")
-
+            TRANSFER_FAILURES.inc(direction="upload")
+            log.warning("Failed to upload {} to {} {}.", local_file_path, self.bucket_name, e)
+            return False
+        finally:
+            if packed is not None:
+                _remove(packed)
+        log.info("Uploaded {} to {}/{}.", local_file_path, self.bucket_name, remote_file_name)
+        return True
+
+    @timed("gcs.download_file")
     def download_file(self, remote_file_name: str, local_file_path: str) -> None:
         """
         Downloads a file. If remote_file_name is just a filename (no slashes)
         and self.remote_folder is set, it prepends the remote_folder. Otherwise,
         it assumes remote_file_name is the full path.
 
+        Hedged as "gcs.download" when enabled (see hedging): each attempt downloads to a file
+        of its own and the winner's is renamed to ``local_file_path``.
+
         :param remote_file_name: Path or filename of the blob to download.
         :param local_file_path: Local path to save the downloaded file.
         """
+        try:
+            with TRANSFER_LIMIT.slot():
+                if HEDGED_DOWNLOADS.enabled:
+                    part = HEDGED_DOWNLOADS.call(self._download_part, remote_file_name, local_file_path, discard=_remove)
+                    os.replace(part, local_file_path)
+                else:
+                    blob = self.bucket.blob(remote_file_name)
+                    BREAKER.call(blob.download_to_filename, local_file_path, **timeout_kwargs(operation="gcs.download"))
+        except Exception:
+            TRANSFER_FAILURES.inc(direction="download")
+            raise
+        BYTES_TRANSFERRED.inc(_file_size(local_file_path), direction="download")
+        log.debug("Downloaded {}/{} to {}.", self.bucket_name, remote_file_name, local_file_path)
+
+    def _download_part(self, remote_file_name: str, local_file_path: str) -> str:
+        """One download attempt into a uniquely named file next to ``local_file_path``."""
+        part = f"{local_file_path}.{uuid.uuid4().hex[:8]}.part"
+        blob = self.bucket.blob(remote_file_name)
+        try:
+            BREAKER.call(blob.download_to_filename, part, **timeout_kwargs(operation="gcs.download"))
+        except BaseException:
+            _remove(part)
+            raise
+        return part
+
+    @timed("gcs.read_bytes")
+    def read_bytes(self, remote_file_name: str, start: Optional[int] = None, end: Optional[int] = None) -> bytes:
+        """
+        Reads a blob, or the byte range ``start``..``end`` (inclusive) of it, into memory.
+        Hedged as "gcs.read" when enabled (see hedging). Gzip-encoded objects are inflated
+        when read whole; a byte range of one addresses its stored (compressed) bytes.
+
+        :param remote_file_name: Path or filename of the blob to read.
+        :param start: First byte to read.
+        :param end: Last byte to read.
+        :return: The bytes read.
+        """
+        try:
+            with TRANSFER_LIMIT.slot():
+                data = HEDGED_READS.call(self._read_range, remote_file_name, start, end)
+        except Exception:
+            TRANSFER_FAILURES.inc(direction="download")
+            raise
+        BYTES_TRANSFERRED.inc(len(data), direction="download")
+        return data
+
+    def _read_range(self, remote_file_name: str, start: Optional[int], end: Optional[int]) -> bytes:
         blob = self.bucket.blob(remote_file_name)
-        blob.download_to_filename(local_file_path)
-        log.debug(f"Downloaded {self.bucket_name}/{remote_file_name} to {local_file_path}.")
+        # A range of a gzip-encoded object is a slice of the stream; inflating it would fail.
+        ranged = {} if start is None and end is None else {"raw_download": True}
+        return BREAKER.call(
+            blob.download_as_bytes, start=start, end=end, **ranged, **timeout_kwargs(operation="gcs.read")
+        )
 
+    @timed("gcs.delete_file")
     def delete_file(self, remote_file_name: str) -> None:
         """
         Deletes a file. If remote_file_name is just a filename (no slashes)
@@ -89,5 +233,6 @@ class BucketManager:
         """
 
         blob = self.bucket.blob(remote_file_name)
-        blob.delete()
-        log.debug(f"Deleted {self.bucket_name}/{remote_file_name}.")
+        with TRANSFER_LIMIT.slot():
+            BREAKER.call(blob.delete, **timeout_kwargs(operation="gcs.delete"))
+        log.debug("Deleted {}/{}.", self.bucket_name, remote_file_name)
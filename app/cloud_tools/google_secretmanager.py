@@ -13,27 +13,83 @@ Dependancies
 """
 
 import io
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
 from loguru import logger as log
 from dotenv import dotenv_values
 from google.cloud import secretmanager
 
+from circuit_breaker import breaker
+from deadline import timeout_kwargs
+from hedging import hedger
+from metrics import counter
+from timing import timed
 
+from .shared_clients import get_client, peek_client
+
+BREAKER = breaker("secretmanager")
+HEDGER = hedger("secretmanager.get_secret")
+
+SECRET_FETCHES = counter("secretmanager_fetches", "Secret reads by source (api or cache).", ["source"])
+
+# Secrets fetched by prefetch_secrets(), keyed by full version name. Lives for the instance.
+_secret_cache: dict[str, str] = {}
+
+
+def _secret_name(secret_id: str, project_id: str, version: Optional[str]) -> str:
+    return f"projects/{project_id}/secrets/{secret_id}/versions/{version}"
+
+
+@timed("secretmanager.get_secret")
 def get_secret(secret_id: str, project_id: str, version: Optional[str] = "latest") -> str:
     """
     Retrieve the secret from Google Secret Manager.
+    Secrets loaded by prefetch_secrets() are served from memory. API reads are hedged as
+    "secretmanager.get_secret" when enabled (see hedging).
 
     :param secret_id: Name of the secret.
     :param project_id: Project id where the secret is stored.
     :param version: Version of the secret, defaults to 'latest'.
     :return: The secret as a string.
     """
-    client = secretmanager.SecretManagerServiceClient()
-    name = f"projects/{project_id}/secrets/{secret_id}/versions/{version}"
-    response = client.access_secret_version(name=name)
+    name = _secret_name(secret_id, project_id, version)
+    if (cached := _secret_cache.get(name)) is not None:
+        SECRET_FETCHES.inc(source="cache")
+        return cached
+    SECRET_FETCHES.inc(source="api")
+    client = peek_client("secretmanager") or secretmanager.SecretManagerServiceClient()
+    response = HEDGER.call(
+        BREAKER.call, client.access_secret_version, name=name, **timeout_kwargs(operation="secretmanager.access")
+    )
     return response.payload.data.decode("UTF-8")
 
 
+def prefetch_secrets(secret_ids: Iterable[str], project_id: str, version: Optional[str] = "latest") -> dict[str, str]:
+    """
+    Fetch several secrets concurrently and keep them in memory for later get_secret() calls.
+
+    :param secret_ids: Names of the secrets.
+    :param project_id: Project id where the secrets are stored.
+    :param version: Version of the secrets, defaults to 'latest'.
+    :return: Mapping of secret id to value.
+    """
+    secret_ids = list(dict.fromkeys(secret_ids))
+    if not secret_ids:
+        return {}
+    get_client("secretmanager")
+    with ThreadPoolExecutor(max_workers=len(secret_ids), thread_name_prefix="prefetch-secret") as pool:
+        values = list(pool.map(lambda secret_id: get_secret(secret_id, project_id, version), secret_ids))
+    for secret_id, value in zip(secret_ids, values):
+        _secret_cache[_secret_name(secret_id, project_id, version)] = value
+    log.debug("Prefetched {} secrets.", len(secret_ids))
+    return dict(zip(secret_ids, values))
+
+
+def clear_secret_cache() -> None:
+    """Forget every prefetched secret."""
+    _secret_cache.clear()
+
+
 def get_secret_env(secret_id: str, project_id: str, version: Optional[str] = "latest") -> dict[str, str | None]:
     """
     Retrieve and parse the secret as dotenv format.
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: shared_clients.py
+
+Instance-wide google-cloud clients, built once (typically from a startup hook) and
+reused by every manager created afterwards. SDKs are imported inside the factories
+so this module stays free to import.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Optional
+
+from loguru import logger as log
+
+
+def _bigquery_client() -> Any:
+    import google.auth  # pylint: disable=import-outside-toplevel
+    from google.cloud import bigquery  # pylint: disable=import-outside-toplevel
+
+    credentials, _ = google.auth.default()
+    return bigquery.Client(credentials=credentials)
+
+
+def _storage_client() -> Any:
+    from google.cloud import storage  # pylint: disable=import-outside-toplevel
+
+    return storage.Client()
+
+
+def _secretmanager_client() -> Any:
+    from google.cloud import secretmanager  # pylint: disable=import-outside-toplevel
+
+    return secretmanager.SecretManagerServiceClient()
+
+
+CLIENT_FACTORIES: dict[str, Callable[[], Any]] = {
+    "bigquery": _bigquery_client,
+    "storage": _storage_client,
+    "secretmanager": _secretmanager_client,
+}
+
+_clients: dict[str, Any] = {}
+_locks: dict[str, threading.Lock] = {kind: threading.Lock() for kind in CLIENT_FACTORIES}
+
+
+def get_client(kind: str) -> Any:
+    """
+    Returns the shared client of the given kind, building it on first use.
+
+    :param kind: One of CLIENT_FACTORIES ("bigquery", "storage", "secretmanager").
+    :return: The shared client.
+    """
+    if (client := _clients.get(kind)) is not None:
+        return client
+    if kind not in CLIENT_FACTORIES:
+        raise ValueError(f"Unknown client kind: {kind!r}")
+    with _locks[kind]:
+        if kind not in _clients:
+            _clients[kind] = CLIENT_FACTORIES[kind]()
+            log.debug("Built shared {} client.", kind)
+        return _clients[kind]
+
+
+def peek_client(kind: str) -> Optional[Any]:
+    """
+    Returns the shared client if one has already been built, without building it.
+
+    :param kind: Client kind.
+    """
+    return _clients.get(kind)
+
+
+def set_client(kind: str, client: Any) -> None:
+    """
+    Installs an externally built client as the shared one (emulators, local fakes).
+
+    :param kind: Client kind.
+    :param client: The client to share.
+    """
+    if kind not in CLIENT_FACTORIES:
+        raise ValueError(f"Unknown client kind: {kind!r}")
+    _clients[kind] = client
+
+
+def warm_clients(kinds: Iterable[str]) -> None:
+    """
+    Builds the shared clients for ``kinds`` so the first request does not pay for them.
+
+    :param kinds: Client kinds to build, concurrently.
+    """
+    kinds = list(dict.fromkeys(kinds))
+    if not kinds:
+        return
+    with ThreadPoolExecutor(max_workers=len(kinds), thread_name_prefix="warm-client") as pool:
+        list(pool.map(get_client, kinds))
+
+
+def clear_clients() -> None:
+    """Drops every shared client (used on shutdown and in tests)."""
+    _clients.clear()
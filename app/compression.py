@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: compression.py
+
+Gzip for request bodies sent to BigQuery (insertAll) and GCS (uploads).
+
+Each target is off until enabled with ``configure``. An enabled target compresses bodies of
+at least ``min_bytes`` and sends them with ``Content-Encoding: gzip``. It falls back to the
+plain body when gzip saves less than ``min_saving`` of it, e.g. for data that is already
+compressed. ``compression_bytes{target,stage}`` counts the bytes before ("plain") and after
+("wire") compression, so their ratio is the saving on egress.
+
+body, encoding = compress("bigquery", body)
+headers = {"Content-Encoding": encoding} if encoding else None
+"""
+
+import gzip
+import mimetypes
+import os
+import shutil
+from typing import Any, Optional
+
+from metrics import counter
+
+# Types whose bytes are compressed already; gzip would cost CPU and save nothing.
+_COMPRESSED_TYPES = (
+    "image/jpeg",
+    "image/png",
+    "image/webp",
+    "video/",
+    "audio/",
+    "application/zip",
+    "application/gzip",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-xz",
+)
+
+BYTES = counter("compression_bytes", "Request body bytes before (plain) and after (wire) gzip.", ["target", "stage"])
+
+_enabled: set[str] = set()
+_options: dict[str, Any] = {"level": 1, "min_bytes": 1024, "min_saving": 0.1}
+
+
+def configure(targets: Optional[list[str]] = None, **options: Any) -> None:
+    """
+    Sets the compressed targets and gzip options (e.g. from settings at startup).
+
+    :param targets: "bigquery" and/or "gcs"; None leaves them unchanged.
+    :param options: ``level`` (1-9), ``min_bytes`` and ``min_saving`` (fraction of the body).
+    """
+    if targets is not None:
+        _enabled.clear()
+        _enabled.update(targets)
+    _options.update(options)
+
+
+def enabled(target: str) -> bool:
+    return target in _enabled
+
+
+def compress(target: str, body: bytes) -> tuple[bytes, Optional[str]]:
+    """
+    Gzip ``body`` when ``target`` is enabled and it is worth it.
+
+    :param target: "bigquery" or "gcs".
+    :param body: The encoded request body.
+    :return: The body to send and its Content-Encoding (None when sent as is).
+    """
+    if target not in _enabled or len(body) < _options["min_bytes"]:
+        return body, None
+    packed = gzip.compress(body, compresslevel=_options["level"], mtime=0)
+    if len(packed) > len(body) * (1 - _options["min_saving"]):
+        return body, None
+    BYTES.inc(len(body), target=target, stage="plain")
+    BYTES.inc(len(packed), target=target, stage="wire")
+    return packed, "gzip"
+
+
+def compressible(path: str) -> bool:
+    """False for files whose name marks them as compressed (``.gz``, images, archives, ...)."""
+    content_type, encoding = mimetypes.guess_type(path)
+    if encoding is not None:
+        return False
+    return content_type is None or not content_type.startswith(_COMPRESSED_TYPES)
+
+
+def compress_file(target: str, path: str, destination: str) -> bool:
+    """
+    Gzip the file at ``path`` into ``destination`` when ``target`` is enabled and it is worth it.
+
+    :return: True when ``destination`` holds the compressed file to send instead of ``path``.
+    """
+    if target not in _enabled or not compressible(path):
+        return False
+    size = os.path.getsize(path)
+    if size < _options["min_bytes"]:
+        return False
+    with open(path, "rb") as src, gzip.GzipFile(destination, "wb", compresslevel=_options["level"], mtime=0) as out:
+        shutil.copyfileobj(src, out, 1024 * 1024)
+    packed = os.path.getsize(destination)
+    if packed > size * (1 - _options["min_saving"]):
+        os.unlink(destination)
+        return False
+    BYTES.inc(size, target=target, stage="plain")
+    BYTES.inc(packed, target=target, stage="wire")
+    return True
+
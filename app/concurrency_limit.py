@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: concurrency_limit.py
+
+Adaptive (AIMD) concurrency limits for outbound calls.
+
+Each backend ("bigquery.insert", "bigquery.query", "gcs") has one limiter per instance,
+shared by every request, thread and event loop. A call takes a slot before it starts and
+waits while ``limit`` calls are in flight. Each success while the limiter is at least half
+used raises the limit by ``increase / limit``, about ``increase`` per round of calls. A
+throttled call cuts it to ``decrease`` times its value. Throttling is HTTP 429 or a
+``rateLimitExceeded`` reason. A call slower than ``latency_tolerance`` times the average
+latency counts too, where enabled. Only calls started after the last cut can cut again, so
+one burst of throttling halves the limit once. The limit stays between ``min_limit`` and
+``max_limit``.
+
+async with limiter("bigquery.insert").async_slot() as slot:
+    errors = await loop.run_in_executor(None, insert)
+    if throttled(errors):
+        slot.throttled()
+
+with limiter("gcs").slot():
+    blob.upload_from_filename(path)
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from http import HTTPStatus
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from metrics import counter, gauge
+from registry import Registry
+
+THROTTLE_REASONS = frozenset({"rateLimitExceeded"})
+
+LIMIT = gauge("concurrency_limit", "Adaptive in-flight limit per backend.", ["backend"])
+IN_FLIGHT = gauge("concurrency_in_flight", "Calls in flight per backend.", ["backend"])
+DECREASES = counter("concurrency_limit_decreases", "Multiplicative limit cuts by cause.", ["backend", "cause"])
+
+
+def is_throttle(error: BaseException) -> bool:
+    """True for HTTP 429 and for errors whose reason is rateLimitExceeded (BigQuery's 403)."""
+    status = getattr(error, "code", None)
+    if status is None and (response := getattr(error, "response", None)) is not None:
+        status = getattr(response, "status_code", None)
+    if status == HTTPStatus.TOO_MANY_REQUESTS:
+        return True
+    details = getattr(error, "errors", None) or ()
+    return any(isinstance(detail, dict) and detail.get("reason") in THROTTLE_REASONS for detail in details)
+
+
+def throttled_rows(errors: Any) -> bool:
+    """True when insertAll row errors (``insert_rows_json`` format) report rate limiting."""
+    return any(
+        detail.get("reason") in THROTTLE_REASONS
+        for error in errors or ()
+        for detail in error.get("errors", ())
+        if isinstance(detail, dict)
+    )
+
+
+class Slot:
+    """
+    One admitted call; ``throttled()`` marks it as rate limited without raising.
+    """
+
+    __slots__ = ("generation", "started", "was_throttled")
+
+    def __init__(self, generation: int) -> None:
+        self.generation = generation
+        self.started = time.monotonic()
+        self.was_throttled = False
+
+    def throttled(self) -> None:
+        self.was_throttled = True
+
+
+class AdaptiveLimiter:
+    """
+    AIMD in-flight limit with a FIFO queue of waiting threads and coroutines.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        backend: str,
+        initial: float = 8.0,
+        min_limit: float = 1.0,
+        max_limit: float = 64.0,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_tolerance: Optional[float] = None,
+    ) -> None:
+        """
+        :param backend: Name used in metric labels.
+        :param initial: Limit before anything is learned.
+        :param min_limit: Lowest limit.
+        :param max_limit: Highest limit.
+        :param increase: Limit added per round of successful calls.
+        :param decrease: Factor applied to the limit on throttling.
+        :param latency_tolerance: Calls slower than this multiple of the average latency
+                                  count as throttled. None ignores latency.
+        """
+        self.backend = backend
+        self.limit = initial
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.average_latency: Optional[float] = None
+        self._generation = 0
+        self._waiters: deque[Callable[[], None]] = deque()
+        self._lock = threading.Lock()
+        LIMIT.set(initial, backend=backend)
+
+    def _grant_locked(self) -> list[Callable[[], None]]:
+        wakes = []
+        while self._waiters and self.in_flight < max(int(self.limit), 1):
+            self.in_flight += 1
+            wakes.append(self._waiters.popleft())
+        return wakes
+
+    def _enter(self, wake: Callable[[], None]) -> bool:
+        """Take a slot now, or queue ``wake`` to be called once a slot is handed over."""
+        with self._lock:
+            if not self._waiters and self.in_flight < max(int(self.limit), 1):
+                self.in_flight += 1
+                IN_FLIGHT.set(self.in_flight, backend=self.backend)
+                return True
+            self._waiters.append(wake)
+            return False
+
+    def _withdraw(self, wake: Callable[[], None]) -> bool:
+        """Remove a queued waiter; False when it was already handed a slot."""
+        with self._lock:
+            try:
+                self._waiters.remove(wake)
+            except ValueError:
+                return False
+            return True
+
+    def acquire(self, timeout: Optional[float] = None) -> Slot:
+        """
+        Take a slot, blocking the thread while the limit is reached.
+
+        :raises TimeoutError: When no slot was free within ``timeout`` seconds.
+        """
+        event = threading.Event()
+        if not self._enter(event.set) and not event.wait(timeout):
+            if self._withdraw(event.set):
+                raise TimeoutError(f"No {self.backend} slot within {timeout}s.")
+        return Slot(self._generation)
+
+    async def acquire_async(self) -> Slot:
+        """Take a slot, waiting without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+
+        def handover() -> None:
+            if future.cancelled():
+                self.release(None)
+            else:
+                future.set_result(None)
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(handover)
+
+        if not self._enter(wake):
+            try:
+                await future
+            except asyncio.CancelledError:
+                if not self._withdraw(wake) and future.done() and not future.cancelled():
+                    self.release(None)
+                raise
+        return Slot(self._generation)
+
+    def release(self, slot: Optional[Slot], error: Optional[BaseException] = None) -> None:
+        """
+        Free a slot and adjust the limit from the call's outcome.
+
+        :param slot: The slot, or None to free without learning (e.g. a cancelled wait).
+        :param error: The exception the call raised, if any.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if slot is not None:
+                self._learn(slot, error)
+            wakes = self._grant_locked()
+            IN_FLIGHT.set(self.in_flight, backend=self.backend)
+        for wake in wakes:
+            wake()
+
+    def _learn(self, slot: Slot, error: Optional[BaseException]) -> None:
+        """Caller holds the lock."""
+        latency = time.monotonic() - slot.started
+        cause = "throttle" if slot.was_throttled or (error is not None and is_throttle(error)) else None
+        if cause is None and error is None and self.latency_tolerance is not None:
+            average = self.average_latency
+            if average is not None and latency > average * self.latency_tolerance:
+                cause = "latency"
+            self.average_latency = latency if average is None else average + (latency - average) * 0.1
+        if cause is not None:
+            if slot.generation == self._generation:
+                self._generation += 1
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                DECREASES.inc(backend=self.backend, cause=cause)
+                LIMIT.set(self.limit, backend=self.backend)
+        elif error is None and self.in_flight * 2 + 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+            LIMIT.set(self.limit, backend=self.backend)
+
+    @contextmanager
+    def slot(self, timeout: Optional[float] = None) -> Iterator[Slot]:
+        """Hold a slot for the block (threads); its exception, if any, is the outcome."""
+        slot = self.acquire(timeout)
+        try:
+            yield slot
+        except BaseException as e:
+            self.release(slot, e)
+            raise
+        self.release(slot)
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[Slot]:
+        """Hold a slot for the block (coroutines); its exception, if any, is the outcome."""
+        slot = await self.acquire_async()
+        try:
+            yield slot
+        except BaseException as e:
+            self.release(slot, e)
+            raise
+        self.release(slot)
+
+
+# Latency only signals congestion where calls are of similar size.
+_DEFAULTS: dict[str, dict[str, Any]] = {"bigquery.insert": {"latency_tolerance": 3.0}}
+
+def _apply(existing: AdaptiveLimiter, options: dict[str, Any]) -> None:
+    for key, value in options.items():
+        if key != "initial":
+            setattr(existing, key, value)
+    existing.limit = min(max(existing.limit, existing.min_limit), existing.max_limit)
+
+
+_limiters: Registry[AdaptiveLimiter] = Registry(AdaptiveLimiter, _apply, _DEFAULTS)
+
+
+def limiter(backend: str) -> AdaptiveLimiter:
+    """The instance-wide limiter of ``backend``, created on first use."""
+    return _limiters.get(backend)
+
+
+def configure(**options: Any) -> None:
+    """
+    Sets AdaptiveLimiter options for every backend (e.g. from settings at startup).
+
+    :param options: AdaptiveLimiter keyword arguments except ``backend``; ``initial`` only
+                    applies to limiters created afterwards.
+    :raises TypeError: If an option is not an AdaptiveLimiter argument.
+    """
+    _limiters.configure(**options)
@@ -9,32 +9,39 @@ SPDX-License-Identifier: LicenseRef-NonCommercial-Only
 © 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
 Format docstrings according to PEP 287
 File: config.py
-uv add pydantic pydantic-settings pydantic[email] --no-cache-dir
+
+Application settings. ``settings`` is restored from the build-time snapshot when it matches
+the environment (see settings_snapshot) and validated with ``Settings()`` otherwise; the
+pydantic model in settings_model is only imported in the second case.
 """
 
-from pydantic import Field, EmailStr
-from pydantic_settings import BaseSettings
+import os
+from typing import Any
+
+from loguru import logger as log
+
+from settings_snapshot import ENV_FILE, SNAPSHOT_PATH, load_snapshot
+
+
+def __getattr__(name: str) -> Any:
+    if name == "Settings":
+        from settings_model import Settings  # pylint: disable=import-outside-toplevel
 
+        return Settings
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-class Settings(BaseSettings):
+
+def load_settings() -> Any:
     """
-    Configuration settings for the application.
-    Loads environment variables from `project.env` file and provides type-safe access
-    to application settings.
+    :return: FrozenSettings from the snapshot, or a validated Settings.
     """
-    service_name: str = Field(..., alias="SERVICE_NAME")
-    project_id: str = Field(..., alias="PROJECT_ID")
-    region: str = Field(..., alias="REGION")
-    runtime: str = Field(..., alias="RUNTIME")
-    timeout: int = Field(..., alias="TIMEOUT")
-    runtime_service_account_email: EmailStr = Field(..., alias="RUNTIME_SERVICE_ACCOUNT_EMAIL")
-    discord_hook_url: str = Field(..., alias="DISCORD_HOOK_URL")
-
-    model_config = {
-        "env_file": "project.env",
-        "case_sensitive": False,
-        "extra": "allow",
-    }
-
-
-settings = Settings()
+    if (snapshot := load_snapshot()) is not None:
+        return snapshot
+    from settings_model import Settings  # pylint: disable=import-outside-toplevel
+
+    if SNAPSHOT_PATH.is_file() and not os.path.isfile(ENV_FILE):
+        log.warning(f"{SNAPSHOT_PATH.name} is stale (environment or settings model changed); validating settings.")
+    return Settings()
+
+
+settings = load_settings()
@@ -15,3 +15,16 @@ File: custom_exceptions.py
 
 class ConfigurationError(Exception):
     """Custom exception for configuration errors."""
+
+
+class RowValidationError(ValueError):
+    """A row does not match its BigQuery table schema."""
+
+
+class CircuitOpenError(Exception):
+    """A dependency's circuit breaker is open; the call was not attempted."""
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"Circuit {name} is open; retry in {retry_after:.1f}s.")
+        self.name = name
+        self.retry_after = retry_after
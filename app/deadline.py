@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: deadline.py
+
+Per-request deadline.
+
+``start_request()`` in main sets a deadline TIMEOUT seconds from the start of the request in a
+context variable, which follows the request into lifecycle.run() coroutines. The last
+``reserve`` seconds are kept for the handle_return notification. Managers ask
+``rpc_timeout()`` for the timeout of their next call: the remaining work budget, capped by
+their own default. Once the budget is spent, ``rpc_timeout()`` and ``check()`` raise
+DeadlineExceeded, so a doomed request stops before it starts more RPCs. ``notify_timeout()``
+hands out the reserved remainder. Without an active deadline (startup hooks, background
+flushes, tests) every call keeps its own default.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from metrics import counter
+
+DEADLINE_EXCEEDED = counter("deadline_exceeded", "Calls refused because the request deadline was spent.", ["operation"])
+
+# Below this, a notification is not worth attempting.
+MIN_NOTIFY_TIMEOUT = 0.5
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's work budget is spent."""
+
+
+class Deadline:
+    """
+    Absolute end of a request, on the monotonic clock.
+    """
+
+    __slots__ = ("expires_at", "reserve")
+
+    def __init__(self, seconds: float, reserve: float = 0.0) -> None:
+        """
+        :param seconds: Time the platform allows the request.
+        :param reserve: Final seconds kept for the notification, not handed to RPCs.
+        """
+        self.expires_at = time.monotonic() + seconds
+        self.reserve = min(reserve, seconds)
+
+    def remaining(self) -> float:
+        """Seconds until the platform ends the request."""
+        return self.expires_at - time.monotonic()
+
+    def budget(self) -> float:
+        """Seconds left for work before the reserve."""
+        return self.remaining() - self.reserve
+
+    def check(self, operation: str = "request") -> None:
+        """:raises DeadlineExceeded: If the work budget is spent."""
+        if self.budget() <= 0:
+            DEADLINE_EXCEEDED.inc(operation=operation)
+            raise DeadlineExceeded(f"{operation}: request deadline reached ({self.reserve:.1f}s kept for the notification).")
+
+    def timeout(self, default: Optional[float] = None, operation: str = "request") -> float:
+        """
+        Timeout for the next call: the work budget, capped by ``default``.
+
+        :raises DeadlineExceeded: If the work budget is spent.
+        """
+        self.check(operation)
+        budget = self.budget()
+        return budget if default is None else min(default, budget)
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+def start_request(seconds: float, reserve: float = 0.0) -> Deadline:
+    """Set the deadline of the request handled in the current context."""
+    deadline = Deadline(seconds, reserve)
+    _current.set(deadline)
+    return deadline
+
+
+def end_request() -> None:
+    _current.set(None)
+
+
+def current() -> Optional[Deadline]:
+    """The active request's deadline, if any."""
+    return _current.get()
+
+
+def check(operation: str = "request") -> None:
+    """:raises DeadlineExceeded: If a request deadline is active and its budget is spent."""
+    if (deadline := _current.get()) is not None:
+        deadline.check(operation)
+
+
+def budget() -> float:
+    """Seconds of work budget left; infinite without a deadline."""
+    deadline = _current.get()
+    return deadline.budget() if deadline is not None else float("inf")
+
+
+def rpc_timeout(default: Optional[float] = None, operation: str = "request") -> Optional[float]:
+    """
+    ``default`` without a deadline, otherwise the work budget capped by ``default``.
+
+    :raises DeadlineExceeded: If the work budget is spent.
+    """
+    deadline = _current.get()
+    return default if deadline is None else deadline.timeout(default, operation)
+
+
+def timeout_kwargs(default: Optional[float] = None, operation: str = "request") -> dict[str, Any]:
+    """``{"timeout": rpc_timeout(...)}``, or ``{}`` when that is None, for client methods."""
+    timeout = rpc_timeout(default, operation)
+    return {} if timeout is None else {"timeout": timeout}
+
+
+def notify_timeout(default: float) -> float:
+    """
+    Timeout for the final notification: what is left of the request including the reserve,
+    capped by ``default``.
+    """
+    deadline = _current.get()
+    if deadline is None:
+        return default
+    return max(min(default, deadline.remaining()), MIN_NOTIFY_TIMEOUT)
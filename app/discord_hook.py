@@ -15,16 +15,31 @@ File: discord_hook.py
 
 import asyncio
 import io
-import json
 import os
 from dataclasses import dataclass, field
-from typing import Any, Optional, Tuple
+from typing import Any, Callable, Optional, Tuple, Union
 
 import httpx
 from loguru import logger as log
 
+import deadline
+import memory_watchdog
+import notify_routing
+import serialization
+from circuit_breaker import breaker
+from custom_exceptions import CircuitOpenError
+from lifecycle import lifecycle, on_shutdown, on_startup
+from metrics import counter
+from timing import timed
+
 MAX_LEN = 2000
+BREAKER = breaker("discord")
+# Timeout of the handle_return notification, shortened to what the request deadline leaves.
+NOTIFY_TIMEOUT = 10.0
 MAX_VISIBLE_ERROR_LENGTH = 1000
+# Attachments keep the last this many bytes; shrunk under memory pressure (see memory_watchdog).
+MAX_ATTACHMENT_BYTES = 8 * 1024 * 1024
+MIN_ATTACHMENT_BYTES = 64 * 1024
 DISCORD_AT_MENTION = os.environ.get("DISCORD_AT_MENTION", "")
 DEFAULT_MESSAGE_FORMATS: dict[str, str] = {
     "default": "{message}",
@@ -38,6 +53,32 @@ DEFAULT_MESSAGE_FORMATS: dict[str, str] = {
     "code": "```{message}```",
 }
 
+WEBHOOK_SENDS = counter("discord_webhook_sends", "Discord webhook sends by outcome.", ["status"])
+
+# Pooled client shared by every send; it lives on the lifecycle loop between requests.
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client(timeout: float = 10.0) -> httpx.AsyncClient:
+    """Returns the pooled httpx client, creating it on first use."""
+    global _http_client  # pylint: disable=global-statement  # noqa: PLW0603
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=timeout)
+    return _http_client
+
+
+@on_startup
+def _open_http_client() -> None:
+    get_http_client()
+
+
+@on_shutdown
+async def _close_http_client() -> None:
+    global _http_client  # pylint: disable=global-statement  # noqa: PLW0603
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 @dataclass
 class DiscordAttachment:
@@ -54,12 +95,17 @@ class DiscordAttachment:
             self.prepared = False
             return False
         try:
-            attachment_bytes = self.content.encode("utf-8")
+            limit = memory_watchdog.watchdog.scaled(MAX_ATTACHMENT_BYTES, MIN_ATTACHMENT_BYTES)
+            if len(self.content) > limit:
+                # Slice before encoding so the full text is never copied; tracebacks end with the cause.
+                attachment_bytes = b"... [truncated]\n" + self.content[-limit:].encode("utf-8")[-limit:]
+            else:
+                attachment_bytes = self.content.encode("utf-8")
             self.buffer = io.BytesIO(attachment_bytes)
             self.prepared = True
             return True
         except (UnicodeEncodeError, MemoryError, OSError) as buf_err:
-            log.exception(f"Failed to create file buffer for attachment. Error: {buf_err}")
+            log.exception("Failed to create file buffer for attachment. Error: {}", buf_err)
             self.prepared = False
             return False
 
@@ -88,31 +134,36 @@ def _format_discord_message(
     try:
         formatted_message = format_string.format(message=message)
     except KeyError as fmt_err:
-        log.error(f"{func_name}: Invalid format key {fmt_err}. Using raw.")
+        log.error("{}: Invalid format key {}. Using raw.", func_name, fmt_err)
         formatted_message = message
 
     if len(formatted_message) > MAX_LEN:
-        log.warning(f"{func_name}: Message length ({len(formatted_message)}) exceeds {MAX_LEN}. Truncating.")
+        log.warning("{}: Message length ({}) exceeds {}. Truncating.", func_name, len(formatted_message), MAX_LEN)
         formatted_message = f"{formatted_message[:MAX_LEN - 10]}... [CUT]"
     return formatted_message
 
 
+def _json_args(payload: dict[str, Any]) -> dict[str, Any]:
+    """Request args for a JSON body encoded by the configured serializer."""
+    return {"content": serialization.dumps(payload), "headers": {"Content-Type": "application/json"}}
+
+
 def _prepare_request_args(formatted_message: str, attachment: Optional[DiscordAttachment]) -> dict[str, Any]:
     """Prepares arguments for httpx.post based on attachment presence."""
     payload_json = {"content": formatted_message}
-    request_args: dict[str, Any] = {"json": payload_json}
+    request_args = _json_args(payload_json)
 
     if attachment and attachment.prepare():
         if file_tuple := attachment.get_file_tuple():
             request_args = {
-                "data": {"payload_json": json.dumps(payload_json)},
+                "data": {"payload_json": serialization.dumps_str(payload_json)},
                 "files": {"file": file_tuple},
             }
         else:
             payload_json["content"] += "\n\n⚠️ *Failed to attach error log.*"
             if len(payload_json["content"]) > MAX_LEN:
                 payload_json["content"] = f"{payload_json['content'][:MAX_LEN - 10]}... [CUT]"
-            request_args = {"json": payload_json}
+            request_args = _json_args(payload_json)
     return request_args
 
 
@@ -120,22 +171,28 @@ async def _send_request(client: httpx.AsyncClient, webhook_url: str, request_arg
     """Sends the HTTP request using httpx."""
     func_name = "send_discord_message._send_request"
     try:
-        response = await client.post(webhook_url, **request_args)
-        response.raise_for_status()
-        log.debug(f"{func_name}: Discord message sent (status {response.status_code}).")
+        with BREAKER.guard():
+            response = await client.post(webhook_url, **request_args)
+            response.raise_for_status()
+        log.debug("{}: Discord message sent (status {}).", func_name, response.status_code)
         return True
+    except CircuitOpenError as e:
+        log.warning("{}: Discord message dropped: {}", func_name, e)
     except httpx.HTTPStatusError as e:
-        log.warning(f"HTTP error in {func_name}: Status {e.response.status_code} for URL {e.request.url}. Response: {e.response.text}")
+        log.warning(
+            "HTTP error in {}: Status {} for URL {}. Response: {}", func_name, e.response.status_code, e.request.url, e.response.text
+        )
     except httpx.RequestError as e:
         url_str = str(e.request.url) if e.request else "unknown URL"
-        log.error(f"Network error in {func_name} sending to {url_str}: {type(e).__name__} - {e}")
+        log.error("Network error in {} sending to {}: {} - {}", func_name, url_str, type(e).__name__, e)
     except (ValueError, TypeError, KeyError) as e:
-        log.exception(f"Unexpected error during HTTP request in {func_name}: {type(e).__name__} - {e}")
+        log.exception("Unexpected error during HTTP request in {}: {} - {}", func_name, type(e).__name__, e)
     return False
 
 
 # ruff: noqa: PLR0913
 # pylint: disable=too-many-arguments, too-many-positional-arguments
+@timed("discord.send_message")
 async def send_discord_message(
     webhook_url: str,
     message: str,
@@ -143,6 +200,7 @@ async def send_discord_message(
     message_formats: Optional[dict[str, str]] = None,
     timeout: float = 10.0,
     attachment: Optional[DiscordAttachment] = None,
+    client: Optional[httpx.AsyncClient] = None,
 ) -> bool | None:
     """Sends a formatted message asynchronously to Discord.
 
@@ -157,6 +215,8 @@ async def send_discord_message(
                          Defaults to DEFAULT_MESSAGE_FORMATS.
         timeout: Request timeout in seconds.
         attachment: A DiscordAttachment object with content and filename.
+        client: Pooled client to send with (left open). A short-lived client
+                is created when omitted.
 
     Returns:
         True if the message was successfully sent, False otherwise.
@@ -164,10 +224,10 @@ async def send_discord_message(
     func_name = "send_discord_message"
 
     if not webhook_url or not isinstance(webhook_url, str):
-        log.warning(f"{func_name}: Discord webhook URL invalid.")
+        log.warning("{}: Discord webhook URL invalid.", func_name)
         return False
     if not message and not (attachment and attachment.content):
-        log.warning(f"{func_name}: Message empty and no attachment. Sending aborted.")
+        log.warning("{}: Message empty and no attachment. Sending aborted.", func_name)
         return False
     if not message:
         message = ""
@@ -177,43 +237,98 @@ async def send_discord_message(
     success = False
 
     try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            success = await _send_request(client, webhook_url, request_args)
+        if client is not None:
+            success = await _send_request(client, webhook_url, {**request_args, "timeout": timeout})
+        else:
+            async with httpx.AsyncClient(timeout=timeout) as own_client:
+                success = await _send_request(own_client, webhook_url, request_args)
     except (httpx.HTTPError, OSError, ValueError) as client_err:
-        log.exception(f"Unexpected error creating/using httpx client in {func_name}: {client_err}")
+        log.exception("Unexpected error creating/using httpx client in {}: {}", func_name, client_err)
         success = False
     finally:
         if attachment:
             attachment.close()
 
+    WEBHOOK_SENDS.inc(status="ok" if success else "failed")
     return success
 
 
-def handle_return(url: str, message: str, error: Optional[str] = None) -> dict[str, Any]:
+async def notify_all(
+    webhook_urls: list[str],
+    message: str,
+    msg_type: str = "default",
+    timeout: float = 10.0,
+    attachment_content: Optional[str] = None,
+    attachment_filename: str = "error.log",
+) -> list[bool]:
+    """Sends one message to several webhooks concurrently over the pooled client.
+
+    Args:
+        webhook_urls: Destinations, e.g. from notify_routing.destinations().
+        message: The core content of the message.
+        msg_type: Key for message format in `DEFAULT_MESSAGE_FORMATS`.
+        timeout: Request timeout in seconds, per webhook.
+        attachment_content: Attached to every message when given (one buffer per webhook).
+        attachment_filename: Name of the attachment.
+
+    Returns:
+        Per webhook, True if the message was sent.
+    """
+    client = get_http_client()
+
+    async def send(url: str) -> bool:
+        attachment = (
+            DiscordAttachment(content=attachment_content, filename=attachment_filename)
+            if attachment_content is not None
+            else None
+        )
+        return bool(
+            await send_discord_message(
+                webhook_url=url, message=message, msg_type=msg_type, timeout=timeout, attachment=attachment, client=client
+            )
+        )
+
+    results = await asyncio.gather(*(send(url) for url in webhook_urls), return_exceptions=True)
+    for url, result in zip(webhook_urls, results):
+        if isinstance(result, BaseException):
+            log.opt(exception=result).error("Notification to {} failed: {}", httpx.URL(url).host, result)
+    return [result is True for result in results]
+
+
+def handle_return(
+    url: Union[str, Callable[[], str]],
+    message: str,
+    error: Optional[str] = None,
+    timings: Optional[dict[str, Any]] = None,
+) -> dict[str, Any]:
     """Handles return value, prepares Discord msg, sends status update.
 
     Prepares Discord message by potentially truncating the visible error
     and attaching the full error log. Sends the update via Discord.
 
     Args:
-        url: The webhook URL for the status update.
+        url: The webhook URL for the status update. With NOTIFY_ROUTES set the
+            routing table picks the webhooks instead (see notify_routing); they
+            are sent to concurrently. A callable is only called when its URL is
+            needed, so a secret-backed setting is not fetched for nothing; a
+            failure to get it is logged and the notification skipped.
         message: The original message or operation description.
         error: The full error message (potentially including traceback).
+        timings: Optional per-request timing breakdown to include in the payload.
+            Memory use, peak and pressure (memory_watchdog) are always included.
+
+    The notification is sent within what the request deadline leaves, which
+    includes the slice main reserves for it (DEADLINE_RESERVE).
 
     Returns:
         A dictionary containing the status details (with full error).
     """
     is_failure = error is not None
     visible_error_snippet = ""
-    attachment: Optional[DiscordAttachment] = None
     _ = ""
     msg_format = "success"
 
     if is_failure and error is not None:
-        attachment = DiscordAttachment(
-            content=error,
-            filename=f"{os.getenv('K_SERVICE', 'app')}_error.log",
-        )
         msg_format = "error"
 
         if len(error) > MAX_VISIBLE_ERROR_LENGTH:
@@ -231,19 +346,33 @@ def handle_return(url: str, message: str, error: Optional[str] = None) -> dict[s
         "target-function": os.getenv("FUNCTION_TARGET", "unknown"),
         "error": (visible_error_snippet if is_failure else ""),
     }
+    if timings:
+        result_status["timings"] = timings
+    result_status["memory"] = memory_watchdog.request_report()
 
     try:
-        asyncio.run(
-            send_discord_message(
-                webhook_url=url,
-                message=json.dumps(result_status, ensure_ascii=False),
+        webhook_urls = notify_routing.destinations(msg_format, url)
+    except Exception as e:  # pylint: disable=W0718
+        log.error("Could not send Discord notification: webhook URL unavailable: {}", e)
+        return result_status
+    if not webhook_urls:
+        return result_status
+    timeout = deadline.notify_timeout(NOTIFY_TIMEOUT)
+    try:
+        lifecycle.run(
+            notify_all(
+                webhook_urls,
+                serialization.dumps_str(result_status),
                 msg_type=msg_format,
-                attachment=attachment,
-            )
+                timeout=timeout,
+                attachment_content=error,
+                attachment_filename=f"{os.getenv('K_SERVICE', 'app')}_error.log",
+            ),
+            timeout if deadline.current() is not None else None,
         )
     except RuntimeError as re:
-        log.error(f"Could not send Discord notification: asyncio error: {re}")
+        log.error("Could not send Discord notification: lifecycle loop error: {}", re)
     except (httpx.HTTPError, OSError, ValueError) as e:
-        log.exception(f"Failed to send Discord notification within handle_return: {e}")
+        log.exception("Failed to send Discord notification within handle_return: {}", e)
 
     return result_status
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: hedging.py
+
+Hedged requests for idempotent reads.
+
+A hedged call starts one attempt. If the attempt has not answered after the operation's
+``percentile`` latency (p95 of its recent attempts), a second attempt is started. The first
+attempt to succeed wins; the other is cancelled, or its result discarded when it already
+runs in a thread. Until ``min_samples`` latencies are known, calls are not hedged. Each call
+earns ``budget_ratio`` of a hedge, so hedges add at most that fraction of extra load (5% by
+default), with bursts up to ``burst`` hedges.
+
+Hedging is opt-in per operation (HEDGE_OPERATIONS): "gcs.download", "gcs.read",
+"secretmanager.get_secret" and "bigquery.job_poll". Disabled operations run unchanged.
+
+data = hedger("gcs.read").call(blob.download_as_bytes, start=0, end=1023)
+done = await hedger("bigquery.job_poll").run(lambda: loop.run_in_executor(None, job.done))
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable, Iterable, Optional, TypeVar
+
+from loguru import logger as log
+
+from metrics import counter
+from registry import Registry
+
+T = TypeVar("T")
+
+HEDGES = counter("hedged_requests", "Second attempts of hedged calls by outcome.", ["operation", "outcome"])
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool  # pylint: disable=global-statement  # noqa: PLW0603
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+    return _pool
+
+
+class Hedger:
+    """
+    Latency percentile and hedge budget of one operation.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        operation: str,
+        enabled: bool = False,
+        percentile: float = 0.95,
+        budget_ratio: float = 0.05,
+        burst: float = 10.0,
+        min_samples: int = 20,
+        window: int = 200,
+        min_delay: float = 0.005,
+    ) -> None:
+        """
+        :param operation: Name used in HEDGE_OPERATIONS and metric labels.
+        :param enabled: Hedge calls; otherwise call() and run() just call through.
+        :param percentile: Attempt latency after which the hedge is sent.
+        :param budget_ratio: Hedges earned per call; the cap on extra load.
+        :param burst: Most hedges that can be saved up.
+        :param min_samples: Latencies needed before calls are hedged.
+        :param window: Recent latencies the percentile is taken over.
+        :param min_delay: Shortest hedge delay.
+        """
+        self.operation = operation
+        self.enabled = enabled
+        self.percentile = percentile
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self._latencies: deque[float] = deque(maxlen=window)
+        self._tokens = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Record the latency of one finished attempt."""
+        self._latencies.append(seconds)
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while too few latencies are known."""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return max(ordered[min(int(len(ordered) * self.percentile), len(ordered) - 1)], self.min_delay)
+
+    def _earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self._tokens + self.budget_ratio, self.burst)
+
+    def _spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                HEDGES.inc(operation=self.operation, outcome="over_budget")
+                return False
+            self._tokens -= 1.0
+        HEDGES.inc(operation=self.operation, outcome="sent")
+        return True
+
+    def _timed(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        start = time.monotonic()
+        result = func(*args, **kwargs)
+        self.observe(time.monotonic() - start)
+        return result
+
+    def _submit(self, func: Callable[..., T], args: tuple, kwargs: dict[str, Any]) -> Future:
+        # Each attempt gets its own copy: the request deadline and log context follow it.
+        context = contextvars.copy_context()
+        return _executor().submit(context.run, self._timed, func, *args, **kwargs)
+
+    def call(
+        self, func: Callable[..., T], *args: Any, discard: Optional[Callable[[T], None]] = None, **kwargs: Any
+    ) -> T:
+        """
+        ``func(*args, **kwargs)`` from a thread, hedged when enabled. Attempts run on a shared
+        pool; the losing attempt cannot be stopped, its result is passed to ``discard``.
+
+        :param func: Idempotent blocking call.
+        :param discard: Cleans up the result of an attempt that lost (e.g. removes its file).
+        """
+        if not self.enabled:
+            return func(*args, **kwargs)
+        self._earn()
+        if (delay := self.delay()) is None:
+            return self._timed(func, *args, **kwargs)
+        primary = self._submit(func, args, kwargs)
+        if wait([primary], timeout=delay).done or not self._spend():
+            return primary.result()
+        hedge = self._submit(func, args, kwargs)
+        return self._first_success([primary, hedge], hedge, discard)
+
+    def _first_success(self, attempts: list[Future], hedge: Future, discard: Optional[Callable[[Any], None]]) -> Any:
+        pending = set(attempts)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is not None:
+                    error = error or attempt.exception()
+                    continue
+                for loser in pending:
+                    if not loser.cancel() and discard is not None:
+                        loser.add_done_callback(_discarding(discard))
+                if attempt is hedge:
+                    HEDGES.inc(operation=self.operation, outcome="won")
+                return attempt.result()
+        assert error is not None
+        raise error
+
+    async def run(self, attempt: Callable[[], Awaitable[T]]) -> T:
+        """
+        Await ``attempt()``, hedged when enabled; the losing attempt is cancelled.
+
+        :param attempt: Starts one idempotent attempt each time it is called.
+        """
+        if not self.enabled:
+            return await attempt()
+        self._earn()
+        loop = asyncio.get_running_loop()
+
+        def start() -> asyncio.Future:
+            started = loop.time()
+            future = asyncio.ensure_future(attempt())
+            future.add_done_callback(
+                lambda f: None if f.cancelled() or f.exception() else self.observe(loop.time() - started)
+            )
+            return future
+
+        if (delay := self.delay()) is None:
+            return await start()
+        attempts = [start()]
+        error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            if done or not self._spend():
+                return await attempts[0]
+            attempts.append(start())
+            pending = set(attempts)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is not None:
+                        error = error or finished.exception()
+                        continue
+                    if finished is attempts[1]:
+                        HEDGES.inc(operation=self.operation, outcome="won")
+                    return finished.result()
+        finally:
+            for loser in attempts:
+                loser.cancel()
+        assert error is not None
+        raise error
+
+
+def _discarding(discard: Callable[[Any], None]) -> Callable[[Future], None]:
+    def callback(future: Future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        try:
+            discard(future.result())
+        except Exception as e:  # pylint: disable=W0718
+            log.warning("Discarding a hedged result failed: {}", e)
+
+    return callback
+
+
+def _apply(existing: Hedger, options: dict[str, Any]) -> None:
+    for key, value in options.items():
+        if key == "window":
+            existing._latencies = deque(existing._latencies, maxlen=value)  # pylint: disable=protected-access
+        else:
+            setattr(existing, key, value)
+
+
+_hedgers: Registry[Hedger] = Registry(Hedger, _apply, fixed=["enabled"])
+_enabled: set[str] = set()
+
+
+def hedger(operation: str) -> Hedger:
+    """The instance-wide Hedger of ``operation``, created on first use."""
+    return _hedgers.get(operation, enabled=operation in _enabled)
+
+
+def configure(operations: Optional[Iterable[str]] = None, **options: Any) -> None:
+    """
+    Enables hedging for ``operations`` and sets Hedger options (e.g. from settings at startup).
+
+    :param operations: Operations to hedge; the others are disabled. None keeps the current set.
+    :param options: Hedger keyword arguments except ``operation`` and ``enabled``.
+    :raises TypeError: If an option is not one of those arguments.
+    """
+    _hedgers.configure(**options)
+    if operations is not None:
+        _enabled.clear()
+        _enabled.update(operations)
+    for existing in _hedgers:
+        existing.enabled = existing.operation in _enabled
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: lifecycle.py
+
+Instance lifecycle: one-time startup/shutdown hooks and a background event loop.
+
+Startup hooks run concurrently once per instance (cold start), shutdown hooks run in
+reverse registration order on SIGTERM or interpreter exit. The background loop outlives
+individual requests, so pooled async resources (e.g. the Discord httpx client) can be
+reused across requests instead of being rebuilt inside a fresh ``asyncio.run`` each time.
+"""
+
+import asyncio
+import atexit
+import inspect
+import os
+import signal
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+from loguru import logger as log
+
+Hook = Callable[[], Any]
+T = TypeVar("T")
+HookT = TypeVar("HookT", bound=Hook)
+
+
+class Lifecycle:
+    """
+    Registry of startup/shutdown hooks plus the instance-wide background event loop.
+    """
+
+    def __init__(self) -> None:
+        self.startup_hooks: list[Hook] = []
+        self.shutdown_hooks: list[Hook] = []
+        self.started = False
+        self.stopped = False
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def on_startup(self, func: HookT) -> HookT:
+        """
+        Registers a sync or async callable to run once when the instance starts.
+
+        :param func: Hook to register; returned unchanged so this works as a decorator.
+        """
+        self.startup_hooks.append(func)
+        return func
+
+    def on_shutdown(self, func: HookT) -> HookT:
+        """
+        Registers a sync or async callable to run once when the instance shuts down.
+
+        :param func: Hook to register; returned unchanged so this works as a decorator.
+        """
+        self.shutdown_hooks.append(func)
+        return func
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Returns the background event loop, starting its thread on first use."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="lifecycle-loop", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def in_loop_thread(self) -> bool:
+        """True when called from the background loop's own thread."""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        """
+        Schedules a coroutine on the background loop without waiting for it.
+
+        :param coro: Coroutine to run.
+        :return: A concurrent.futures.Future for the result.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.get_loop())
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """
+        Runs a coroutine on the background loop and blocks until it finishes.
+
+        :param coro: Coroutine to run.
+        :param timeout: Seconds to wait before raising TimeoutError.
+        :return: The coroutine's result.
+        """
+        if self.in_loop_thread():
+            coro.close()
+            raise RuntimeError("Lifecycle.run() called from the lifecycle loop; await the coroutine instead.")
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def startup(self, timeout: Optional[float] = None) -> None:
+        """
+        Runs every startup hook concurrently, once. Hook failures are logged, not raised:
+        warm-up is an optimisation and the resource is built lazily on first use instead.
+        Hooks still running after ``timeout`` are logged and left to finish in the background.
+
+        :param timeout: Seconds to wait for all hooks.
+        """
+        with self._lock:
+            if self.started:
+                return
+            self.started = True
+        future = self.submit(self._run_hooks(self.startup_hooks, concurrent=True))
+        try:
+            future.result(timeout)
+        except TimeoutError:
+            log.warning(f"Startup hooks did not finish within {timeout}s; they continue in the background.")
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """
+        Runs every shutdown hook in reverse registration order, once, then stops the loop.
+
+        :param timeout: Seconds to wait for all hooks.
+        """
+        with self._lock:
+            if self.stopped:
+                return
+            self.stopped = True
+        try:
+            self.run(self._run_hooks(list(reversed(self.shutdown_hooks)), concurrent=False), timeout)
+        except TimeoutError:
+            log.error(f"Shutdown hooks did not finish within {timeout}s.")
+        finally:
+            self._stop_loop()
+
+    def install_signal_handlers(self, timeout: Optional[float] = None) -> None:
+        """
+        Runs shutdown on SIGTERM, then defers to the previously installed handler.
+        Also registers shutdown with atexit. Must be called from the main thread.
+
+        :param timeout: Seconds to give the shutdown hooks.
+        """
+        atexit.register(self.shutdown, timeout)
+        if threading.current_thread() is not threading.main_thread():
+            log.debug("Not in main thread; SIGTERM handler not installed.")
+            return
+
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def _handle_sigterm(signum: int, frame: Any) -> None:
+            log.info("SIGTERM received, running shutdown hooks.")
+            self.shutdown(timeout)
+            if callable(previous):
+                previous(signum, frame)
+            elif previous == signal.SIG_DFL:
+                signal.signal(signum, signal.SIG_DFL)
+                os.kill(os.getpid(), signum)
+
+        signal.signal(signal.SIGTERM, _handle_sigterm)
+
+    @staticmethod
+    async def _call(hook: Hook) -> None:
+        name = getattr(hook, "__qualname__", repr(hook))
+        try:
+            if inspect.iscoroutinefunction(hook):
+                await hook()
+            else:
+                await asyncio.to_thread(hook)
+            log.debug(f"Lifecycle hook {name} finished.")
+        except Exception as e:  # pylint: disable=W0718
+            log.opt(exception=e).error(f"Lifecycle hook {name} failed: {e}")
+
+    async def _run_hooks(self, hooks: list[Hook], concurrent: bool) -> None:
+        if concurrent:
+            await asyncio.gather(*(self._call(hook) for hook in hooks))
+            return
+        for hook in hooks:
+            await self._call(hook)
+
+    def _stop_loop(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+            if not loop.is_running():
+                loop.close()
+
+
+lifecycle = Lifecycle()
+on_startup = lifecycle.on_startup
+on_shutdown = lifecycle.on_shutdown
@@ -1,26 +1,188 @@
 import traceback
 from typing import Any
 
-import pendulum
-from loguru import logger as log
-
+import circuit_breaker
+import compression
+import concurrency_limit
+import deadline
+import hedging
+import memory_watchdog
+import metrics
+import notify_routing
+import profiling
+import streaming
+import structured_logging
+import timing
 from discord_hook import handle_return
 from config import settings
+from lifecycle import lifecycle, on_shutdown, on_startup
 
+structured_logging.install(settings.log_level, settings.log_format, settings.project_id)
+notify_routing.configure(settings.notify_routes)
+# Registered first so it runs after every other shutdown hook has logged.
+on_shutdown(structured_logging.flush)
+
+
+@on_startup
+def warm_clients() -> None:
+    """Pre-builds the google-cloud clients listed in WARM_CLIENTS (e.g. "bigquery,storage")."""
+    if kinds := settings.split_list(settings.warm_clients):
+        from cloud_tools.shared_clients import warm_clients as warm  # pylint: disable=import-outside-toplevel
+
+        warm(kinds)
+
+
+@on_startup
+def prefetch_secrets() -> None:
+    """Loads the secrets listed in PREFETCH_SECRETS into memory before the first request."""
+    if secret_ids := settings.split_list(settings.prefetch_secrets):
+        from cloud_tools.google_secretmanager import prefetch_secrets as prefetch  # pylint: disable=import-outside-toplevel
+
+        prefetch(secret_ids, settings.project_id)
+
+
+@on_startup
+def prewarm_tables() -> None:
+    """Applies TABLE_CACHE_TTL to the table metadata cache and caches the tables listed in PREWARM_TABLES."""
+    from cloud_tools import bigquery_metadata  # pylint: disable=import-outside-toplevel
+
+    # In this hook rather than its own, so the TTL is set before prewarmed entries are stored.
+    bigquery_metadata.configure(ttl=settings.table_cache_ttl)
+    if table_names := settings.split_list(settings.prewarm_tables):
+        bigquery_metadata.prewarm_tables(table_names)
+
+
+@on_startup
+def configure_write_buffer() -> None:
+    """Applies the BQ_BUFFER_* limits to the BigQuery write-behind buffer (BigQueryManager.insert_buffered)."""
+    from cloud_tools.bigquery_buffer import configure  # pylint: disable=import-outside-toplevel
+
+    configure(
+        max_rows=settings.bq_buffer_max_rows,
+        max_batch_bytes=settings.bq_buffer_max_bytes,
+        max_age=settings.bq_buffer_max_age,
+        max_buffered_bytes=settings.bq_buffer_memory_bytes,
+    )
+
+
+@on_startup
+def start_memory_watchdog() -> None:
+    """Samples memory use against MEMORY_LIMIT_MB (or the cgroup limit) in the background."""
+    memory_watchdog.watchdog.configure(
+        settings.memory_limit_mb * 1024 * 1024,
+        high=settings.memory_high_watermark,
+        critical=settings.memory_critical_watermark,
+    )
+    memory_watchdog.watchdog.start()
+
+
+@on_startup
+def configure_circuit_breakers() -> None:
+    """Applies the CIRCUIT_* thresholds to the BigQuery, GCS, Secret Manager and Discord breakers."""
+    circuit_breaker.configure(
+        failure_rate=settings.circuit_failure_rate,
+        slow_call_seconds=settings.circuit_slow_call_seconds,
+        min_calls=settings.circuit_min_calls,
+        open_seconds=settings.circuit_open_seconds,
+    )
+
+
+@on_startup
+def configure_hedging() -> None:
+    """Enables hedged reads for the operations listed in HEDGE_OPERATIONS (e.g. "gcs.read")."""
+    hedging.configure(
+        settings.split_list(settings.hedge_operations),
+        percentile=settings.hedge_percentile,
+        budget_ratio=settings.hedge_budget,
+    )
 
-def main(request) -> dict[str, Any]:
-    try:
-        start = pendulum.now()
 
-        req_json = request.get_json(silent=True) or {}
+@on_startup
+def configure_concurrency_limits() -> None:
+    """Applies CONCURRENCY_* to the adaptive BigQuery insert/query and GCS transfer limits."""
+    concurrency_limit.configure(initial=settings.concurrency_initial_limit, max_limit=settings.concurrency_max_limit)
+
+
+@on_startup
+def configure_compression() -> None:
+    """Gzips request bodies to the GZIP_TARGETS ("bigquery" inserts, "gcs" uploads)."""
+    compression.configure(
+        settings.split_list(settings.gzip_targets), level=settings.gzip_level, min_bytes=settings.gzip_min_bytes
+    )
+
+
+on_shutdown(memory_watchdog.watchdog.stop)
+lifecycle.startup(timeout=settings.timeout)
+lifecycle.install_signal_handlers(timeout=10)
+metrics.start_periodic_dump(settings.metrics_dump_interval)
+
+
+def _hook_url() -> str:
+    """DISCORD_HOOK_URL, read only when a notification falls back to it; it may be a secret."""
+    return settings.discord_hook_url
+
+
+def _timings(timer: timing.RequestTimer) -> dict[str, Any] | None:
+    return timer.breakdown() if settings.timings_in_response else None
+
+
+def _ingest(request, timer: timing.RequestTimer) -> Any:
+    """Streams an NDJSON / JSON array body into STREAM_INGEST_TABLE without buffering it."""
+    with timing.span("request.stream_ingest"):
+        result = streaming.ingest(
+            request.stream,
+            settings.stream_ingest_table,
+            batch_size=settings.stream_batch_rows,
+            max_batch_bytes=settings.stream_batch_bytes,
+            max_in_flight=settings.stream_max_in_flight,
+            chunk_size=settings.stream_chunk_bytes,
+            max_attempts=settings.insert_max_attempts,
+            dead_letter_bucket=settings.dead_letter_bucket,
+        )
+    summary = f"{result.rows} rows ({result.bytes} bytes) to {settings.stream_ingest_table}"
+    if result.errors:
+        return handle_return(
+            _hook_url, f"Ingest failed after {summary}", str(result.errors[:10]), timings=_timings(timer)
+        )
+    return handle_return(
+        _hook_url, f"Ingested {summary} in {timer.elapsed_ms():.1f} ms", timings=_timings(timer)
+    )
+
+
+def main(request) -> Any:
+    if settings.metrics_endpoint and request.method == "GET" and request.path.rstrip("/").endswith("/metrics"):
+        return metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+    with structured_logging.request_context(request.headers):
+        return _handle(request)
+
+
+def _handle(request) -> Any:
+    timer = timing.start_request()
+    deadline.start_request(settings.timeout, settings.deadline_reserve)
+    memory_watchdog.start_request()
+    profiler = profiling.start_if_requested(request.headers, settings.profile_sample_rate, settings.profile_token)
+    try:
+        if settings.stream_ingest_table and streaming.wants_streaming(request.mimetype, request.args):
+            return _ingest(request, timer)
 
-        end = pendulum.now()
+        with timing.span("request.parse_json"):
+            req_json = request.get_json(silent=True) or {}
 
         return handle_return(
-            settings.discord_hook_url,
-            f"completed in : {end.diff_for_humans(start, absolute=True)}",
+            _hook_url,
+            f"completed in : {timer.elapsed_ms():.1f} ms",
+            timings=_timings(timer),
         )
     except Exception as e:
         return handle_return(
-            settings.discord_hook_url, f"Error {e}", traceback.format_exc()
+            _hook_url, f"Error {e}", traceback.format_exc(), timings=_timings(timer)
         )
+    finally:
+        try:
+            if profiler is not None:
+                profiling.finish(profiler, timer.elapsed_ms(), settings.profile_slow_ms, settings.profile_bucket, _hook_url)
+        finally:
+            timing.end_request()
+            deadline.end_request()
+            memory_watchdog.end_request()
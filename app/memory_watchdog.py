@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: memory_watchdog.py
+
+Memory-pressure signal for adaptive batch sizes.
+
+The watchdog samples the instance's memory use and compares it with the memory limit. Use is
+the cgroup working set (usage minus inactive page cache) where the cgroup exposes it, else
+RSS. The limit is MEMORY_LIMIT_MB, else the cgroup limit. Below ``high`` (75% of the limit)
+``scaled()`` returns sizes unchanged. Between ``high`` and ``critical`` (90%) it shrinks them
+linearly, down to ``min_factor`` of the original at ``critical`` and above. Insert batches,
+write-buffer bounds, GCS upload chunks and Discord attachments are sized through it.
+
+Samples are taken on demand (at most every ``interval`` seconds) and by an optional
+background thread. The thread also catches short peaks between batches, and the per-request
+peak is reported by ``request_report()``.
+"""
+
+import contextvars
+import os
+import resource
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from loguru import logger as log
+
+from metrics import counter, gauge
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+_UNLIMITED = 1 << 60
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+MEMORY_USAGE = gauge("memory_usage_bytes", "Sampled memory use (cgroup working set or RSS).")
+MEMORY_PRESSURE = gauge("memory_pressure_ratio", "Memory use as a fraction of the limit.")
+PRESSURE_TRANSITIONS = counter("memory_pressure_transitions", "Changes of memory-pressure level.", ["level"])
+SAMPLE_FAILURES = counter("memory_sample_failures", "Background memory samples that raised.")
+
+# Longest wait between background samples after repeated failures.
+MAX_SAMPLE_BACKOFF = 30.0
+
+
+def _read_int(path: Path) -> Optional[int]:
+    try:
+        value = path.read_text(encoding="ascii").strip()
+    except OSError:
+        return None
+    return int(value) if value.isdigit() else None
+
+
+def _stat_field(path: Path, name: str) -> int:
+    try:
+        for line in path.read_text(encoding="ascii").splitlines():
+            key, _, value = line.partition(" ")
+            if key == name:
+                return int(value)
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def cgroup_limit_bytes(root: Path = CGROUP_ROOT) -> Optional[int]:
+    """Memory limit of the cgroup (v2, then v1), or None when unlimited or unreadable."""
+    for path in (root / "memory.max", root / "memory" / "memory.limit_in_bytes"):
+        if (limit := _read_int(path)) is not None:
+            return limit if limit < _UNLIMITED else None
+    return None
+
+
+def cgroup_working_set(root: Path = CGROUP_ROOT) -> Optional[int]:
+    """Cgroup usage minus inactive page cache (what the OOM killer sees), or None."""
+    if (usage := _read_int(root / "memory.current")) is not None:
+        return max(usage - _stat_field(root / "memory.stat", "inactive_file"), 0)
+    if (usage := _read_int(root / "memory" / "memory.usage_in_bytes")) is not None:
+        return max(usage - _stat_field(root / "memory" / "memory.stat", "total_inactive_file"), 0)
+    return None
+
+
+def _usage() -> int:
+    working_set = cgroup_working_set()
+    return working_set if working_set is not None else rss_bytes()
+
+
+class RequestMemory:
+    """
+    Memory use observed while one request was active.
+    """
+
+    __slots__ = ("start", "peak")
+
+    def __init__(self, usage: int) -> None:
+        self.start = usage
+        self.peak = usage
+
+
+class MemoryWatchdog:
+    """
+    Samples memory use and turns it into a pressure level and a size factor.
+    """
+
+    LEVELS = ("ok", "high", "critical")
+
+    def __init__(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+        self,
+        limit_bytes: Optional[int] = None,
+        high: float = 0.75,
+        critical: float = 0.9,
+        min_factor: float = 0.1,
+        interval: float = 0.25,
+        reader: Callable[[], int] = _usage,
+    ) -> None:
+        """
+        :param limit_bytes: Memory limit. Defaults to the cgroup limit; without either the
+                            pressure is always 0.
+        :param high: Pressure at which sizes start to shrink.
+        :param critical: Pressure at which sizes reach ``min_factor``.
+        :param min_factor: Smallest fraction of a size ``scaled()`` returns.
+        :param interval: Seconds a sample is reused, and the background sampling period.
+        :param reader: Returns the current memory use in bytes.
+        """
+        self.limit_bytes = limit_bytes or cgroup_limit_bytes()
+        self.high = high
+        self.critical = critical
+        self.min_factor = min_factor
+        self.interval = interval
+        self.reader = reader
+        self.last_usage = 0
+        self.peak_usage = 0
+        self.level = "ok"
+        self._sampled_at = float("-inf")
+        self._requests: set[RequestMemory] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def configure(self, limit_bytes: Optional[int] = None, high: Optional[float] = None, critical: Optional[float] = None) -> None:
+        """Change the limit or thresholds; ``limit_bytes`` 0/None keeps detecting the cgroup limit."""
+        self.limit_bytes = limit_bytes or cgroup_limit_bytes()
+        self.high = high if high is not None else self.high
+        self.critical = critical if critical is not None else self.critical
+        self._sampled_at = float("-inf")
+
+    def sample(self) -> int:
+        """Read memory use now and update peaks, gauges and the pressure level."""
+        usage = self.reader()
+        with self._lock:
+            self.last_usage = usage
+            self._sampled_at = time.monotonic()
+            self.peak_usage = max(self.peak_usage, usage)
+            for request in self._requests:
+                request.peak = max(request.peak, usage)
+        pressure = self._pressure(usage)
+        MEMORY_USAGE.set(usage)
+        MEMORY_PRESSURE.set(pressure)
+        level = "critical" if pressure >= self.critical else "high" if pressure >= self.high else "ok"
+        if level != self.level:
+            self.level = level
+            PRESSURE_TRANSITIONS.inc(level=level)
+            if level != "ok":
+                log.warning("Memory pressure {}: {} MiB of {} MiB.", level, usage >> 20, (self.limit_bytes or 0) >> 20)
+        return usage
+
+    def usage(self) -> int:
+        """Memory use from a sample at most ``interval`` seconds old."""
+        if time.monotonic() - self._sampled_at >= self.interval:
+            return self.sample()
+        return self.last_usage
+
+    def _pressure(self, usage: int) -> float:
+        return usage / self.limit_bytes if self.limit_bytes else 0.0
+
+    def pressure(self) -> float:
+        """Memory use as a fraction of the limit; 0.0 without a known limit."""
+        return self._pressure(self.usage())
+
+    def factor(self) -> float:
+        """1.0 below ``high``, falling linearly to ``min_factor`` at ``critical``."""
+        pressure = self.pressure()
+        if pressure < self.high:
+            return 1.0
+        if pressure >= self.critical:
+            return self.min_factor
+        return max(self.min_factor, 1.0 - (1.0 - self.min_factor) * (pressure - self.high) / (self.critical - self.high))
+
+    def scaled(self, size: int, minimum: int = 1) -> int:
+        """
+        ``size`` shrunk for the current memory pressure.
+
+        :param size: Size to use without pressure (rows, bytes, ...).
+        :param minimum: Never return less than this (nor more than ``size``).
+        """
+        factor = self.factor()
+        return size if factor >= 1.0 else max(min(minimum, size), int(size * factor))
+
+    def start(self) -> None:
+        """Sample every ``interval`` seconds on a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval * 2)
+            self._thread = None
+
+    def _run(self) -> None:
+        """Sample until stopped; after failures, wait twice as long each time (up to MAX_SAMPLE_BACKOFF)."""
+        delay, failures = self.interval, 0
+        while not self._stop.wait(delay):
+            try:
+                self.sample()
+            except Exception as e:  # pylint: disable=W0718
+                failures += 1
+                SAMPLE_FAILURES.inc()
+                delay = min(max(self.interval, 0.01) * 2**failures, MAX_SAMPLE_BACKOFF)
+                log.opt(exception=e).error("Memory sample failed ({} in a row), retrying in {:.1f}s: {}", failures, delay, e)
+                continue
+            if failures:
+                log.info("Memory sampling recovered after {} failures.", failures)
+                delay, failures = self.interval, 0
+
+    def track(self) -> RequestMemory:
+        """Start recording the peak memory use of a request."""
+        request = RequestMemory(self.sample())
+        with self._lock:
+            self._requests.add(request)
+        return request
+
+    def untrack(self, request: RequestMemory) -> None:
+        with self._lock:
+            self._requests.discard(request)
+
+    def report(self, request: Optional[RequestMemory] = None) -> dict[str, Any]:
+        """Current, peak and limit in MiB plus the pressure; JSON-serialisable."""
+        usage = self.sample()
+        report = {
+            "usage_mb": round(usage / 2**20, 1),
+            "instance_peak_mb": round(self.peak_usage / 2**20, 1),
+            "limit_mb": round(self.limit_bytes / 2**20, 1) if self.limit_bytes else None,
+            "pressure": round(self._pressure(usage), 3),
+            "level": self.level,
+        }
+        if request is not None:
+            report["request_peak_mb"] = round(request.peak / 2**20, 1)
+            report["request_growth_mb"] = round((request.peak - request.start) / 2**20, 1)
+        return report
+
+
+watchdog = MemoryWatchdog()
+
+_current_request: contextvars.ContextVar[Optional[RequestMemory]] = contextvars.ContextVar("request_memory", default=None)
+
+
+def start_request() -> RequestMemory:
+    """Track the memory peak of the request handled in the current context."""
+    request = watchdog.track()
+    _current_request.set(request)
+    return request
+
+
+def end_request() -> None:
+    if (request := _current_request.get()) is not None:
+        _current_request.set(None)
+        watchdog.untrack(request)
+
+
+def request_report() -> dict[str, Any]:
+    """watchdog.report() for the current request, if one is tracked."""
+    return watchdog.report(_current_request.get())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: metrics.py
+
+In-process counters, gauges and fixed-bucket histograms with OpenMetrics text exposition.
+
+Metrics are created once at module import (``counter(...)``, ``histogram(...)``) and updated
+on the hot path with a single short per-metric lock. ``render()`` produces the text format
+Prometheus scrapes; ``start_periodic_dump()`` logs it from the lifecycle loop instead when
+no scraper can reach the instance.
+"""
+
+import abc
+import asyncio
+import bisect
+import math
+import threading
+from typing import Iterable, Optional
+
+from loguru import logger as log
+
+# Latency buckets in seconds, tuned for RPCs between ~1 ms and a minute.
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = tuple[str, ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Metric(abc.ABC):
+    """
+    Base class: a named family of series keyed by label values.
+    """
+
+    kind = "unknown"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames: tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelKey:
+        if len(labels) != len(self.labelnames) or not all(name in labels for name in self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _label_str(self, key: LabelKey, extra: Optional[tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, key))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    @abc.abstractmethod
+    def samples(self) -> list[str]:
+        """Exposition lines for every series of this metric."""
+
+    @abc.abstractmethod
+    def reset(self) -> None:
+        """Drops every series (tests)."""
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing value.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """
+        :param amount: Non-negative increment.
+        :param labels: Label values.
+        """
+        if amount < 0:
+            raise ValueError("Counters can only increase.")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current value of one series."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}_total{self._label_str(key)} {_format_value(value)}" for key, value in items]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Gauge(Metric):
+    """
+    Value that can go up and down.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: str) -> float:
+        """Current value of one series."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{self._label_str(key)} {_format_value(value)}" for key, value in items]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(Metric):
+    """
+    Fixed-bucket histogram; each series stores per-bucket counts, a sum and a count.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets: tuple[float, ...] = tuple(sorted(buckets))
+        # key -> [bucket counts..., +Inf count, sum]
+        self._series: dict[LabelKey, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """
+        :param value: Observation (seconds for latencies).
+        :param labels: Label values.
+        """
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        """Number of observations of one series."""
+        series = self._series.get(self._key(labels))
+        return int(sum(series[:-1])) if series else 0
+
+    def quantile(self, q: float, **labels: str) -> float:
+        """
+        Upper bucket bound containing the q-quantile (what a scraper would estimate).
+
+        :param q: Quantile in [0, 1].
+        """
+        series = self._series.get(self._key(labels))
+        if not series:
+            return math.nan
+        total = sum(series[:-1])
+        running = 0.0
+        for bound, bucket_count in zip((*self.buckets, math.inf), series[:-1]):
+            running += bucket_count
+            if running >= q * total:
+                return bound
+        return math.inf
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines: list[str] = []
+        for key, series in items:
+            running = 0.0
+            for bound, bucket_count in zip((*self.buckets, math.inf), series[:-1]):
+                running += bucket_count
+                lines.append(f"{self.name}_bucket{self._label_str(key, ('le', _format_value(bound)))} {_format_value(running)}")
+            lines.append(f"{self.name}_sum{self._label_str(key)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{self._label_str(key)} {_format_value(running)}")
+        return lines
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    """
+    Named collection of metrics; get-or-create so modules can declare metrics at import time.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        """Adds ``metric``, or returns the existing one with the same name and kind."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is None:
+                self._metrics[metric.name] = metric
+                return metric
+        if existing.kind != metric.kind or existing.labelnames != metric.labelnames:
+            raise ValueError(f"Metric {metric.name!r} already registered with a different definition.")
+        return existing
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in OpenMetrics text format, terminated by ``# EOF``."""
+        lines: list[str] = []
+        for metric in sorted(self._metrics.values(), key=lambda m: m.name):
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.extend(metric.samples())
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Clears every series but keeps the metric definitions."""
+        for metric in list(self._metrics.values()):
+            metric.reset()
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    """Get-or-create a counter in the default registry. ``name`` excludes the ``_total`` suffix."""
+    return REGISTRY.register(Counter(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def gauge(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+    """Get-or-create a gauge in the default registry."""
+    return REGISTRY.register(Gauge(name, documentation, labelnames))  # type: ignore[return-value]
+
+
+def histogram(name: str, documentation: str, labelnames: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Get-or-create a histogram in the default registry."""
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))  # type: ignore[return-value]
+
+
+def render() -> str:
+    """The default registry in OpenMetrics text format."""
+    return REGISTRY.render()
+
+
+async def dump_periodically(interval: float) -> None:
+    """
+    Logs the exposition text every ``interval`` seconds until cancelled.
+
+    :param interval: Seconds between dumps.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        log.bind(openmetrics=True).info(render())
+
+
+def start_periodic_dump(interval: float) -> Optional["asyncio.Task[None]"]:
+    """
+    Starts dump_periodically() on the lifecycle loop and dumps once more on shutdown.
+
+    :param interval: Seconds between dumps; 0 or less disables dumping.
+    :return: The dump task, or None when disabled.
+    """
+    from lifecycle import lifecycle  # pylint: disable=import-outside-toplevel
+
+    if interval <= 0:
+        return None
+
+    async def _start() -> "asyncio.Task[None]":
+        return asyncio.create_task(dump_periodically(interval))
+
+    task = lifecycle.run(_start())
+
+    @lifecycle.on_shutdown
+    async def _final_dump() -> None:
+        task.cancel()
+        log.bind(openmetrics=True).info(render())
+
+    return task
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: notify_routing.py
+
+Routing table for notifications.
+
+NOTIFY_ROUTES maps message types (the ``msg_type`` of send_discord_message) to webhooks.
+Routes are separated by ``;`` and each reads ``<selectors>[@<sample>]=<url>``:
+
+- selectors: comma-separated types (``error``), a type and every more severe one
+  (``warning+``), or ``*`` for all types
+- sample: fraction of matching messages sent on this route (default 1)
+
+error,critical=https://discord.com/api/webhooks/oncall;success@0.1=https://discord.com/api/webhooks/digest
+
+A message goes to every route that matches it and samples it in. A URL named by several
+routes is sent to once. Without routes, everything goes to the caller's URL
+(DISCORD_HOOK_URL).
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+from custom_exceptions import ConfigurationError
+from metrics import counter
+
+# Severity of the message types in discord_hook.DEFAULT_MESSAGE_FORMATS; unknown types rank as info.
+SEVERITY = {
+    "debug": 10,
+    "code": 20,
+    "default": 20,
+    "info": 20,
+    "success": 20,
+    "warning": 30,
+    "fail": 40,
+    "error": 40,
+    "critical": 50,
+}
+_INFO = SEVERITY["info"]
+
+SAMPLED_OUT = counter("notifications_sampled_out", "Notifications a route's sampling skipped.", ["msg_type"])
+
+
+@dataclass(frozen=True)
+class Route:
+    """One line of the routing table."""
+
+    url: str
+    types: frozenset[str] = frozenset()
+    min_severity: Optional[int] = None
+    sample: float = 1.0
+
+    def matches(self, msg_type: str) -> bool:
+        if not self.types and self.min_severity is None:
+            return True
+        if msg_type in self.types:
+            return True
+        return self.min_severity is not None and SEVERITY.get(msg_type, _INFO) >= self.min_severity
+
+
+def parse_routes(spec: str) -> list[Route]:
+    """
+    Parse a NOTIFY_ROUTES value.
+
+    :raises ConfigurationError: For a malformed route, unknown severity or bad sample rate.
+    """
+    routes = []
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        selector, sep, url = entry.partition("=")
+        if not sep or not url.strip():
+            raise ConfigurationError(f"NOTIFY_ROUTES entry {entry!r} is not <selectors>[@<sample>]=<url>.")
+        selector, _, sample_text = selector.partition("@")
+        try:
+            sample = float(sample_text) if sample_text else 1.0
+        except ValueError:
+            raise ConfigurationError(f"NOTIFY_ROUTES sample {sample_text!r} is not a number.") from None
+        if not 0.0 <= sample <= 1.0:
+            raise ConfigurationError(f"NOTIFY_ROUTES sample {sample} is outside 0..1.")
+        types: set[str] = set()
+        min_severity: Optional[int] = None
+        for name in filter(None, (part.strip() for part in selector.split(","))):
+            if name == "*":
+                min_severity = 0
+            elif name.endswith("+"):
+                if name[:-1] not in SEVERITY:
+                    raise ConfigurationError(f"NOTIFY_ROUTES severity {name!r} is unknown.")
+                level = SEVERITY[name[:-1]]
+                min_severity = level if min_severity is None else min(min_severity, level)
+            else:
+                types.add(name)
+        if not types and min_severity is None:
+            raise ConfigurationError(f"NOTIFY_ROUTES entry {entry!r} selects no message types.")
+        routes.append(Route(url.strip(), frozenset(types), min_severity, sample))
+    return routes
+
+
+_routes: list[Route] = []
+
+
+def configure(spec: str) -> list[Route]:
+    """Replace the routing table with the parsed ``spec`` (empty: send to the caller's URL)."""
+    _routes[:] = parse_routes(spec)
+    return list(_routes)
+
+
+def destinations(msg_type: str, default_url: Union[str, Callable[[], str], None] = None) -> list[str]:
+    """
+    Webhooks a message of ``msg_type`` goes to, sampling applied.
+
+    :param msg_type: Message type, e.g. "error" or "success".
+    :param default_url: Destination while no routes are configured, or a callable returning
+                        it, called only then (e.g. a secret-backed setting).
+    """
+    if not _routes:
+        if callable(default_url):
+            default_url = default_url()
+        return [default_url] if default_url else []
+    urls: list[str] = []
+    for route in _routes:
+        if not route.matches(msg_type) or route.url in urls:
+            continue
+        if route.sample < 1.0 and random.random() >= route.sample:
+            SAMPLED_OUT.inc(msg_type=msg_type)
+            continue
+        urls.append(route.url)
+    return urls
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: profiling.py
+
+Opt-in statistical profiler for single requests.
+
+A daemon thread samples the request thread's stack every few milliseconds through
+``sys._current_frames()`` and counts collapsed stacks (``root;caller;callee count``), the
+input format of flamegraph.pl / speedscope. BigQuery, GCS and Discord calls run on the
+lifecycle loop and executor threads, so busy threads named with BACKGROUND_THREADS are
+sampled too, each under its own root (``[asyncio_0];...``). Those threads are shared, so
+their stacks may include other requests' work. Nothing is traced per call, so overhead is
+one stack walk per thread and interval. Profiles are shipped in the background, for slow
+requests only (or every request that explicitly asked for one).
+"""
+
+import asyncio
+import hmac
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from types import FrameType
+from typing import Callable, Mapping, Optional, Union
+
+from loguru import logger as log
+
+from discord_hook import DiscordAttachment, get_http_client, send_discord_message
+from lifecycle import lifecycle
+
+PROFILE_HEADER = "X-Profile-Request"
+DEFAULT_INTERVAL = 0.005
+MAX_DEPTH = 128
+# Name prefixes of the threads request work is handed to: the lifecycle loop, its default
+# executor and the hedging pool.
+BACKGROUND_THREADS = ("lifecycle-loop", "asyncio_", "hedge")
+# Innermost frames of a thread waiting for work; such samples are skipped.
+_IDLE_FRAMES = frozenset({"selectors.py:select", "thread.py:_worker"})
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's call stack, and those of busy background threads, at a fixed
+    interval and aggregates collapsed stacks.
+    """
+
+    def __init__(
+        self,
+        thread_id: Optional[int] = None,
+        interval: float = DEFAULT_INTERVAL,
+        forced: bool = False,
+        thread_prefixes: tuple[str, ...] = (),
+    ) -> None:
+        """
+        :param thread_id: Thread to sample, defaults to the calling thread.
+        :param interval: Seconds between samples.
+        :param forced: True when the caller explicitly asked for this profile.
+        :param thread_prefixes: Also sample threads whose name starts with one of these,
+                                while they are not idle.
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.thread_prefixes = thread_prefixes
+        self.forced = forced
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter[str]:
+        """Stops sampling and returns the collapsed stack counts."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def __enter__(self) -> "SamplingProfiler":
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def _background_threads(self) -> dict[int, str]:
+        if not self.thread_prefixes:
+            return {}
+        return {
+            thread.ident: thread.name
+            for thread in threading.enumerate()
+            if thread.ident is not None and thread.ident != self.thread_id and thread.name.startswith(self.thread_prefixes)
+        }
+
+    def _record(self, frame: Optional[FrameType], root: Optional[str] = None) -> None:
+        labels: list[str] = []
+        while frame is not None and len(labels) < MAX_DEPTH:
+            labels.append(_frame_label(frame))
+            frame = frame.f_back
+        if root is not None:
+            if labels[0] in _IDLE_FRAMES:
+                return
+            labels.append(f"[{root}]")
+        self.stacks[";".join(reversed(labels))] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            if (frame := frames.get(self.thread_id)) is not None:
+                self._record(frame)
+            for ident, name in self._background_threads().items():
+                if (frame := frames.get(ident)) is not None:
+                    self._record(frame, root=name)
+
+    def collapsed(self) -> str:
+        """Collapsed-stack text, one ``stack count`` line per distinct stack."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+
+def start_if_requested(headers: Mapping[str, str], sample_rate: float, token: str = "") -> Optional[SamplingProfiler]:
+    """
+    Starts a profiler for this request when the profile header carries ``token`` or the
+    request is sampled.
+
+    :param headers: Request headers.
+    :param sample_rate: Fraction of requests to profile (0 disables sampling).
+    :param token: Shared secret the profile header must match; empty ignores the header.
+    :return: The running profiler, or None.
+    """
+    value = headers.get(PROFILE_HEADER, "")
+    forced = bool(token) and hmac.compare_digest(value.encode(), token.encode())
+    if not forced and (sample_rate <= 0 or random.random() >= sample_rate):
+        return None
+    return SamplingProfiler(forced=forced, thread_prefixes=BACKGROUND_THREADS).start()
+
+
+def _upload(bucket_name: str, remote_name: str, content: str) -> None:
+    from cloud_tools.google_bucketmanager import BucketManager  # pylint: disable=import-outside-toplevel
+
+    with tempfile.NamedTemporaryFile("w", suffix=".collapsed", delete=False, encoding="utf-8") as tmp:
+        tmp.write(content)
+    try:
+        BucketManager(bucket_name).upload_file(tmp.name, remote_name)
+    finally:
+        os.unlink(tmp.name)
+
+
+def finish(
+    profiler: SamplingProfiler,
+    elapsed_ms: float,
+    slow_ms: float,
+    bucket_name: str = "",
+    webhook_url: Union[str, Callable[[], str]] = "",
+) -> Optional[str]:
+    """
+    Stops the profiler and ships the profile in the background when the request was slow
+    (or the profile was explicitly requested): to GCS when ``bucket_name`` is set, otherwise
+    as a Discord attachment.
+
+    :param profiler: Profiler returned by start_if_requested().
+    :param elapsed_ms: Request duration.
+    :param slow_ms: Minimum duration for sampled requests to be shipped.
+    :param bucket_name: Bucket for ``profiles/<service>/...collapsed`` objects.
+    :param webhook_url: Discord webhook used when no bucket is configured, or a callable
+                        returning it (resolved only then, e.g. a Secret Manager setting).
+    :return: The object name or attachment filename, or None when nothing was shipped.
+    """
+    profiler.stop()
+    if not profiler.samples or (not profiler.forced and elapsed_ms < slow_ms):
+        return None
+
+    service = os.getenv("K_SERVICE", "app")
+    name = f"{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}.collapsed"
+    content = profiler.collapsed()
+    log.info(f"Shipping profile of {elapsed_ms:.0f} ms request ({profiler.samples} samples).")
+
+    if bucket_name:
+        remote_name = f"profiles/{service}/{name}"
+        lifecycle.submit(asyncio.to_thread(_upload, bucket_name, remote_name, content))
+        return remote_name
+    if callable(webhook_url):
+        try:
+            webhook_url = webhook_url()
+        except Exception as e:  # pylint: disable=W0718
+            log.warning(f"Profile not shipped, the webhook URL could not be resolved: {e}")
+            return None
+    if webhook_url:
+        lifecycle.submit(
+            send_discord_message(
+                webhook_url=webhook_url,
+                message=f"Profile of {elapsed_ms:.0f} ms request ({profiler.samples} samples)",
+                msg_type="info",
+                attachment=DiscordAttachment(content=content, filename=f"{service}_{name}"),
+                client=get_http_client(),
+            )
+        )
+        return f"{service}_{name}"
+    log.warning("Profile captured but neither a bucket nor a webhook is configured.")
+    return None
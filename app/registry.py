@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: registry.py
+
+Instance-wide objects keyed by name, created on first use with shared options.
+
+Circuit breakers, hedgers and concurrency limiters each keep one object per dependency for
+the whole instance. ``configure`` sets keyword options for the objects created afterwards
+and applies them to the existing ones. Option names are checked against the factory's
+signature, so a typo in settings raises instead of being ignored.
+
+_breakers = Registry(CircuitBreaker)
+_breakers.configure(failure_rate=0.5)
+_breakers.get("bigquery").call(...)
+"""
+
+import inspect
+import threading
+from typing import Any, Callable, Generic, Iterable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def _setattrs(existing: Any, options: dict[str, Any]) -> None:
+    for key, value in options.items():
+        setattr(existing, key, value)
+
+
+class Registry(Generic[T]):
+    """One ``factory(name, **options)`` object per name."""
+
+    def __init__(
+        self,
+        factory: Callable[..., T],
+        apply: Callable[[T, dict[str, Any]], None] = _setattrs,
+        defaults: Optional[dict[str, dict[str, Any]]] = None,
+        fixed: Iterable[str] = (),
+    ) -> None:
+        """
+        :param factory: Builds the object of a name; its first parameter is the name.
+        :param apply: Applies changed options to an existing object.
+        :param defaults: Per-name options that configured options override.
+        :param fixed: Factory parameters that ``configure`` may not set.
+        """
+        names = list(inspect.signature(factory).parameters)
+        self.option_names = frozenset(names[1:]) - set(fixed)
+        self._factory = factory
+        self._apply = apply
+        self._defaults = defaults or {}
+        self._options: dict[str, Any] = {}
+        self._objects: dict[str, T] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str, **extra: Any) -> T:
+        """
+        The object of ``name``, created on first use.
+
+        :param extra: Options of a new object that are not shared (e.g. derived from the name).
+        """
+        if (existing := self._objects.get(name)) is not None:
+            return existing
+        with self._lock:
+            if name not in self._objects:
+                self._objects[name] = self._factory(name, **{**self._defaults.get(name, {}), **self._options, **extra})
+            return self._objects[name]
+
+    def configure(self, **options: Any) -> None:
+        """
+        Sets options for every object, existing and future.
+
+        :raises TypeError: If an option is not a keyword argument of the factory.
+        """
+        if unknown := options.keys() - self.option_names:
+            raise TypeError(f"Unknown option(s) {', '.join(sorted(unknown))}; expected {', '.join(sorted(self.option_names))}")
+        with self._lock:
+            self._options.update(options)
+            existing = list(self._objects.values())
+        for obj in existing:
+            self._apply(obj, options)
+
+    def __iter__(self) -> Iterator[T]:
+        return iter(list(self._objects.values()))
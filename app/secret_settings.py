@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: secret_settings.py
+
+Settings backed by Secret Manager.
+
+A setting whose value is a reference such as ``DISCORD_HOOK_URL=sm://discord-hook-url`` (or
+``sm://discord-hook-url@3`` for a pinned version) is not fetched when settings load. The first
+access to any referenced setting fetches all of them in one concurrent batch from the
+settings' PROJECT_ID; the values are then kept for the life of the instance. Functions that
+never read a secret-backed setting never call Secret Manager. Only plain string settings
+can be references. Must stay free of pydantic and google imports (see settings_snapshot).
+"""
+
+import threading
+from collections import defaultdict
+from typing import Any, Mapping, MutableMapping, Optional
+
+from loguru import logger as log
+
+from custom_exceptions import ConfigurationError
+
+SECRET_SCHEME = "sm://"
+
+
+def parse_reference(value: Any) -> Optional[tuple[str, str]]:
+    """
+    :return: (secret_id, version) for an ``sm://<secret-id>[@<version>]`` value, else None.
+    :raises ValueError: If the reference names no secret.
+    """
+    if not isinstance(value, str) or not value.startswith(SECRET_SCHEME):
+        return None
+    secret_id, _, version = value[len(SECRET_SCHEME) :].partition("@")
+    if not secret_id:
+        raise ValueError(f"Secret reference {value!r} has no secret id.")
+    return secret_id, version or "latest"
+
+
+def split_references(values: MutableMapping[str, Any]) -> dict[str, str]:
+    """
+    Remove every secret reference from ``values`` in place.
+
+    :return: Mapping of setting name to its reference.
+    """
+    references = {name: value for name, value in values.items() if parse_reference(value)}
+    for name in references:
+        del values[name]
+    return references
+
+
+def fetch_secrets(references: Mapping[str, str], project_id: str) -> dict[str, str]:
+    """
+    Fetch the referenced secrets concurrently (one batch per pinned version).
+
+    :param references: Mapping of setting name to ``sm://`` reference.
+    :param project_id: Project id where the secrets are stored.
+    :return: Mapping of setting name to secret value.
+    """
+    from cloud_tools.google_secretmanager import prefetch_secrets  # pylint: disable=import-outside-toplevel
+
+    by_version: dict[str, list[tuple[str, str]]] = defaultdict(list)
+    for name, reference in references.items():
+        if (parsed := parse_reference(reference)) is None:
+            raise ValueError(f"{name}: {reference!r} is not a secret reference.")
+        secret_id, version = parsed
+        by_version[version].append((name, secret_id))
+
+    values: dict[str, str] = {}
+    for version, names in by_version.items():
+        fetched = prefetch_secrets((secret_id for _, secret_id in names), project_id, version)
+        values.update((name, fetched[secret_id]) for name, secret_id in names)
+    log.debug(f"Resolved {len(values)} secret-backed settings.")
+    return values
+
+
+class LazySecrets:
+    """
+    Pending secret-backed settings of one settings instance.
+    """
+
+    def __init__(self, references: Mapping[str, str], project_id: str) -> None:
+        """
+        :param references: Mapping of setting name to ``sm://`` reference.
+        :param project_id: Project id where the secrets are stored.
+        """
+        if "project_id" in references:
+            raise ValueError("PROJECT_ID cannot be a secret reference; it locates the secrets.")
+        self.references = dict(references)
+        self.project_id = project_id
+        self._values: Optional[dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.references
+
+    def resolve(self) -> dict[str, str]:
+        """
+        Fetch every referenced secret on the first call. A failed fetch is retried on the
+        next call.
+
+        :return: Mapping of setting name to secret value.
+        :raises ConfigurationError: If the fetch failed; names the settings it was for.
+        """
+        if self._values is None:
+            with self._lock:
+                if self._values is None:
+                    try:
+                        self._values = fetch_secrets(self.references, self.project_id)
+                    except Exception as e:
+                        raise ConfigurationError(f"Could not resolve secret-backed settings {sorted(self.references)}: {e}") from e
+        return self._values
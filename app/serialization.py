@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: serialization.py
+
+Pluggable JSON backend.
+
+Uses orjson, then msgspec, when installed and falls back to the stdlib otherwise. Every
+backend produces the same compact UTF-8 output (no spaces, non-ASCII kept as is) and the
+same encoding of datetimes, Decimals, UUIDs and sets, so switching backends never changes
+what a consumer receives. ``JSON_BACKEND`` (auto, orjson, msgspec, json) pins a backend.
+"""
+
+import datetime
+import decimal
+import json
+import os
+import uuid
+from typing import Any, Callable
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+def _default(obj: Any) -> Any:
+    """Encodes the non-JSON types rows commonly carry."""
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, (decimal.Decimal, uuid.UUID)):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _stdlib() -> tuple[Callable[[Any], bytes], Callable[[bytes | str], Any]]:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+    return (lambda obj: encoder.encode(obj).encode("utf-8")), json.loads
+
+
+def _orjson() -> tuple[Callable[[Any], bytes], Callable[[bytes | str], Any]]:
+    import orjson  # pylint: disable=import-outside-toplevel
+
+    # orjson encodes datetime/UUID natively (same ISO format); _default covers the rest.
+    return (lambda obj: orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)), orjson.loads
+
+
+def _msgspec() -> tuple[Callable[[Any], bytes], Callable[[bytes | str], Any]]:
+    import msgspec  # pylint: disable=import-outside-toplevel
+
+    encoder = msgspec.json.Encoder(enc_hook=_default, decimal_format="string")
+    return encoder.encode, msgspec.json.decode
+
+
+_FACTORIES: dict[str, Callable[[], tuple[Callable[[Any], bytes], Callable[[bytes | str], Any]]]] = {
+    "orjson": _orjson,
+    "msgspec": _msgspec,
+    "json": _stdlib,
+}
+
+backend = "json"
+_dumps, _loads = _stdlib()
+
+
+def set_backend(name: str = "auto") -> str:
+    """
+    Selects the JSON backend.
+
+    :param name: One of BACKENDS, or "auto" for the fastest installed one.
+    :return: The backend now in use.
+    :raises ValueError: For unknown names.
+    :raises ImportError: When an explicitly requested backend is not installed.
+    """
+    global backend, _dumps, _loads  # pylint: disable=global-statement  # noqa: PLW0603
+    if name != "auto" and name not in _FACTORIES:
+        raise ValueError(f"Unknown JSON backend {name!r}, expected auto or one of {', '.join(BACKENDS)}.")
+    for candidate in BACKENDS if name == "auto" else (name,):
+        try:
+            _dumps, _loads = _FACTORIES[candidate]()
+        except ImportError:
+            if name != "auto":
+                raise
+            continue
+        backend = candidate
+        break
+    return backend
+
+
+def available_backends() -> list[str]:
+    """Backends importable in this environment."""
+    found = []
+    for name in BACKENDS:
+        try:
+            _FACTORIES[name]()
+        except ImportError:
+            continue
+        found.append(name)
+    return found
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON bytes."""
+    return _dumps(obj)
+
+
+def dumps_str(obj: Any) -> str:
+    """Compact JSON text, for APIs that want ``str``."""
+    return _dumps(obj).decode("utf-8")
+
+
+def loads(data: bytes | str) -> Any:
+    """Parses JSON bytes or text."""
+    return _loads(data)
+
+
+set_backend(os.environ.get("JSON_BACKEND", "auto"))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: settings_model.py
+uv add pydantic pydantic-settings pydantic[email] --no-cache-dir
+
+The validated settings model. Import ``settings`` from config instead of instantiating this;
+config serves a build-time snapshot when one matches and only falls back to ``Settings()``.
+"""
+
+from typing import TYPE_CHECKING, Any, Optional
+
+from pydantic import Field, EmailStr, PrivateAttr
+from pydantic_settings import BaseSettings
+
+from secret_settings import LazySecrets, split_references
+from settings_snapshot import split_list
+
+
+class Settings(BaseSettings):
+    """
+    Configuration settings for the application.
+    Loads environment variables from `project.env` file and provides type-safe access
+    to application settings.
+    """
+    service_name: str = Field(..., alias="SERVICE_NAME")
+    project_id: str = Field(..., alias="PROJECT_ID")
+    region: str = Field(..., alias="REGION")
+    runtime: str = Field(..., alias="RUNTIME")
+    timeout: int = Field(..., alias="TIMEOUT")
+    runtime_service_account_email: EmailStr = Field(..., alias="RUNTIME_SERVICE_ACCOUNT_EMAIL")
+    discord_hook_url: str = Field(..., alias="DISCORD_HOOK_URL")
+    warm_clients: str = Field("", alias="WARM_CLIENTS")
+    prefetch_secrets: str = Field("", alias="PREFETCH_SECRETS")
+    timings_in_response: bool = Field(False, alias="TIMINGS_IN_RESPONSE")
+    metrics_endpoint: bool = Field(False, alias="METRICS_ENDPOINT")
+    metrics_dump_interval: float = Field(0.0, alias="METRICS_DUMP_INTERVAL")
+    profile_sample_rate: float = Field(0.0, alias="PROFILE_SAMPLE_RATE")
+    profile_slow_ms: float = Field(1000.0, alias="PROFILE_SLOW_MS")
+    profile_bucket: str = Field("", alias="PROFILE_BUCKET")
+    profile_token: str = Field("", alias="PROFILE_TOKEN")
+    stream_ingest_table: str = Field("", alias="STREAM_INGEST_TABLE")
+    stream_batch_rows: int = Field(500, alias="STREAM_BATCH_ROWS")
+    stream_batch_bytes: int = Field(5 * 1024 * 1024, alias="STREAM_BATCH_BYTES")
+    stream_max_in_flight: int = Field(2, alias="STREAM_MAX_IN_FLIGHT")
+    stream_chunk_bytes: int = Field(64 * 1024, alias="STREAM_CHUNK_BYTES")
+    insert_max_attempts: int = Field(1, alias="INSERT_MAX_ATTEMPTS")
+    dead_letter_bucket: str = Field("", alias="DEAD_LETTER_BUCKET")
+    bq_buffer_max_rows: int = Field(500, alias="BQ_BUFFER_MAX_ROWS")
+    bq_buffer_max_bytes: int = Field(5 * 1024 * 1024, alias="BQ_BUFFER_MAX_BYTES")
+    bq_buffer_max_age: float = Field(1.0, alias="BQ_BUFFER_MAX_AGE")
+    bq_buffer_memory_bytes: int = Field(64 * 1024 * 1024, alias="BQ_BUFFER_MEMORY_BYTES")
+    prewarm_tables: str = Field("", alias="PREWARM_TABLES")
+    table_cache_ttl: float = Field(300.0, alias="TABLE_CACHE_TTL")
+    log_level: str = Field("INFO", alias="LOG_LEVEL")
+    log_format: str = Field("json", alias="LOG_FORMAT")
+    memory_limit_mb: int = Field(0, alias="MEMORY_LIMIT_MB")
+    memory_high_watermark: float = Field(0.75, alias="MEMORY_HIGH_WATERMARK")
+    memory_critical_watermark: float = Field(0.9, alias="MEMORY_CRITICAL_WATERMARK")
+    deadline_reserve: float = Field(2.0, alias="DEADLINE_RESERVE")
+    circuit_failure_rate: float = Field(0.5, alias="CIRCUIT_FAILURE_RATE")
+    circuit_slow_call_seconds: float = Field(10.0, alias="CIRCUIT_SLOW_CALL_SECONDS")
+    circuit_min_calls: int = Field(10, alias="CIRCUIT_MIN_CALLS")
+    circuit_open_seconds: float = Field(30.0, alias="CIRCUIT_OPEN_SECONDS")
+    hedge_operations: str = Field("", alias="HEDGE_OPERATIONS")
+    hedge_percentile: float = Field(0.95, alias="HEDGE_PERCENTILE")
+    hedge_budget: float = Field(0.05, alias="HEDGE_BUDGET")
+    concurrency_initial_limit: float = Field(8.0, alias="CONCURRENCY_INITIAL_LIMIT")
+    concurrency_max_limit: float = Field(64.0, alias="CONCURRENCY_MAX_LIMIT")
+    notify_routes: str = Field("", alias="NOTIFY_ROUTES")
+    gzip_targets: str = Field("", alias="GZIP_TARGETS")
+    gzip_level: int = Field(1, alias="GZIP_LEVEL")
+    gzip_min_bytes: int = Field(1024, alias="GZIP_MIN_BYTES")
+
+    model_config = {
+        "env_file": "project.env",
+        "case_sensitive": False,
+        "extra": "allow",
+    }
+
+    _secrets: Optional[LazySecrets] = PrivateAttr(default=None)
+
+    split_list = staticmethod(split_list)
+
+    def model_post_init(self, context: Any) -> None:
+        # Secret-backed fields stay out of __dict__ until first access (see secret_settings).
+        if references := split_references(self.__dict__):
+            self._secrets = LazySecrets(references, self.__dict__.get("project_id", ""))
+
+    if not TYPE_CHECKING:
+        # Hidden from type checkers like BaseModel.__getattr__, so unknown setting names stay errors.
+
+        def __getattr__(self, name: str) -> Any:
+            secrets = None if name.startswith("_") else self._secrets
+            if secrets is None or name not in secrets:
+                return super().__getattr__(name)
+            for field, value in secrets.resolve().items():
+                if field not in self.__dict__:
+                    self.__pydantic_validator__.validate_assignment(self, field, value)
+            return self.__dict__[name]
+
+    def secret_references(self) -> dict[str, str]:
+        """:return: The ``sm://`` references of secret-backed fields, resolved or not."""
+        return dict(self._secrets.references) if self._secrets else {}
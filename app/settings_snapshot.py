@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: settings_snapshot.py
+
+Build-time settings snapshot.
+
+``.github/scripts/load_env_vars.py --settings-snapshot`` validates Settings against the
+variables the deployment runs with and writes the result to ``settings_snapshot.json``
+next to this file. At runtime config restores that file as a FrozenSettings instead of
+instantiating Settings, which skips importing pydantic, reading project.env and validating
+every field. A snapshot is only used while its fingerprint matches: the same settings model
+source and the same value for every variable the model reads. Anything else falls back to
+full validation. This module must stay free of pydantic imports.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Iterable, Mapping, Optional
+
+from secret_settings import LazySecrets, split_references
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_PATH = Path(__file__).with_name("settings_snapshot.json")
+MODEL_PATH = Path(__file__).with_name("settings_model.py")
+# Settings reads this dotenv file from the working directory; when it exists its values
+# take part in validation and a snapshot built from the environment alone does not apply.
+ENV_FILE = "project.env"
+
+
+def split_list(value: str) -> list[str]:
+    """Splits a comma-separated setting such as WARM_CLIENTS into its items."""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+class FrozenSettings:
+    """
+    Read-only settings restored from a snapshot. Exposes the same attributes as Settings;
+    secret-backed ones resolve on first access like they do there.
+    """
+
+    split_list = staticmethod(split_list)
+
+    def __init__(self, values: Mapping[str, Any]) -> None:
+        values = dict(values)
+        references = split_references(values)
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+        object.__setattr__(self, "_secrets", LazySecrets(references, values.get("project_id", "")) if references else None)
+
+    def __getattr__(self, name: str) -> Any:
+        secrets = self.__dict__.get("_secrets")
+        if secrets is None or name not in secrets:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        for field, value in secrets.resolve().items():
+            self.__dict__.setdefault(field, value)
+        return self.__dict__[name]
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"Settings are frozen; cannot set {name!r}.")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"Settings are frozen; cannot delete {name!r}.")
+
+    def __repr__(self) -> str:
+        return f"FrozenSettings({self.model_dump()!r})"
+
+    def model_dump(self) -> dict[str, Any]:
+        return {name: value for name, value in vars(self).items() if name != "_secrets"}
+
+    def secret_references(self) -> dict[str, str]:
+        return dict(self._secrets.references) if self._secrets else {}
+
+
+def fingerprint(aliases: Iterable[str], environ: Mapping[str, str], model_source: bytes) -> str:
+    """
+    Hash of the settings model source and of the values ``environ`` holds for ``aliases``.
+    Names are compared case-insensitively, as Settings does.
+    """
+    wanted = {alias.lower() for alias in aliases}
+    values = sorted((key.lower(), value) for key, value in environ.items() if key.lower() in wanted)
+    digest = hashlib.sha256(model_source)
+    digest.update(json.dumps(values, separators=(",", ":")).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_snapshot(settings: Any, environ: Mapping[str, str]) -> dict[str, Any]:
+    """
+    Snapshot content for a validated Settings instance.
+
+    :param settings: Settings built from ``environ`` alone (``_env_file=None``).
+    :param environ: The variables the deployment will run with.
+    """
+    aliases = sorted(field.alias or name for name, field in type(settings).model_fields.items())
+    return {
+        "version": SNAPSHOT_VERSION,
+        "aliases": aliases,
+        "fingerprint": fingerprint(aliases, environ, MODEL_PATH.read_bytes()),
+        # Secret-backed fields keep their sm:// reference; secret values never reach the file.
+        "values": {**settings.model_dump(mode="json"), **settings.secret_references()},
+    }
+
+
+def write_snapshot(snapshot: dict[str, Any], path: Path = SNAPSHOT_PATH) -> None:
+    path.write_text(json.dumps(snapshot, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+
+
+def load_snapshot(path: Path = SNAPSHOT_PATH, environ: Mapping[str, str] = os.environ) -> Optional[FrozenSettings]:
+    """
+    :return: The snapshot's settings, or None when it is missing, unreadable or stale, or a
+             project.env in the working directory would change the result.
+    """
+    if Path(ENV_FILE).is_file():
+        return None
+    try:
+        snapshot = json.loads(path.read_bytes())
+        model_source = MODEL_PATH.read_bytes()
+    except (OSError, ValueError):
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    if snapshot.get("fingerprint") != fingerprint(snapshot.get("aliases", ()), environ, model_source):
+        return None
+    return FrozenSettings(snapshot["values"])
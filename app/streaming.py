@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: streaming.py
+
+Incremental JSON ingestion from a request body.
+
+``iter_json_rows()`` reads the body in fixed-size chunks and yields one decoded row at a
+time, so a body of any size never exists as a whole in memory. It accepts NDJSON (also
+concatenated or pretty-printed objects) and a top-level JSON array of objects.
+``ingest()`` feeds those rows into ``BigQueryManager.insert_stream``, which only reads
+ahead when an insert slot is free.
+"""
+
+import codecs
+import json
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Iterator, Mapping
+
+import deadline
+from lifecycle import lifecycle
+
+NDJSON_MIMETYPES = frozenset({"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"})
+DEFAULT_CHUNK_SIZE = 64 * 1024
+# BigQuery's own per-row limit for streaming inserts.
+MAX_ROW_BYTES = 10 * 1024 * 1024
+_WHITESPACE = " \t\r\n"
+
+
+def wants_streaming(mimetype: str, args: Mapping[str, str]) -> bool:
+    """
+    True when a request body should be ingested incrementally instead of via get_json().
+
+    :param mimetype: Request mimetype without parameters.
+    :param args: Query arguments; ``stream=1`` opts a plain application/json array in.
+    """
+    if mimetype in NDJSON_MIMETYPES:
+        return True
+    return mimetype == "application/json" and args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def iter_json_rows(  # pylint: disable=too-many-branches,too-many-statements  # noqa: PLR0912, PLR0915
+    stream: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE, max_row_bytes: int = MAX_ROW_BYTES
+) -> Iterator[tuple[dict[str, Any], int]]:
+    """
+    Decode JSON objects from a byte stream one at a time.
+
+    :param stream: Readable binary stream, e.g. ``request.stream``.
+    :param chunk_size: Bytes read per call.
+    :param max_row_bytes: Largest accepted row; bigger rows raise instead of buffering on.
+    :return: Iterator of ``(row, encoded_size)``; the size is in characters of the source text.
+    :raises ValueError: On malformed JSON, non-object rows or oversized rows.
+    """
+    decoder = json.JSONDecoder()
+    text = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    eof = False
+    in_array: bool | None = None
+    expect_separator = False
+    closed = False
+
+    def fill(min_chars: int) -> bool:
+        """Appends at least ``min_chars`` more characters unless the stream ends."""
+        nonlocal buffer, pos, eof
+        buffer = buffer[pos:]
+        pos = 0
+        target = len(buffer) + min_chars
+        while not eof and len(buffer) < target:
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += text.decode(chunk or b"", final=eof)
+        return len(buffer) > 0
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        if pos >= len(buffer):
+            if eof or not fill(1):
+                break
+            continue
+
+        if closed:
+            raise ValueError("Unexpected data after the JSON array.")
+        if in_array is None:
+            in_array = buffer[pos] == "["
+            if in_array:
+                pos += 1
+            continue
+        if in_array:
+            char = buffer[pos]
+            if char == "]":
+                in_array, closed = False, True
+                pos += 1
+                continue
+            if expect_separator:
+                if char != ",":
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}.")
+                pos += 1
+                expect_separator = False
+                continue
+
+        try:
+            row, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError as e:
+            pending = len(buffer) - pos
+            if eof:
+                raise ValueError(f"Malformed JSON row: {e.msg}.") from e
+            if pending > max_row_bytes:
+                raise ValueError(f"Row exceeds {max_row_bytes} bytes.") from e
+            # Grow geometrically so one large row is not re-parsed once per chunk.
+            fill(max(chunk_size, pending))
+            continue
+        if not isinstance(row, dict):
+            raise ValueError(f"Rows must be JSON objects, got {type(row).__name__}.")
+        yield row, end - pos
+        pos = end
+        expect_separator = bool(in_array)
+
+    if in_array:
+        raise ValueError("Unterminated JSON array.")
+
+
+@dataclass
+class IngestResult:
+    """Outcome of one streamed request body."""
+
+    rows: int = 0
+    bytes: int = 0
+    errors: list[dict[str, Any]] | None = None
+
+
+def ingest(  # pylint: disable=too-many-arguments  # noqa: PLR0913
+    stream: BinaryIO,
+    table_name: str,
+    batch_size: int,
+    max_batch_bytes: int,
+    max_in_flight: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    timeout: float | None = None,
+    max_attempts: int = 1,
+    dead_letter_bucket: str = "",
+) -> IngestResult:
+    """
+    Stream rows from ``stream`` into ``table_name`` on the lifecycle loop and block until done.
+
+    :param stream: Request body stream.
+    :param table_name: Fully qualified destination table.
+    :param batch_size: Row cap per insert_rows_json call.
+    :param max_batch_bytes: Size cap per insert_rows_json call.
+    :param max_in_flight: Concurrent insert_rows_json calls.
+    :param chunk_size: Bytes read from the stream at a time.
+    :param timeout: Seconds before the ingestion is abandoned. Capped by the request deadline.
+    :param max_attempts: Insert attempts per row; above 1 transiently failed rows are retried.
+    :param dead_letter_bucket: Bucket for rows that finally failed; ingestion then continues past them.
+    :return: Row and byte counts plus row errors, if any.
+    """
+    # pylint: disable=import-outside-toplevel
+    from cloud_tools.bigquery_retry import DeadLetterSink, RetryPolicy
+    from cloud_tools.google_bigquerymanager import BigQueryManager
+
+    result = IngestResult()
+
+    def counted() -> Iterator[tuple[dict[str, Any], int]]:
+        for row, size in iter_json_rows(stream, chunk_size):
+            result.rows += 1
+            result.bytes += size
+            yield row, size
+
+    retry = RetryPolicy(max_attempts=max_attempts) if max_attempts > 1 else None
+    dead_letter = DeadLetterSink(dead_letter_bucket, prefix=f"dead-letter/{table_name}") if dead_letter_bucket else None
+    result.errors = lifecycle.run(
+        BigQueryManager().insert_stream(
+            table_name, counted(), batch_size, max_batch_bytes, max_in_flight, retry=retry, dead_letter=dead_letter
+        ),
+        deadline.rpc_timeout(timeout, "stream_ingest"),
+    )
+    return result
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: structured_logging.py
+
+Batched JSON logging for Cloud Logging.
+
+``install()`` replaces loguru's synchronous stderr handler with BatchedJsonSink. The calling
+thread only appends the loguru record to a queue; a writer thread turns records into one
+JSON object per line (severity, source location, exception text, ``extra`` fields) and
+writes them in batches, so the request path never formats JSON or blocks on stderr.
+``request_context()`` binds the trace of the incoming request to every record logged
+inside it, which lets Cloud Logging group a request's entries under its trace.
+
+Pass values as arguments (``log.debug("Sent {} rows", n)``) rather than f-strings: loguru
+only formats a message when its level is enabled.
+"""
+
+import queue
+import re
+import sys
+import threading
+import time
+import traceback
+from contextlib import AbstractContextManager
+from typing import Any, Mapping, Optional, TextIO
+
+from loguru import logger as log
+
+import serialization
+from metrics import counter
+
+TRACE_KEY = "logging.googleapis.com/trace"
+SPAN_KEY = "logging.googleapis.com/spanId"
+SAMPLED_KEY = "logging.googleapis.com/trace_sampled"
+SOURCE_KEY = "logging.googleapis.com/sourceLocation"
+
+# loguru level name -> Cloud Logging severity.
+SEVERITIES = {
+    "TRACE": "DEBUG",
+    "DEBUG": "DEBUG",
+    "INFO": "INFO",
+    "SUCCESS": "NOTICE",
+    "WARNING": "WARNING",
+    "ERROR": "ERROR",
+    "CRITICAL": "CRITICAL",
+}
+
+LOG_RECORDS_DROPPED = counter("log_records_dropped", "Log records dropped because the sink queue was full.")
+
+_STOP = object()
+
+
+def format_record(record: Mapping[str, Any]) -> str:
+    """
+    One Cloud Logging structured entry (a JSON line) for a loguru record.
+
+    :param record: The ``record`` attribute of a loguru message.
+    """
+    message = record["message"]
+    if record["exception"] is not None:
+        message = f"{message}\n{''.join(traceback.format_exception(*record['exception']))}".rstrip()
+    entry = {
+        "severity": SEVERITIES.get(record["level"].name, "DEFAULT"),
+        "message": message,
+        "time": record["time"].isoformat(),
+        SOURCE_KEY: {
+            "file": record["file"].path,
+            "line": str(record["line"]),
+            "function": f"{record['name']}.{record['function']}",
+        },
+    }
+    for key, value in record["extra"].items():
+        entry.setdefault(key, value)
+    try:
+        return serialization.dumps_str(entry) + "\n"
+    except (TypeError, ValueError):
+        entry.update((key, repr(value)) for key, value in record["extra"].items() if key not in (TRACE_KEY, SPAN_KEY, SAMPLED_KEY))
+        return serialization.dumps_str(entry) + "\n"
+
+
+class BatchedJsonSink:
+    """
+    loguru sink that queues records and writes them as JSON lines from a background thread.
+
+    Deliberately has no ``flush`` method: loguru would call it after every record.
+    """
+
+    def __init__(
+        self,
+        stream: Optional[TextIO] = None,
+        batch_size: int = 256,
+        flush_interval: float = 0.1,
+        max_queue: int = 10_000,
+    ) -> None:
+        """
+        :param stream: Where entries go. Defaults to the current ``sys.stderr``.
+        :param batch_size: Entries written together at most.
+        :param flush_interval: Seconds a queued entry waits at most before it is written.
+        :param max_queue: Records held before new ones are dropped (counted in log_records_dropped).
+        """
+        self.stream = stream or sys.stderr
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, message: Any) -> None:
+        """Called by loguru on the logging thread; only enqueues the record."""
+        if self._queue.qsize() >= self.max_queue:
+            LOG_RECORDS_DROPPED.inc()
+            return
+        self._queue.put(message.record)
+
+    def drain(self, timeout: Optional[float] = 2.0) -> bool:
+        """
+        Block until every record queued so far is written.
+
+        :return: False if the writer did not catch up within ``timeout``.
+        """
+        if not self._thread.is_alive():
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self) -> None:
+        """Called by loguru when the handler is removed: writes what is queued and stops."""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout=5)
+
+    def _run(self) -> None:
+        batch: list[str] = []
+        deadline = 0.0
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0) if batch else None)
+            except queue.Empty:
+                batch = self._write(batch)
+                continue
+            if item is _STOP:
+                self._write(batch)
+                return
+            if isinstance(item, threading.Event):
+                batch = self._write(batch)
+                item.set()
+                continue
+            if not batch:
+                deadline = time.monotonic() + self.flush_interval
+            try:
+                batch.append(format_record(item))
+            except Exception as e:  # pylint: disable=W0718
+                batch.append(f'{{"severity":"ERROR","message":"Unformattable log record: {type(e).__name__}"}}\n')
+            if len(batch) >= self.batch_size:
+                batch = self._write(batch)
+
+    def _write(self, batch: list[str]) -> list[str]:
+        if batch:
+            try:
+                self.stream.write("".join(batch))
+                self.stream.flush()
+            except (OSError, ValueError):
+                pass  # stream closed during interpreter shutdown
+        return []
+
+
+_sink: Optional[BatchedJsonSink] = None
+_project_id = ""
+
+
+def install(level: str = "INFO", fmt: str = "json", project_id: str = "", **sink_options: Any) -> Optional[BatchedJsonSink]:
+    """
+    Replace every loguru handler with one writing at ``level``.
+
+    :param level: Lowest loguru level written; lower levels cost one comparison per call.
+    :param fmt: "json" for BatchedJsonSink, "text" for loguru's default stderr format.
+    :param project_id: Project of the trace ids bound by request_context().
+    :param sink_options: Passed to BatchedJsonSink.
+    :return: The JSON sink, or None for text output.
+    """
+    global _sink, _project_id  # pylint: disable=global-statement  # noqa: PLW0603
+    log.remove()
+    _project_id = project_id
+    if fmt == "text":
+        _sink = None
+        log.add(sys.stderr, level=level)
+        return None
+    if fmt != "json":
+        raise ValueError(f"Unknown log format {fmt!r}; expected 'json' or 'text'.")
+    _sink = BatchedJsonSink(**sink_options)
+    log.add(_sink, level=level, format="{message}", backtrace=False, diagnose=False)
+    return _sink
+
+
+def flush(timeout: Optional[float] = 2.0) -> bool:
+    """Write every queued entry now; a no-op for text output."""
+    return _sink.drain(timeout) if _sink is not None else True
+
+
+# version-trace_id-span_id-flags; later versions may append fields.
+_TRACEPARENT = re.compile(r"[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})(?:-.*)?", re.IGNORECASE)
+# TRACE_ID[/SPAN_ID][;o=OPTIONS], the span in decimal.
+_CLOUD_TRACE = re.compile(r"([0-9a-f]{1,32})(?:/([0-9]{0,20}))?(?:;(.*))?", re.IGNORECASE)
+_MAX_SPAN = 2**64 - 1
+
+
+def trace_fields(headers: Mapping[str, str], project_id: Optional[str] = None) -> dict[str, Any]:
+    """
+    Cloud Logging trace fields for a request, from ``traceparent`` (W3C) or
+    ``X-Cloud-Trace-Context``. Empty when neither header is present or parseable.
+
+    :param headers: Request headers.
+    :param project_id: Project owning the trace; defaults to the one given to install().
+    """
+    project_id = project_id if project_id is not None else _project_id
+    if parent := headers.get("traceparent"):
+        if (match := _TRACEPARENT.fullmatch(parent.strip())) is None:
+            return {}
+        trace_id, span_id, flags = match.groups()
+        sampled = int(flags, 16) & 1 == 1
+    elif cloud := headers.get("X-Cloud-Trace-Context"):
+        if (match := _CLOUD_TRACE.fullmatch(cloud.strip())) is None:
+            return {}
+        trace_id, span, options = match.groups()
+        if span and int(span) > _MAX_SPAN:
+            return {}
+        span_id = f"{int(span):016x}" if span else ""
+        sampled = options == "o=1"
+    else:
+        return {}
+    fields: dict[str, Any] = {TRACE_KEY: f"projects/{project_id}/traces/{trace_id}", SAMPLED_KEY: sampled}
+    if span_id:
+        fields[SPAN_KEY] = span_id
+    return fields
+
+
+def request_context(headers: Mapping[str, str]) -> AbstractContextManager:
+    """
+    Bind the request's trace to every record logged in this context (thread or task).
+
+    Usage: ``with request_context(request.headers): ...``
+    """
+    return log.contextualize(**trace_fields(headers))
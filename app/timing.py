@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = "==3.12.9"
+# dependencies = []
+# ///
+
+"""
+SPDX-License-Identifier: LicenseRef-NonCommercial-Only
+© 2025 github.com/defmon3 — Non-commercial use only. Commercial use requires permission.
+Format docstrings according to PEP 287
+File: timing.py
+
+Per-request latency spans.
+
+``start_request()`` installs a RequestTimer in a context variable; ``span()`` and
+``@timed()`` record monotonic durations into it. ``end_request()`` logs the aggregated
+breakdown as structured loguru fields under ``extra["timing"]``. Every span also feeds the
+instance-wide ``operation_duration_seconds`` histogram, so tail latency is tracked across
+requests even when no request timer is active.
+"""
+
+import functools
+import inspect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+from loguru import logger as log
+
+from metrics import counter, histogram
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class RequestTimer:
+    """
+    Collects span durations for one request.
+    """
+
+    __slots__ = ("start_ns", "spans")
+
+    def __init__(self) -> None:
+        self.start_ns = time.perf_counter_ns()
+        # name -> [count, total_ns, max_ns, errors]
+        self.spans: dict[str, list[int]] = {}
+
+    def record(self, name: str, duration_ns: int, failed: bool = False) -> None:
+        """
+        Adds one span measurement.
+
+        :param name: Span name, e.g. "bigquery.query".
+        :param duration_ns: Duration in nanoseconds.
+        :param failed: True when the wrapped call raised.
+        """
+        stats = self.spans.get(name)
+        if stats is None:
+            self.spans[name] = [1, duration_ns, duration_ns, int(failed)]
+            return
+        stats[0] += 1
+        stats[1] += duration_ns
+        stats[2] = max(stats[2], duration_ns)
+        stats[3] += failed
+
+    def elapsed_ms(self) -> float:
+        """Milliseconds since the request started."""
+        return (time.perf_counter_ns() - self.start_ns) / 1e6
+
+    def breakdown(self) -> dict[str, Any]:
+        """Aggregated timings, JSON-serialisable."""
+        return {
+            "total_ms": round(self.elapsed_ms(), 3),
+            "spans": {
+                name: {
+                    "count": count,
+                    "total_ms": round(total_ns / 1e6, 3),
+                    "max_ms": round(max_ns / 1e6, 3),
+                    "errors": errors,
+                }
+                for name, (count, total_ns, max_ns, errors) in self.spans.items()
+            },
+        }
+
+
+OPERATION_DURATION = histogram("operation_duration_seconds", "Duration of timed operations.", ["operation"])
+OPERATION_ERRORS = counter("operation_errors", "Timed operations that raised.", ["operation"])
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+
+def start_request() -> RequestTimer:
+    """Starts timing a new request in the current context."""
+    timer = RequestTimer()
+    _current_timer.set(timer)
+    return timer
+
+
+def current_timer() -> Optional[RequestTimer]:
+    """The active request's timer, if any."""
+    return _current_timer.get()
+
+
+def end_request(emit: bool = True) -> dict[str, Any]:
+    """
+    Stops timing the current request and returns its breakdown.
+
+    :param emit: Log the breakdown as a structured ``timing`` field.
+    :return: The breakdown, or an empty dict when no request was active.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        return {}
+    _current_timer.set(None)
+    breakdown = timer.breakdown()
+    if emit:
+        log.bind(timing=breakdown).info(f"Request finished in {breakdown['total_ms']:.1f} ms")
+    return breakdown
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Times the enclosed block into the current request's breakdown.
+
+    :param name: Span name.
+    """
+    start = time.perf_counter_ns()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        duration_ns = time.perf_counter_ns() - start
+        OPERATION_DURATION.observe(duration_ns / 1e9, operation=name)
+        if failed:
+            OPERATION_ERRORS.inc(operation=name)
+        if (timer := _current_timer.get()) is not None:
+            timer.record(name, duration_ns, failed)
+
+
+def timed(name: Optional[str] = None) -> Callable[[F], F]:
+    """
+    Decorator timing every call of a sync or async function as a span.
+
+    :param name: Span name, defaults to the function's qualified name.
+    """
+
+    def decorator(func: F) -> F:
+        span_name = name or func.__qualname__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(span_name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
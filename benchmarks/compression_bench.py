@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Bytes on the wire and send time of gzip vs plain insertAll bodies on an egress-limited link.
+
+Encodes insertAll bodies (``{"rows": [{"insertId", "json"}]}``) for the serialization_bench row
+shapes, gzips them the way ``compression.compress`` does at several levels, and reports the
+compression ratio, CPU time per MB and the time to put one body on a link of each bandwidth:
+``compress time + wire bytes / bandwidth``. Latency and server time are the same either way
+and left out.
+
+Usage: python benchmarks/compression_bench.py [--rows 500] [--mbps 50 200 1000] [--levels 1 6 9]
+                                              [--json out.json]
+"""
+
+import argparse
+import gzip
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(BENCH_DIR.parent / "app"), str(BENCH_DIR)]
+
+# pylint: disable=wrong-import-position
+import serialization  # noqa: E402
+from serialization_bench import SHAPES, best_of  # noqa: E402
+
+
+def measure(body: bytes, level: int, repeat: int, bandwidths: list[float]) -> dict[str, Any]:
+    """``level`` 0 sends the body as is."""
+    packed = gzip.compress(body, compresslevel=level, mtime=0) if level else body
+    seconds = best_of(lambda: gzip.compress(body, compresslevel=level, mtime=0), repeat) if level else 0.0
+    return {
+        "wire_bytes": len(packed),
+        "ratio": round(len(body) / len(packed), 2),
+        "compress_ms_per_mb": round(seconds / (len(body) / 1e6) * 1e3, 2),
+        "send_ms": {f"{mbps:g}": round((seconds + len(packed) * 8 / (mbps * 1e6)) * 1e3, 2) for mbps in bandwidths},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="Rows per insertAll body.")
+    parser.add_argument("--mbps", type=float, nargs="+", default=[50.0, 200.0, 1000.0], help="Egress bandwidths.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9], help="gzip levels to compare.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, default=None, help="Write results to this file.")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, dict[str, Any]]] = {}
+    header = "".join(f"{f'{mbps:g} Mbit/s':>14s}" for mbps in args.mbps)
+    print(f"{'shape':8s} {'gzip':>5s} {'wire bytes':>11s} {'ratio':>6s} {'ms/MB':>7s}{header}")
+    for shape, make_row in SHAPES.items():
+        rows = [make_row(i) for i in range(args.rows)]
+        body = serialization.dumps({"rows": [{"insertId": str(uuid.uuid4()), "json": row} for row in rows]})
+        results[shape] = {}
+        for level in [0, *args.levels]:
+            r = results[shape][f"level_{level}"] = measure(body, level, args.repeat, args.mbps)
+            sends = "".join(f"{r['send_ms'][f'{mbps:g}']:11.2f} ms" for mbps in args.mbps)
+            print(
+                f"{shape:8s} {level or 'off':>5} {r['wire_bytes']:11d} {r['ratio']:6.2f} "
+                f"{r['compress_ms_per_mb']:7.2f}{sends}"
+            )
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["google-cloud-bigquery", "google-cloud-storage", "google-cloud-secret-manager", "grpcio"]
+# ///
+
+"""
+Local stand-ins for every backend the app talks to.
+
+- FakeGCS: GCS JSON API subset (multipart upload, media download, delete) over HTTP.
+- FakeBigQuery: insertAll, jobs.insert/get and getQueryResults over HTTP.
+- FakeSecretManager: AccessSecretVersion over gRPC.
+- FakeDiscord: webhook POST over HTTP.
+
+Every fake takes ``latency`` (seconds added to each call) and ``error_rate`` (fraction of
+calls that fail) so benchmarks and load tests can exercise slow and flaky dependencies.
+``*_client()`` helpers build real google-cloud clients pointed at the fake.
+"""
+
+import json
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+from concurrent import futures
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+
+class FaultInjector:
+    """Adds latency and random failures to a fake backend."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        self.latency = latency
+        self.error_rate = error_rate
+        self.calls = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self) -> bool:
+        """Sleeps for the configured latency and returns True when this call must fail."""
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.error_rate
+            self.failures += failed
+        return failed
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_FakeHTTPServer"
+
+    def setup(self) -> None:
+        super().setup()
+        # Headers and body are written separately; without this Nagle + delayed ACK add ~40 ms.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format: str, *args: Any) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+    def _dispatch(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        fake = self.server.fake
+        if fake.faults():
+            self._respond(fake.error_status, {"error": {"code": fake.error_status, "message": "injected failure"}})
+            return
+        status, payload, headers = fake.handle(self.command, self.path, self.headers, body)
+        self._respond(status, payload, headers)
+
+    def _respond(self, status: int, payload: Any, headers: Optional[dict[str, str]] = None) -> None:
+        if isinstance(payload, (bytes, bytearray)):
+            data = bytes(payload)
+            content_type = "application/octet-stream"
+        elif payload is None:
+            data = b""
+            content_type = "text/plain"
+        else:
+            data = json.dumps(payload).encode()
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if data and self.command != "HEAD":
+            self.wfile.write(data)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = _dispatch
+
+
+class _FakeHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, fake: "FakeHTTPBackend") -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.fake = fake
+
+
+class FakeHTTPBackend:
+    """Base class: an HTTP fake served from a background thread."""
+
+    error_status = 503
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        self.faults = FaultInjector(latency, error_rate, seed)
+        self._server = _FakeHTTPServer(self)
+        self._thread = threading.Thread(target=self._server.serve_forever, name=type(self).__name__, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeHTTPBackend":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):  # type: ignore[no-untyped-def]
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+    def handle(self, method: str, path: str, headers: Any, body: bytes) -> tuple[int, Any, Optional[dict[str, str]]]:
+        raise NotImplementedError
+
+
+class FakeDiscord(FakeHTTPBackend):
+    """Discord webhook: accepts JSON or multipart posts and answers 204."""
+
+    error_status = 500
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        super().__init__(latency, error_rate, seed)
+        self.received = 0
+
+    @property
+    def webhook_url(self) -> str:
+        return f"{self.url}/api/webhooks/1/token"
+
+    def handle(self, method: str, path: str, headers: Any, body: bytes) -> tuple[int, Any, Optional[dict[str, str]]]:
+        self.received += 1
+        return 204, None, None
+
+
+class FakeGCS(FakeHTTPBackend):
+    """GCS JSON API subset: multipart upload, media download, delete."""
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None) -> None:
+        super().__init__(latency, error_rate, seed)
+        self.blobs: dict[tuple[str, str], bytes] = {}
+
+    def _resource(self, bucket: str, name: str) -> dict[str, Any]:
+        return {
+            "kind": "storage#object",
+            "bucket": bucket,
+            "name": name,
+            "size": str(len(self.blobs[(bucket, name)])),
+            "generation": "1",
+            "metageneration": "1",
+        }
+
+    def handle(self, method: str, path: str, headers: Any, body: bytes) -> tuple[int, Any, Optional[dict[str, str]]]:
+        parsed = urlparse(path)
+        query = parse_qs(parsed.query)
+        if method == "POST" and (match := re.fullmatch(r"/upload/storage/v1/b/([^/]+)/o", parsed.path)):
+            bucket = match.group(1)
+            message = BytesParser(policy=HTTP).parsebytes(b"Content-Type: " + headers["Content-Type"].encode() + b"\r\n\r\n" + body)
+            metadata_part, data_part = list(message.iter_parts())
+            name = json.loads(metadata_part.get_content())["name"] if "name" not in query else query["name"][0]
+            self.blobs[(bucket, name)] = data_part.get_payload(decode=True) or b""
+            return 200, self._resource(bucket, name), None
+        if match := re.fullmatch(r"/(?:download/)?storage/v1/b/([^/]+)/o/(.+)", parsed.path):
+            bucket, name = match.group(1), unquote(match.group(2))
+            if (bucket, name) not in self.blobs:
+                return 404, {"error": {"code": 404, "message": "No such object"}}, None
+            if method == "DELETE":
+                del self.blobs[(bucket, name)]
+                return 204, None, None
+            if query.get("alt") == ["media"]:
+                return 200, self.blobs[(bucket, name)], {"x-goog-generation": "1"}
+            return 200, self._resource(bucket, name), None
+        return 404, {"error": {"code": 404, "message": f"{method} {parsed.path} not faked"}}, None
+
+
+class FakeBigQuery(FakeHTTPBackend):
+    """BigQuery REST subset: insertAll, jobs.insert/get and getQueryResults."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+        row_error_rate: float = 0.0,
+        query_rows: int = 100,
+    ) -> None:
+        super().__init__(latency, error_rate, seed)
+        self.row_error_rate = row_error_rate
+        self.query_rows = query_rows
+        self.inserted_rows = 0
+        self.jobs: dict[str, dict[str, Any]] = {}
+        self._random = random.Random(seed)
+
+    def _query_result(self, project: str, job_id: str) -> dict[str, Any]:
+        return {
+            "kind": "bigquery#getQueryResultsResponse",
+            "jobReference": {"projectId": project, "jobId": job_id, "location": "EU"},
+            "jobComplete": True,
+            "schema": {"fields": [{"name": "id", "type": "INTEGER"}, {"name": "name", "type": "STRING"}]},
+            "totalRows": str(self.query_rows),
+            "rows": [{"f": [{"v": str(i)}, {"v": f"row-{i}"}]} for i in range(self.query_rows)],
+        }
+
+    def handle(self, method: str, path: str, headers: Any, body: bytes) -> tuple[int, Any, Optional[dict[str, str]]]:
+        parsed = urlparse(path)
+        api_path = parsed.path.removeprefix("/bigquery/v2")
+        if method == "POST" and re.fullmatch(r"/projects/[^/]+/datasets/[^/]+/tables/[^/]+/insertAll", api_path):
+            rows = json.loads(body)["rows"]
+            self.inserted_rows += len(rows)
+            errors = [
+                {"index": index, "errors": [{"reason": "backendError", "message": "injected row error"}]}
+                for index in range(len(rows))
+                if self.row_error_rate and self._random.random() < self.row_error_rate
+            ]
+            return 200, {"kind": "bigquery#tableDataInsertAllResponse", **({"insertErrors": errors} if errors else {})}, None
+        if method == "POST" and (match := re.fullmatch(r"/projects/([^/]+)/jobs", api_path)):
+            resource = json.loads(body)
+            reference = resource.get("jobReference") or {}
+            job_id = reference.get("jobId") or uuid.uuid4().hex
+            job = {
+                **resource,
+                "jobReference": {"projectId": match.group(1), "jobId": job_id, "location": "EU"},
+                "status": {"state": "DONE"},
+                "statistics": {"creationTime": "0", "startTime": "0", "endTime": "0", "query": {"totalBytesProcessed": "0"}},
+            }
+            self.jobs[job_id] = job
+            return 200, job, None
+        if method == "GET" and (match := re.fullmatch(r"/projects/([^/]+)/jobs/([^/]+)", api_path)):
+            job = self.jobs.get(match.group(2))
+            return (200, job, None) if job else (404, {"error": {"code": 404, "message": "job not found"}}, None)
+        if method == "GET" and (match := re.fullmatch(r"/projects/([^/]+)/queries/([^/]+)", api_path)):
+            return 200, self._query_result(match.group(1), match.group(2)), None
+        return 404, {"error": {"code": 404, "message": f"{method} {api_path} not faked"}}, None
+
+
+class FakeSecretManager:
+    """Secret Manager AccessSecretVersion served by a real gRPC server."""
+
+    def __init__(
+        self, secrets: Optional[dict[str, str]] = None, latency: float = 0.0, error_rate: float = 0.0, seed: Optional[int] = None
+    ) -> None:
+        import grpc  # pylint: disable=import-outside-toplevel
+        from google.cloud.secretmanager_v1.types import service  # pylint: disable=import-outside-toplevel
+
+        self.secrets = secrets or {}
+        self.faults = FaultInjector(latency, error_rate, seed)
+        self._grpc = grpc
+        self._server = grpc.server(futures.ThreadPoolExecutor(max_workers=32))
+        handler = grpc.method_handlers_generic_handler(
+            "google.cloud.secretmanager.v1.SecretManagerService",
+            {
+                "AccessSecretVersion": grpc.unary_unary_rpc_method_handler(
+                    self._access,
+                    request_deserializer=service.AccessSecretVersionRequest.deserialize,
+                    response_serializer=service.AccessSecretVersionResponse.serialize,
+                )
+            },
+        )
+        self._server.add_generic_rpc_handlers((handler,))
+        self.port = self._server.add_insecure_port("127.0.0.1:0")
+        self._service = service
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def _access(self, request: Any, context: Any) -> Any:
+        if self.faults():
+            context.abort(self._grpc.StatusCode.UNAVAILABLE, "injected failure")
+        secret_id = request.name.split("/")[3]
+        if secret_id not in self.secrets:
+            context.abort(self._grpc.StatusCode.NOT_FOUND, f"{request.name} not found")
+        return self._service.AccessSecretVersionResponse(
+            name=request.name, payload={"data": self.secrets[secret_id].encode()}
+        )
+
+    def start(self) -> "FakeSecretManager":
+        self._server.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.stop(grace=None)
+
+    def __enter__(self):  # type: ignore[no-untyped-def]
+        return self.start()
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.stop()
+
+
+def bigquery_client(endpoint: str, project: str = "bench-project") -> Any:
+    """Real bigquery.Client talking to the fake at ``endpoint`` (FakeBigQuery.url)."""
+    from google.api_core.client_options import ClientOptions  # pylint: disable=import-outside-toplevel
+    from google.auth.credentials import AnonymousCredentials  # pylint: disable=import-outside-toplevel
+    from google.cloud import bigquery  # pylint: disable=import-outside-toplevel
+
+    return bigquery.Client(
+        project=project, credentials=AnonymousCredentials(), client_options=ClientOptions(api_endpoint=endpoint)
+    )
+
+
+def storage_client(endpoint: str, project: str = "bench-project") -> Any:
+    """Real storage.Client talking to the fake at ``endpoint`` (FakeGCS.url)."""
+    from google.api_core.client_options import ClientOptions  # pylint: disable=import-outside-toplevel
+    from google.auth.credentials import AnonymousCredentials  # pylint: disable=import-outside-toplevel
+    from google.cloud import storage  # pylint: disable=import-outside-toplevel
+
+    return storage.Client(
+        project=project, credentials=AnonymousCredentials(), client_options=ClientOptions(api_endpoint=endpoint)
+    )
+
+
+def secretmanager_client(address: str) -> Any:
+    """Real SecretManagerServiceClient talking to the fake at ``address`` (FakeSecretManager.address)."""
+    import grpc  # pylint: disable=import-outside-toplevel
+    from google.cloud import secretmanager  # pylint: disable=import-outside-toplevel
+    from google.cloud.secretmanager_v1.services.secret_manager_service.transports import (  # pylint: disable=import-outside-toplevel
+        SecretManagerServiceGrpcTransport,
+    )
+
+    channel = grpc.insecure_channel(address)
+    return secretmanager.SecretManagerServiceClient(transport=SecretManagerServiceGrpcTransport(channel=channel))
+
+
+FAKES: dict[str, Callable[..., Any]] = {
+    "gcs": FakeGCS,
+    "bigquery": FakeBigQuery,
+    "secretmanager": FakeSecretManager,
+    "discord": FakeDiscord,
+}
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Cold-start import budget check.
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter with ``app/`` on
+the path, parses the per-module timings and fails when the total import cost exceeds the
+budget or regresses past the stored baseline.
+
+Usage: python benchmarks/import_time.py [--module main] [--budget-ms 600] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_DIR = ROOT / "app"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "import_time.json"
+
+# Settings() validates these at import time; placeholder values keep `import main` importable.
+PLACEHOLDER_ENV: dict[str, str] = {
+    "SERVICE_NAME": "import-bench",
+    "PROJECT_ID": "import-bench",
+    "REGION": "europe-west3",
+    "RUNTIME": "python312",
+    "TIMEOUT": "60",
+    "RUNTIME_SERVICE_ACCOUNT_EMAIL": "bench@example.com",
+    "DISCORD_HOOK_URL": "https://discord.invalid/webhook",
+}
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    """One line of ``-X importtime`` output."""
+
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    """Parse ``-X importtime`` stderr into records, skipping unrelated lines."""
+    records: list[ImportRecord] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, raw_name = parts
+        if not self_us.strip().isdigit():
+            continue  # header line
+        depth = (len(raw_name) - len(raw_name.lstrip()) - 1) // 2
+        records.append(ImportRecord(raw_name.strip(), int(self_us), int(cumulative_us), depth))
+    return records
+
+
+def run_importtime(module: str) -> list[ImportRecord]:
+    """Import ``module`` in a fresh interpreter and return its import records."""
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(APP_DIR), env.get("PYTHONPATH", "")]))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def module_subtree(records: list[ImportRecord], module: str) -> list[ImportRecord]:
+    """
+    Records imported on behalf of ``module``, excluding interpreter start-up.
+
+    ``-X importtime`` prints children before their parent, so the subtree is the block of
+    nested records directly preceding the module's own top-level line.
+    """
+    for index in range(len(records) - 1, -1, -1):
+        if records[index].depth == 0 and records[index].name == module:
+            start = index
+            while start > 0 and records[start - 1].depth > 0:
+                start -= 1
+            return records[start : index + 1]
+    raise ValueError(f"{module} not found in -X importtime output")
+
+
+def top_level_costs(subtree: list[ImportRecord], top: int) -> list[tuple[str, float]]:
+    """Cumulative cost (ms) of each direct import of the measured module, most expensive first."""
+    costs = [(r.name, r.cumulative_us / 1000) for r in subtree if r.depth == 1]
+    return sorted(costs, key=lambda item: item[1], reverse=True)[:top]
+
+
+def measure(module: str, repeat: int) -> tuple[float, list[ImportRecord]]:
+    """Median cumulative cost over ``repeat`` runs (after one warm-up for .pyc files) plus the last subtree."""
+    run_importtime(module)
+    totals: list[float] = []
+    subtree: list[ImportRecord] = []
+    for _ in range(repeat):
+        subtree = module_subtree(run_importtime(module), module)
+        totals.append(subtree[-1].cumulative_us / 1000)
+    return statistics.median(totals), subtree
+
+
+def build_report(module: str, median_ms: float, subtree: list[ImportRecord], top: int) -> dict:
+    """Report serialisable to JSON."""
+    return {
+        "module": module,
+        "total_ms": round(median_ms, 1),
+        "modules_imported": len(subtree),
+        "top_level": [{"name": name, "cumulative_ms": round(ms, 1)} for name, ms in top_level_costs(subtree, top)],
+        "heaviest": [asdict(r) for r in sorted(subtree, key=lambda r: r.self_us, reverse=True)[:top]],
+    }
+
+
+def check(report: dict, budget_ms: float | None, baseline: dict | None, tolerance: float, slack_ms: float) -> list[str]:
+    """Return the list of budget/baseline violations (empty when the check passes)."""
+    failures: list[str] = []
+    total = report["total_ms"]
+    if budget_ms is not None and total > budget_ms:
+        failures.append(f"import {report['module']} took {total:.1f} ms, budget is {budget_ms:.1f} ms")
+    if baseline and (reference := baseline.get(report["module"])):
+        limit = reference * (1 + tolerance) + slack_ms
+        if total > limit:
+            failures.append(f"import {report['module']} took {total:.1f} ms, baseline {reference:.1f} ms (limit {limit:.1f} ms)")
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", action="append", help="Module to import (repeatable). Defaults to main and cloud_tools.")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Absolute budget per module in milliseconds.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="Baseline JSON file ({module: total_ms}).")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed regression over the baseline (0.25 = 25%%).")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Absolute slack on top of the tolerance, absorbs noise.")
+    parser.add_argument("--update-baseline", action="store_true", help="Write the measured totals to the baseline file.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", type=Path, default=None, help="Write the full report to this file.")
+    args = parser.parse_args()
+
+    modules = args.module or ["main", "cloud_tools"]
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.is_file() else {}
+
+    reports = []
+    failures: list[str] = []
+    for module in modules:
+        median_ms, subtree = measure(module, args.repeat)
+        report = build_report(module, median_ms, subtree, args.top)
+        reports.append(report)
+        failures.extend(check(report, args.budget_ms, None if args.update_baseline else baseline, args.tolerance, args.slack_ms))
+
+        print(f"import {module}: {report['total_ms']:.1f} ms across {report['modules_imported']} modules")
+        for entry in report["top_level"]:
+            print(f"  {entry['cumulative_ms']:8.1f} ms  {entry['name']}")
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    if args.update_baseline:
+        baseline.update({r["module"]: r["total_ms"] for r in reports})
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}.")
+
+    if failures:
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["functions-framework"]
+# ///
+
+"""
+Serves app/main.py through functions-framework for load tests, with every google-cloud
+client replaced by a local fake. Started as a subprocess by load_test.py.
+
+Fake endpoints come from FAKE_BIGQUERY_URL, FAKE_GCS_URL and FAKE_SECRETMANAGER_ADDR.
+``/__loadtest__/stats`` reports lifecycle event-loop lag and peak RSS of this process;
+``/__loadtest__/reset`` clears them between load stages.
+
+Usage: python benchmarks/load_target.py --port 8080 [--concurrency 80]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent / "app"
+sys.path[:0] = [str(APP_DIR), str(BENCH_DIR)]
+
+# pylint: disable=wrong-import-position
+import fakes  # noqa: E402
+from stats import summarize  # noqa: E402
+
+from cloud_tools import shared_clients  # noqa: E402
+
+STATS_PATH = "/__loadtest__/stats"
+RESET_PATH = "/__loadtest__/reset"
+LAG_PROBE_INTERVAL = 0.01
+
+
+def read_rss_mb() -> tuple[float, float]:
+    """Current (VmRSS) and peak (VmHWM) resident set size in MiB, from /proc."""
+    values = {"VmRSS": 0.0, "VmHWM": 0.0}
+    try:
+        for line in Path("/proc/self/status").read_text(encoding="utf-8").splitlines():
+            key, _, rest = line.partition(":")
+            if key in values:
+                values[key] = int(rest.split()[0]) / 1024
+    except OSError:
+        pass
+    return values["VmRSS"], values["VmHWM"]
+
+
+def reset_peak_rss() -> None:
+    """Resets VmHWM to the current RSS (Linux >= 4.0)."""
+    try:
+        Path("/proc/self/clear_refs").write_text("5", encoding="utf-8")
+    except OSError:
+        pass
+
+
+class LagProbe:
+    """Measures how late the lifecycle loop wakes up from a fixed sleep."""
+
+    def __init__(self, interval: float = LAG_PROBE_INTERVAL) -> None:
+        self.interval = interval
+        self.samples: deque[float] = deque(maxlen=100_000)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+
+class LoadTestMiddleware:
+    """Caps in-flight requests like a Cloud Run instance (429 beyond the cap) and serves stats."""
+
+    def __init__(self, app: Callable[..., Iterable[bytes]], concurrency: int, probe: LagProbe) -> None:
+        self.app = app
+        self.concurrency = concurrency
+        self.probe = probe
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def _json(self, start_response: Callable[..., Any], payload: dict[str, Any]) -> list[bytes]:
+        body = json.dumps(payload).encode()
+        start_response("200 OK", [("Content-Type", "application/json"), ("Content-Length", str(len(body)))])
+        return [body]
+
+    def stats(self) -> dict[str, Any]:
+        rss_mb, peak_rss_mb = read_rss_mb()
+        lag = summarize(list(self.probe.samples), wall_s=0)
+        return {
+            "event_loop_lag": {k: lag[k] for k in ("p50_ms", "p99_ms", "max_ms")},
+            "rss_mb": round(rss_mb, 1),
+            "peak_rss_mb": round(peak_rss_mb, 1),
+            "max_in_flight": self.max_in_flight,
+            "rejected": self.rejected,
+        }
+
+    def __call__(self, environ: dict[str, Any], start_response: Callable[..., Any]) -> Iterable[bytes]:
+        path = environ.get("PATH_INFO", "")
+        if path == STATS_PATH:
+            return self._json(start_response, self.stats())
+        if path == RESET_PATH:
+            self.probe.samples.clear()
+            self.max_in_flight = self.rejected = 0
+            reset_peak_rss()
+            return self._json(start_response, {"reset": True})
+
+        with self._lock:
+            if self.in_flight >= self.concurrency:
+                self.rejected += 1
+                start_response("429 Too Many Requests", [("Content-Length", "0")])
+                return [b""]
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            return list(self.app(environ, start_response))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def wire_fakes() -> None:
+    """Points the shared google-cloud clients at the fakes named in the environment."""
+    if url := os.environ.get("FAKE_BIGQUERY_URL"):
+        shared_clients.set_client("bigquery", fakes.bigquery_client(url))
+    if url := os.environ.get("FAKE_GCS_URL"):
+        shared_clients.set_client("storage", fakes.storage_client(url))
+    if address := os.environ.get("FAKE_SECRETMANAGER_ADDR"):
+        shared_clients.set_client("secretmanager", fakes.secretmanager_client(address))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=80, help="Max in-flight requests (Cloud Run --concurrency).")
+    args = parser.parse_args()
+
+    import functions_framework  # pylint: disable=import-outside-toplevel
+    from loguru import logger as log  # pylint: disable=import-outside-toplevel
+    from werkzeug.serving import make_server  # pylint: disable=import-outside-toplevel
+
+    log.remove()
+    log.add(sys.stderr, level=os.environ.get("LOAD_TARGET_LOG_LEVEL", "WARNING"))
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    wire_fakes()
+    app = functions_framework.create_app(target="main", source=str(APP_DIR / "main.py"))
+
+    from lifecycle import lifecycle  # pylint: disable=import-outside-toplevel
+
+    probe = LagProbe()
+    lifecycle.submit(probe.run())
+    server = make_server("127.0.0.1", args.port, LoadTestMiddleware(app, args.concurrency, probe), threaded=True)
+    print(f"load target listening on 127.0.0.1:{args.port} at {time.strftime('%X')}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = ["functions-framework", "httpx"]
+# ///
+
+"""
+Open-loop load test for the function entry point.
+
+Starts the local fakes, launches load_target.py (app/main.py under functions-framework)
+as a subprocess and fires requests at a fixed target rate regardless of how fast responses
+come back, so queueing shows up as latency instead of silently lowering the offered load.
+Latency is measured from each request's scheduled send time.
+
+Each stage reports a latency histogram, percentiles, error rate, 429s from the
+concurrency cap, lifecycle event-loop lag and peak RSS of the function process.
+
+Usage: python benchmarks/load_test.py --rps 50,200,500 --duration 20 [--concurrency 80]
+                                      [--latency 0.02] [--error-rate 0.01] [--json out.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR))
+
+# pylint: disable=wrong-import-position
+import fakes  # noqa: E402
+from import_time import PLACEHOLDER_ENV  # noqa: E402
+from stats import summarize  # noqa: E402
+
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def histogram(latencies_s: list[float]) -> list[tuple[str, int]]:
+    """Counts per latency bucket (upper bound in ms, non-cumulative)."""
+    counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+    for latency in latencies_s:
+        ms = latency * 1000
+        index = next((i for i, bound in enumerate(HISTOGRAM_BOUNDS_MS) if ms <= bound), len(HISTOGRAM_BOUNDS_MS))
+        counts[index] += 1
+    labels = [f"<= {bound} ms" for bound in HISTOGRAM_BOUNDS_MS] + [f"> {HISTOGRAM_BOUNDS_MS[-1]} ms"]
+    return list(zip(labels, counts))
+
+
+async def open_loop(client: httpx.AsyncClient, url: str, rps: float, duration: float, body: bytes) -> dict[str, Any]:
+    """Sends ``rps * duration`` requests on a fixed schedule and collects their outcomes."""
+    loop = asyncio.get_running_loop()
+    total = int(rps * duration)
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    generator_lag: list[float] = []
+
+    async def one(scheduled: float) -> None:
+        try:
+            response = await client.post(url, content=body, headers={"Content-Type": "application/json"})
+            key = str(response.status_code)
+        except httpx.HTTPError as e:
+            key = type(e).__name__
+        latencies.append(loop.time() - scheduled)
+        statuses[key] = statuses.get(key, 0) + 1
+
+    start = loop.time() + 0.05
+    tasks = []
+    for i in range(total):
+        scheduled = start + i / rps
+        if (delay := scheduled - loop.time()) > 0:
+            await asyncio.sleep(delay)
+        generator_lag.append(max(0.0, loop.time() - scheduled))
+        tasks.append(asyncio.create_task(one(scheduled)))
+    await asyncio.gather(*tasks)
+    wall = loop.time() - start
+
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    summary = summarize(latencies, wall, errors)
+    summary.update(
+        {
+            "target_rps": rps,
+            "achieved_rps": round(total / wall, 1) if wall else 0.0,
+            "statuses": statuses,
+            "generator_lag_max_ms": round(max(generator_lag, default=0.0) * 1000, 3),
+            "histogram": histogram(latencies),
+        }
+    )
+    return summary
+
+
+def start_target(port: int, concurrency: int, env: dict[str, str]) -> subprocess.Popen:
+    proc = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, str(BENCH_DIR / "load_target.py"), "--port", str(port), "--concurrency", str(concurrency)],
+        cwd=BENCH_DIR.parent,
+        env=env,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"load target exited with {proc.returncode}")
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/__loadtest__/stats", timeout=1).raise_for_status()
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("load target did not become ready within 60s")
+
+
+def print_stage(stage: dict[str, Any]) -> None:
+    server = stage["server"]
+    print(
+        f"\n== {stage['target_rps']:g} rps: achieved {stage['achieved_rps']:g} rps, "
+        f"error rate {stage['error_rate']:.2%} {stage['statuses']}"
+    )
+    print(f"   latency p50 {stage['p50_ms']:.1f} ms  p90 {stage['p90_ms']:.1f} ms  p99 {stage['p99_ms']:.1f} ms  max {stage['max_ms']:.1f} ms")
+    lag = server["event_loop_lag"]
+    print(f"   event-loop lag p50 {lag['p50_ms']:.2f} ms  p99 {lag['p99_ms']:.2f} ms  max {lag['max_ms']:.2f} ms")
+    print(
+        f"   peak RSS {server['peak_rss_mb']:.1f} MiB  max in-flight {server['max_in_flight']}  "
+        f"rejected (429) {server['rejected']}  generator lag max {stage['generator_lag_max_ms']:.1f} ms"
+    )
+    peak = max((count for _, count in stage["histogram"]), default=0) or 1
+    for label, count in stage["histogram"]:
+        if count:
+            print(f"   {label:>12s} {count:7d} {'#' * max(1, round(40 * count / peak))}")
+
+
+async def run_stages(base_url: str, stages: list[float], duration: float, body: bytes, max_connections: int) -> list[dict[str, Any]]:
+    results = []
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    async with httpx.AsyncClient(limits=limits, timeout=httpx.Timeout(60.0, pool=None)) as client:
+        for rps in stages:
+            await client.post(f"{base_url}/__loadtest__/reset")
+            stage = await open_loop(client, f"{base_url}/", rps, duration, body)
+            stage["server"] = (await client.get(f"{base_url}/__loadtest__/stats")).json()
+            print_stage(stage)
+            results.append(stage)
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rps", default="50,100,200", help="Comma-separated target rates, one stage each.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per stage.")
+    parser.add_argument("--concurrency", type=int, default=80, help="In-flight cap of the function instance.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added by every fake per call.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake calls that fail.")
+    parser.add_argument("--payload-bytes", type=int, default=1024, help="Approximate JSON request body size.")
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--json", type=Path, default=None, help="Write all stage results to this file.")
+    args = parser.parse_args()
+
+    stages = [float(value) for value in args.rps.split(",") if value.strip()]
+    body = json.dumps({"rows": [{"id": i, "value": "x" * 32} for i in range(max(1, args.payload_bytes // 48))]}).encode()
+
+    with (
+        fakes.FakeBigQuery(args.latency, args.error_rate) as bigquery,
+        fakes.FakeGCS(args.latency, args.error_rate) as gcs,
+        fakes.FakeSecretManager({}, args.latency, args.error_rate) as secretmanager,
+        fakes.FakeDiscord(args.latency, args.error_rate) as discord,
+    ):
+        port = free_port()
+        env = {
+            **os.environ,
+            **PLACEHOLDER_ENV,
+            "DISCORD_HOOK_URL": discord.webhook_url,
+            "FAKE_BIGQUERY_URL": bigquery.url,
+            "FAKE_GCS_URL": gcs.url,
+            "FAKE_SECRETMANAGER_ADDR": secretmanager.address,
+        }
+        target = start_target(port, args.concurrency, env)
+        try:
+            results = asyncio.run(run_stages(f"http://127.0.0.1:{port}", stages, args.duration, body, args.max_connections))
+        finally:
+            target.terminate()
+            target.wait(timeout=30)
+        print(f"\nDiscord fake received {discord.received} notifications.")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Per-call logging overhead on the calling thread.
+
+Compares eager f-strings with lazy ``{}`` arguments when the level is disabled, and, for
+enabled records, loguru's synchronous text sink, loguru's ``enqueue=True`` and
+structured_logging.BatchedJsonSink. Every sink writes to os.devnull; "drained" includes
+the time until the last entry is written.
+
+Usage: python benchmarks/logging_bench.py [--calls 50000] [--repeat 5] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "app"))
+
+# pylint: disable=wrong-import-position
+from loguru import logger as log  # noqa: E402
+
+import structured_logging  # noqa: E402
+
+TABLE = "project.dataset.events"
+ROWS = list(range(50))
+
+
+def eager(i: int) -> None:
+    log.debug(f"[{TABLE}] Retrying {len(ROWS)} rows (attempt {i}): {ROWS[:10]}")
+
+
+def lazy(i: int) -> None:
+    log.debug("[{}] Retrying {} rows (attempt {}): {}", TABLE, len(ROWS), i, ROWS[:10])
+
+
+def per_call_ns(func: Callable[[int], None], calls: int, repeat: int, after: Callable[[], None] = lambda: None) -> tuple[float, float]:
+    """Median ns per call on the calling thread, and including ``after`` (drain)."""
+    calling, drained = [], []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for i in range(calls):
+            func(i)
+        mid = time.perf_counter_ns()
+        after()
+        end = time.perf_counter_ns()
+        calling.append((mid - start) / calls)
+        drained.append((end - start) / calls)
+    return statistics.median(calling), statistics.median(drained)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, default=None)
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, float]] = {}
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        log.remove()
+        log.add(devnull, level="INFO")
+        for name, func in (("disabled.fstring", eager), ("disabled.lazy", lazy)):
+            results[name] = {"calling_ns": per_call_ns(func, args.calls, args.repeat)[0]}
+
+        log.remove()
+        log.add(devnull, level="DEBUG")
+        calling, _ = per_call_ns(lazy, args.calls, args.repeat)
+        results["enabled.sync_text"] = {"calling_ns": calling, "drained_ns": calling}
+
+        log.remove()
+        log.add(devnull, level="DEBUG", enqueue=True)
+        calling, drained = per_call_ns(lazy, args.calls, args.repeat, log.complete)
+        results["enabled.loguru_enqueue"] = {"calling_ns": calling, "drained_ns": drained}
+
+        log.remove()
+        structured_logging.install("DEBUG", "json", "bench", stream=devnull)
+        calling, drained = per_call_ns(lazy, args.calls, args.repeat, lambda: structured_logging.flush(timeout=None))
+        results["enabled.batched_json"] = {"calling_ns": calling, "drained_ns": drained}
+        log.remove()
+
+    for name, result in results.items():
+        line = f"{name:>24}: {result['calling_ns']:8.0f} ns/call"
+        if "drained_ns" in result:
+            line += f", {result['drained_ns']:8.0f} ns/call drained"
+        print(line)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Memory per row and insertAll encode cost: plain dicts vs RowSchema models vs ColumnBatch.
+
+Dicts are encoded by ``serialization`` without validation; models and ColumnBatches are
+validated against the schema while they are encoded.
+
+Usage: python benchmarks/row_schema_bench.py [--rows 10000] [--repeat 5] [--json out.json]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "app"))
+
+# pylint: disable=wrong-import-position
+import serialization  # noqa: E402
+
+from cloud_tools.row_schema import RowSchema  # noqa: E402
+
+SCHEMA = RowSchema.from_api_repr(
+    [
+        {"name": "id", "type": "INTEGER", "mode": "REQUIRED"},
+        {"name": "user_id", "type": "INTEGER", "mode": "REQUIRED"},
+        {"name": "value", "type": "FLOAT", "mode": "REQUIRED"},
+        {"name": "latency_ms", "type": "FLOAT", "mode": "REQUIRED"},
+        {"name": "event", "type": "STRING"},
+        {"name": "country", "type": "STRING"},
+        {"name": "ts", "type": "TIMESTAMP"},
+        {"name": "ok", "type": "BOOLEAN"},
+    ],
+    name="Event",
+)
+
+
+def make_row(i: int) -> dict[str, Any]:
+    return {
+        "id": i,
+        "user_id": i * 7919 % 100_000,
+        "value": i * 0.25,
+        "latency_ms": (i % 500) / 3,
+        "event": ("click", "view", "purchase")[i % 3],
+        "country": ("NO", "DE", "US", "SE")[i % 4],
+        "ts": "2025-01-01T00:00:00Z",
+        "ok": i % 10 != 0,
+    }
+
+
+def retained_bytes(build: Callable[[], Any]) -> tuple[Any, int]:
+    """Builds a container and returns it with the bytes it keeps allocated."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    value = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, after - before
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def dict_body(rows: list[dict[str, Any]]) -> bytes:
+    return serialization.dumps({"rows": [{"insertId": str(uuid.uuid4()), "json": row} for row in rows]})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, default=None, help="Write results to this file.")
+    args = parser.parse_args()
+
+    n = args.rows
+    # Source strings are shared by all three containers so only container overhead is compared.
+    source = [make_row(i) for i in range(n)]
+    dicts, dict_mem = retained_bytes(lambda: [dict(row) for row in source])
+    models, model_mem = retained_bytes(lambda: [SCHEMA.model(**row) for row in source])
+    batch, batch_mem = retained_bytes(lambda: SCHEMA.batch(source))
+
+    variants = {
+        "dict + serializer": (dict_mem, lambda: dict_body(dicts)),
+        "slots model": (model_mem, lambda: SCHEMA.encode_insert_all(models)),
+        "column batch": (batch_mem, batch.encode_insert_all),
+    }
+    results: dict[str, dict[str, float]] = {}
+    print(f"JSON backend: {serialization.backend}, {n} rows")
+    print(f"{'variant':20s} {'bytes/row':>10s} {'encode us/row':>14s} {'validated':>10s}")
+    for name, (memory, encode) in variants.items():
+        seconds = best_of(encode, args.repeat)
+        results[name] = {"bytes_per_row": round(memory / n, 1), "encode_us_per_row": round(seconds / n * 1e6, 3)}
+        print(f"{name:20s} {memory / n:10.1f} {seconds / n * 1e6:14.2f} {'no' if name.startswith('dict') else 'yes':>10s}")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Offline benchmarks for every cloud_tools manager and the Discord hook.
+
+Each case runs the real app code against the local fakes in ``fakes.py`` (no network, no
+credentials) and reports throughput and p50/p90/p99 latency. Results are compared with the
+JSON baseline so regressions fail the run.
+
+Usage: python benchmarks/run_benchmarks.py [--case bigquery.insert_to_bq] [--latency 0.005]
+                                           [--error-rate 0.0] [--update-baseline]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path[:0] = [str(BENCH_DIR.parent / "app"), str(BENCH_DIR)]
+
+# pylint: disable=wrong-import-position
+import fakes  # noqa: E402
+import httpx  # noqa: E402
+from loguru import logger as log  # noqa: E402
+from stats import compare, load_baseline, summarize, write_baseline  # noqa: E402
+
+from cloud_tools import google_secretmanager, shared_clients  # noqa: E402
+from cloud_tools.google_bigquerymanager import BigQueryManager  # noqa: E402
+from cloud_tools.google_bucketmanager import TRANSFER_FAILURES, BucketManager  # noqa: E402
+from discord_hook import send_discord_message  # noqa: E402
+
+DEFAULT_BASELINE = BENCH_DIR / "baselines" / "cloud_tools.json"
+PROJECT = "bench-project"
+TABLE = f"{PROJECT}.bench.rows"
+BUCKET = "bench-bucket"
+SAMPLE_ROW = {"id": 1, "name": "benchmark row", "value": 3.14, "tags": ["a", "b"], "ts": "2025-01-01T00:00:00Z"}
+
+
+@dataclass
+class Case:
+    """One benchmark: ``op(i)`` is a sync call or returns an awaitable; a falsy ``ok(result)`` counts as an error."""
+
+    name: str
+    op: Callable[[int], Any]
+    is_async: bool
+    ok: Callable[[Any], bool] = lambda _: True
+
+
+@dataclass
+class Backends:
+    bigquery: fakes.FakeBigQuery
+    gcs: fakes.FakeGCS
+    secretmanager: fakes.FakeSecretManager
+    discord: fakes.FakeDiscord
+
+    def stop(self) -> None:
+        for fake in (self.bigquery, self.gcs, self.secretmanager, self.discord):
+            fake.stop()
+
+
+def start_backends(latency: float, error_rate: float, seed: Optional[int] = 1) -> Backends:
+    """Starts every fake with the same latency/error profile and wires the shared clients to them."""
+    backends = Backends(
+        bigquery=fakes.FakeBigQuery(latency, error_rate, seed).start(),
+        gcs=fakes.FakeGCS(latency, error_rate, seed).start(),
+        secretmanager=fakes.FakeSecretManager({"bench-secret": "s3cr3t"}, latency, error_rate, seed).start(),
+        discord=fakes.FakeDiscord(latency, error_rate, seed).start(),
+    )
+    shared_clients.set_client("bigquery", fakes.bigquery_client(backends.bigquery.url, PROJECT))
+    shared_clients.set_client("storage", fakes.storage_client(backends.gcs.url, PROJECT))
+    shared_clients.set_client("secretmanager", fakes.secretmanager_client(backends.secretmanager.address))
+    return backends
+
+
+def build_cases(backends: Backends, rows_per_insert: int, payload_bytes: int) -> list[Case]:
+    bq = BigQueryManager()
+    bucket = BucketManager(BUCKET)
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    upload_path = workdir / "payload.bin"
+    upload_path.write_bytes(os.urandom(payload_bytes))
+    backends.gcs.blobs[(BUCKET, "bench/download.bin")] = upload_path.read_bytes()
+    rows = [dict(SAMPLE_ROW, id=i) for i in range(rows_per_insert)]
+    discord_client: dict[str, httpx.AsyncClient] = {}
+
+    async def send(i: int) -> Any:
+        if "client" not in discord_client:
+            discord_client["client"] = httpx.AsyncClient()
+        return await send_discord_message(backends.discord.webhook_url, f"benchmark {i}", client=discord_client["client"])
+
+    def get_secret(_: int) -> str:
+        google_secretmanager.clear_secret_cache()
+        return google_secretmanager.get_secret("bench-secret", PROJECT)
+
+    def upload(i: int) -> bool:
+        failures = TRANSFER_FAILURES.value(direction="upload")
+        bucket.upload_file(str(upload_path), f"bench/upload-{i}.bin")
+        return TRANSFER_FAILURES.value(direction="upload") == failures
+
+    return [
+        Case("bigquery.insert_to_bq", lambda _: bq.insert_to_bq(TABLE, rows, batch_size=500), True, lambda errors: not errors),
+        Case("bigquery.query", lambda _: bq.query("SELECT id, name FROM bench.rows"), True),
+        Case("gcs.upload_file", upload, False, bool),
+        Case("gcs.download_file", lambda i: bucket.download_file("bench/download.bin", str(workdir / f"dl-{i % 8}.bin")), False),
+        Case("secretmanager.get_secret", get_secret, False),
+        Case("discord.send_message", send, True, bool),
+    ]
+
+
+def run_sync(case: Case, iterations: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+
+    def one(i: int) -> tuple[float, bool]:
+        start = time.perf_counter()
+        try:
+            ok = case.ok(case.op(i))
+        except Exception:  # pylint: disable=W0718
+            ok = False
+        return time.perf_counter() - start, ok
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, ok in pool.map(one, range(iterations)):
+            latencies.append(latency)
+            errors += not ok
+    return summarize(latencies, time.perf_counter() - wall_start, errors)
+
+
+async def run_async(case: Case, iterations: int, concurrency: int) -> dict[str, Any]:
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = case.ok(await case.op(i))
+            except Exception:  # pylint: disable=W0718
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(iterations)))
+    return summarize(latencies, time.perf_counter() - wall_start, errors)
+
+
+def run_case(case: Case, iterations: int, concurrency: int, warmup: int) -> dict[str, Any]:
+    if case.is_async:
+
+        async def _run() -> dict[str, Any]:
+            await run_async(case, warmup, 1)
+            return await run_async(case, iterations, concurrency)
+
+        return asyncio.run(_run())
+    run_sync(case, warmup, 1)
+    return run_sync(case, iterations, concurrency)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--case", action="append", help="Case name to run (repeatable). Defaults to all.")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added by every fake per call.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake calls that fail.")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per insert_to_bq call.")
+    parser.add_argument("--payload-bytes", type=int, default=64 * 1024, help="Size of uploaded/downloaded objects.")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed regression vs. baseline (0.3 = 30%%).")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--json", type=Path, default=None, help="Write results to this file.")
+    args = parser.parse_args()
+
+    log.remove()
+    log.add(sys.stderr, level="WARNING")
+
+    backends = start_backends(args.latency, args.error_rate)
+    try:
+        cases = build_cases(backends, args.rows, args.payload_bytes)
+        selected = [case for case in cases if not args.case or case.name in args.case]
+        results: dict[str, dict[str, Any]] = {}
+        for case in selected:
+            results[case.name] = run_case(case, args.iterations, args.concurrency, args.warmup)
+            r = results[case.name]
+            print(
+                f"{case.name:28s} {r['throughput_ops_s']:9.1f} ops/s  p50 {r['p50_ms']:8.3f} ms  "
+                f"p99 {r['p99_ms']:8.3f} ms  errors {r['errors']}"
+            )
+    finally:
+        backends.stop()
+
+    if args.json:
+        write_baseline(args.json, results)
+    if args.update_baseline:
+        write_baseline(args.baseline, {**load_baseline(args.baseline), **results})
+        print(f"Baseline written to {args.baseline}.")
+        return
+    if args.latency or args.error_rate:
+        print("Fault injection active: baseline comparison skipped.")
+        return
+    if failures := compare(results, load_baseline(args.baseline), args.tolerance):
+        for failure in failures:
+            print(f"FAIL: {failure}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Per-row JSON serialization cost for typical BigQuery payloads, per installed backend.
+
+Measures encoding single rows and whole insertAll bodies (``{"rows": [{"insertId", "json"}]}``)
+for narrow, wide and nested row shapes, and the decode cost of the same bytes.
+
+Usage: python benchmarks/serialization_bench.py [--rows 500] [--repeat 5] [--json out.json]
+"""
+
+import argparse
+import datetime
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "app"))
+
+import serialization  # noqa: E402  # pylint: disable=wrong-import-position
+
+
+def narrow_row(i: int) -> dict[str, Any]:
+    return {"id": i, "name": f"row {i}", "value": i * 0.5, "ts": "2025-01-01T00:00:00Z"}
+
+
+def wide_row(i: int) -> dict[str, Any]:
+    row: dict[str, Any] = {"id": i, "created": datetime.datetime(2025, 1, 1, 12, 0, i % 60)}
+    row.update({f"int_{c}": i * c for c in range(20)})
+    row.update({f"float_{c}": i / (c + 1) for c in range(10)})
+    row.update({f"str_{c}": f"value {i}-{c} ünïcödé" for c in range(20)})
+    return row
+
+
+def nested_row(i: int) -> dict[str, Any]:
+    return {
+        "id": i,
+        "user": {"name": f"user {i}", "email": f"user{i}@example.com", "roles": ["reader", "writer"]},
+        "events": [{"type": "click", "at": "2025-01-01T00:00:00Z", "props": {"x": j, "y": j * 2}} for j in range(5)],
+        "labels": {"env": "prod", "region": "europe-west3"},
+    }
+
+
+SHAPES: dict[str, Callable[[int], dict[str, Any]]] = {"narrow": narrow_row, "wide": wide_row, "nested": nested_row}
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> float:
+    """Fastest wall time of ``repeat`` runs, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(backend: str, rows: list[dict[str, Any]], repeat: int) -> dict[str, float]:
+    serialization.set_backend(backend)
+    dumps, loads = serialization.dumps, serialization.loads
+    body = {"rows": [{"insertId": str(uuid.uuid4()), "json": row} for row in rows]}
+    encoded_rows = [dumps(row) for row in rows]
+    encoded_body = dumps(body)
+
+    per_row = best_of(lambda: [dumps(row) for row in rows], repeat)
+    whole = best_of(lambda: dumps(body), repeat)
+    decode = best_of(lambda: [loads(data) for data in encoded_rows], repeat)
+    return {
+        "encode_row_us": round(per_row / len(rows) * 1e6, 3),
+        "encode_body_us_per_row": round(whole / len(rows) * 1e6, 3),
+        "decode_row_us": round(decode / len(rows) * 1e6, 3),
+        "encode_mb_s": round(len(encoded_body) / whole / 1e6, 1),
+        "bytes_per_row": round(len(encoded_body) / len(rows), 1),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500, help="Rows per insertAll body.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, default=None, help="Write results to this file.")
+    args = parser.parse_args()
+
+    backends = serialization.available_backends()
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    print(f"{'shape':8s} {'backend':8s} {'encode/row':>12s} {'body/row':>12s} {'decode/row':>12s} {'MB/s':>8s} {'bytes/row':>10s}")
+    for shape, make_row in SHAPES.items():
+        rows = [make_row(i) for i in range(args.rows)]
+        results[shape] = {}
+        for backend in backends:
+            r = results[shape][backend] = measure(backend, rows, args.repeat)
+            print(
+                f"{shape:8s} {backend:8s} {r['encode_row_us']:9.2f} us {r['encode_body_us_per_row']:9.2f} us "
+                f"{r['decode_row_us']:9.2f} us {r['encode_mb_s']:8.1f} {r['bytes_per_row']:10.1f}"
+            )
+        if "json" in results[shape] and len(backends) > 1:
+            fastest = min(results[shape].values(), key=lambda r: r["encode_body_us_per_row"])
+            print(f"{'':8s} speed-up vs stdlib: {results[shape]['json']['encode_body_us_per_row'] / fastest['encode_body_us_per_row']:.1f}x")
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Cold-start cost of ``import config`` with and without the build-time settings snapshot.
+
+Each run imports config in a fresh interpreter from an empty working directory (as deployed,
+without project.env). The snapshot is generated for the benchmark environment and removed
+afterwards; an existing app/settings_snapshot.json is restored.
+
+Usage: python benchmarks/settings_snapshot_bench.py [--repeat 5] [--json out.json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "app"))
+sys.path.insert(0, str(BENCH_DIR))
+
+# pylint: disable=wrong-import-position
+from import_time import APP_DIR, PLACEHOLDER_ENV, module_subtree, parse_importtime  # noqa: E402
+
+from settings_snapshot import SNAPSHOT_PATH, build_snapshot, write_snapshot  # noqa: E402
+
+
+def bench_env() -> dict[str, str]:
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(APP_DIR), env.get("PYTHONPATH", "")]))
+    return env
+
+
+def import_config_ms(env: dict[str, str], cwd: str) -> tuple[float, bool]:
+    """Cumulative import cost of config in a fresh interpreter and whether pydantic was loaded."""
+    code = "import sys, config; print('pydantic' in sys.modules)"
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import config failed:\n{proc.stderr[-2000:]}")
+    subtree = module_subtree(parse_importtime(proc.stderr), "config")
+    return subtree[-1].cumulative_us / 1000, proc.stdout.strip() == "True"
+
+
+def measure(env: dict[str, str], repeat: int) -> dict:
+    with tempfile.TemporaryDirectory() as cwd:
+        import_config_ms(env, cwd)  # warm .pyc files
+        runs = [import_config_ms(env, cwd) for _ in range(repeat)]
+    return {"median_ms": round(statistics.median(ms for ms, _ in runs), 1), "pydantic_imported": runs[-1][1]}
+
+
+def make_snapshot(env: dict[str, str]) -> None:
+    """Validate Settings against ``env`` only, the way the deploy step does."""
+    from settings_model import Settings  # pylint: disable=import-outside-toplevel
+
+    saved = dict(os.environ)
+    os.environ.clear()
+    os.environ.update(env)
+    try:
+        settings = Settings(_env_file=None)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+    write_snapshot(build_snapshot(settings, env))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, default=None)
+    args = parser.parse_args()
+
+    env = bench_env()
+    existing = SNAPSHOT_PATH.read_bytes() if SNAPSHOT_PATH.is_file() else None
+    try:
+        SNAPSHOT_PATH.unlink(missing_ok=True)
+        results = {"validate": measure(env, args.repeat)}
+        make_snapshot(env)
+        results["snapshot"] = measure(env, args.repeat)
+    finally:
+        if existing is None:
+            SNAPSHOT_PATH.unlink(missing_ok=True)
+        else:
+            SNAPSHOT_PATH.write_bytes(existing)
+
+    for name, result in results.items():
+        print(f"{name:>9}: import config {result['median_ms']:7.1f} ms (pydantic imported: {result['pydantic_imported']})")
+    saved_ms = results["validate"]["median_ms"] - results["snapshot"]["median_ms"]
+    print(f"    saved: {saved_ms:.1f} ms per cold start")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
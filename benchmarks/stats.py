@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.12"
+# dependencies = []
+# ///
+
+"""
+Latency statistics and baseline comparison shared by the benchmark and load-test runners.
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Any, Sequence
+
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values (q in [0, 100])."""
+    if not sorted_values:
+        return math.nan
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies_s: Sequence[float], wall_s: float, errors: int = 0) -> dict[str, Any]:
+    """Throughput and latency percentiles (milliseconds) for one run."""
+    values = sorted(latencies_s)
+    count = len(values)
+    return {
+        "ops": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_ops_s": round(count / wall_s, 2) if wall_s else 0.0,
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p90_ms": round(percentile(values, 90) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "max_ms": round(values[-1] * 1000, 3) if values else math.nan,
+    }
+
+
+def load_baseline(path: Path) -> dict[str, Any]:
+    return json.loads(path.read_text(encoding="utf-8")) if path.is_file() else {}
+
+
+def write_baseline(path: Path, results: dict[str, Any]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, dict[str, Any]], tolerance: float) -> list[str]:
+    """
+    Regressions of ``results`` against ``baseline``: p50/p99 more than ``tolerance`` slower or
+    throughput more than ``tolerance`` lower. Cases missing from the baseline are skipped.
+    """
+    failures: list[str] = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if current[key] > reference[key] * (1 + tolerance):
+                failures.append(f"{name}: {key} {current[key]:.3f} > baseline {reference[key]:.3f} (+{tolerance:.0%})")
+        if current["throughput_ops_s"] < reference["throughput_ops_s"] * (1 - tolerance):
+            failures.append(
+                f"{name}: throughput {current['throughput_ops_s']:.1f} < baseline {reference['throughput_ops_s']:.1f} (-{tolerance:.0%})"
+            )
+    return failures
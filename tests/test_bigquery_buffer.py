@@ -0,0 +1,150 @@
+# tests/test_bigquery_buffer.py
+"""
+Unit tests for the BigQuery write-behind buffer.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+import deadline  # the module cloud_tools imports (app/ is on the test pythonpath)
+from app.cloud_tools.bigquery_buffer import FLUSHES, WriteBuffer
+
+
+class FakeManager:
+    """Records insert_to_bq calls; ``gate`` holds flushes until set."""
+
+    def __init__(self, errors=None):
+        self.calls = []
+        self.errors = errors
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def insert_to_bq(self, table_name, rows, batch_size=1000, retry=None, dead_letter=None):
+        await self.gate.wait()
+        self.calls.append((table_name, list(rows)))
+        return self.errors
+
+
+class DeadlineManager(FakeManager):
+    """Asks for an RPC timeout like BigQueryManager._send does."""
+
+    async def insert_to_bq(self, table_name, rows, batch_size=1000, retry=None, dead_letter=None):
+        deadline.rpc_timeout(60.0, operation="bigquery.insert")
+        return await super().insert_to_bq(table_name, rows, batch_size, retry, dead_letter)
+
+
+def rows(n, start=0):
+    return [{"id": i, "name": "x" * 10} for i in range(start, start + n)]
+
+
+@pytest.mark.asyncio
+async def test_small_writes_are_combined_and_flushed_by_age():
+    manager = FakeManager()
+    buffer = WriteBuffer(max_rows=100, max_age=0.05, manager=manager)
+
+    for i in range(10):
+        await buffer.add("p.d.a", rows(3, start=i * 3))
+    await buffer.add("p.d.b", rows(1))
+    assert manager.calls == []
+
+    await asyncio.sleep(0.2)
+
+    assert sorted((table, len(batch)) for table, batch in manager.calls) == [("p.d.a", 30), ("p.d.b", 1)]
+    assert buffer.buffered_bytes == 0
+    assert FLUSHES.value(table="p.d.a", reason="age") >= 1
+
+
+@pytest.mark.asyncio
+async def test_flush_outlives_the_deadline_of_the_request_that_wrote():
+    manager = DeadlineManager()
+    buffer = WriteBuffer(max_rows=100, max_age=0.1, manager=manager)
+    before = deadline.DEADLINE_EXCEEDED.value(operation="bigquery.insert")
+
+    deadline.start_request(0.02)
+    try:
+        await buffer.add("p.d.t", rows(3))
+    finally:
+        deadline.end_request()
+    await asyncio.sleep(0.3)
+
+    assert [len(batch) for _, batch in manager.calls] == [3]
+    assert deadline.DEADLINE_EXCEEDED.value(operation="bigquery.insert") == before
+
+
+@pytest.mark.asyncio
+async def test_size_triggers_flush_and_batches_are_capped():
+    manager = FakeManager()
+    buffer = WriteBuffer(max_rows=10, max_age=60, manager=manager)
+
+    await buffer.add("p.d.t", rows(25))
+    await buffer.flush()
+
+    assert [len(batch) for _, batch in manager.calls] == [10, 10, 5]
+    assert [row["id"] for _, batch in manager.calls for row in batch] == list(range(25))
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_everything():
+    manager = FakeManager()
+    buffer = WriteBuffer(max_rows=100, max_age=60, manager=manager)
+    await buffer.add("p.d.t", rows(5))
+
+    await buffer.close()
+
+    assert len(manager.calls) == 1
+    assert buffer.pending_rows == 0
+
+
+@pytest.mark.asyncio
+async def test_backpressure_waits_for_in_flight_rows():
+    manager = FakeManager()
+    manager.gate.clear()
+    # Ten rows are ~300 encoded bytes, so the second add does not fit until the first is flushed.
+    buffer = WriteBuffer(max_rows=1000, max_age=60, max_buffered_bytes=400, manager=manager)
+
+    await buffer.add("p.d.t", rows(10))
+    blocked = asyncio.ensure_future(buffer.add("p.d.t", rows(10, start=10)))
+    await asyncio.sleep(0.05)
+    assert not blocked.done()
+
+    manager.gate.set()
+    await asyncio.wait_for(blocked, 1)
+    await buffer.flush()
+
+    assert sum(len(batch) for _, batch in manager.calls) == 20
+    assert buffer.buffered_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_flush_failures_do_not_reach_writers():
+    class Broken(FakeManager):
+        async def insert_to_bq(self, *args, **kwargs):
+            raise RuntimeError("boom")
+
+    buffer = WriteBuffer(max_rows=2, manager=Broken())
+
+    await buffer.add("p.d.t", rows(2))
+    await buffer.flush()
+
+    assert buffer.buffered_bytes == 0
+
+
+def test_write_from_another_thread_runs_on_the_buffer_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        manager = FakeManager()
+        buffer = WriteBuffer(max_rows=100, max_age=60, manager=manager, loop=loop)
+
+        buffer.write("p.d.t", rows(3))
+        buffer.write("p.d.t", rows(3, start=3))
+        asyncio.run_coroutine_threadsafe(buffer.close(), loop).result(1)
+
+        assert [len(batch) for _, batch in manager.calls] == [6]
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(1)
+        loop.close()
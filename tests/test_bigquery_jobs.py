@@ -0,0 +1,87 @@
+# tests/test_bigquery_jobs.py
+"""
+Unit tests for the shared BigQuery job poller.
+"""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.cloud_tools.bigquery_jobs import JobPoller, shared_poller
+
+
+def job_done_after(polls: int) -> MagicMock:
+    """A job whose done() turns True on the given poll."""
+    job = MagicMock()
+    job.done.side_effect = lambda: job.done.call_count >= polls
+    return job
+
+
+@pytest.mark.asyncio
+async def test_wait_returns_finished_job():
+    poller = JobPoller(min_interval=0.001)
+    job = job_done_after(3)
+
+    assert await poller.wait(job) is job
+    assert job.done.call_count == 3
+    assert poller.outstanding == 0
+
+
+@pytest.mark.asyncio
+async def test_many_jobs_share_one_poll_task():
+    poller = JobPoller(min_interval=0.001, max_concurrent_polls=2)
+    jobs = [job_done_after(n) for n in (1, 2, 5, 3)]
+    threads = set()
+    for job in jobs:
+        job.done.side_effect = (
+            lambda job=job, n=job.done.side_effect: threads.add(threading.get_ident()) or n()
+        )
+
+    waiters = [asyncio.ensure_future(poller.wait(job)) for job in jobs]
+    await asyncio.sleep(0)
+    task = poller._task  # pylint: disable=protected-access
+
+    assert await asyncio.gather(*waiters) == jobs
+    assert poller._task is task  # pylint: disable=protected-access
+    assert len(threads) <= 2
+
+
+@pytest.mark.asyncio
+async def test_poll_interval_grows_with_job_age():
+    poller = JobPoller(min_interval=0.01, max_interval=0.5, backoff_ratio=0.5)
+
+    assert poller._interval(0.0) == 0.01  # pylint: disable=protected-access
+    assert poller._interval(0.4) == 0.2  # pylint: disable=protected-access
+    assert poller._interval(60.0) == 0.5  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_timeout_stops_tracking():
+    poller = JobPoller(min_interval=0.01)
+    job = MagicMock(job_id="slow")
+    job.done.return_value = False
+
+    with pytest.raises(TimeoutError, match="slow"):
+        await poller.wait(job, timeout=0.05)
+
+    assert poller.outstanding == 0
+
+
+@pytest.mark.asyncio
+async def test_poll_errors_reach_the_waiter_only():
+    poller = JobPoller(min_interval=0.001)
+    broken = MagicMock()
+    broken.done.side_effect = RuntimeError("job not found")
+    fine = job_done_after(2)
+
+    results = await asyncio.gather(poller.wait(broken), poller.wait(fine), return_exceptions=True)
+
+    assert isinstance(results[0], RuntimeError)
+    assert results[1] is fine
+
+
+@pytest.mark.asyncio
+async def test_shared_poller_is_per_loop():
+    assert shared_poller() is shared_poller()
@@ -0,0 +1,140 @@
+# tests/test_bigquery_metadata.py
+"""
+Unit tests for the table metadata cache.
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from google.cloud import bigquery
+
+from app.cloud_tools import bigquery_metadata
+from app.cloud_tools.bigquery_metadata import TableCache
+from app.cloud_tools.google_bigquerymanager import BigQueryManager
+
+TABLE = "p.d.events"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fake_client(delay=0.0):
+    client = MagicMock()
+
+    def get_table(table_name):
+        time.sleep(delay)
+        return bigquery.Table(table_name, schema=[bigquery.SchemaField("id", "INTEGER", mode="REQUIRED")])
+
+    client.get_table.side_effect = get_table
+    return client
+
+
+def test_tables_are_fetched_once_per_ttl():
+    clock = Clock()
+    cache = TableCache(ttl=60, clock=clock)
+    client = fake_client()
+
+    first = cache.get_table(client, TABLE)
+    assert cache.get_table(client, TABLE) is first
+    clock.now = 59
+    cache.get_table(client, TABLE)
+    assert client.get_table.call_count == 1
+
+    clock.now = 61
+    assert cache.get_table(client, TABLE) is not first
+    assert client.get_table.call_count == 2
+
+
+def test_row_schema_is_compiled_once():
+    cache = TableCache()
+    client = fake_client()
+
+    schema = cache.row_schema(client, TABLE)
+
+    assert cache.row_schema(client, TABLE) is schema
+    assert schema.name == "Events"
+    assert schema.encode({"id": 1}) == b'{"id":1}'
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = TableCache()
+    client = fake_client(delay=0.05)
+
+    threads = [threading.Thread(target=cache.get_table, args=(client, TABLE)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert client.get_table.call_count == 1
+
+
+def test_schema_errors_invalidate():
+    cache = TableCache()
+    client = fake_client()
+    cache.get_table(client, TABLE)
+
+    assert not cache.invalidate_on_errors(TABLE, [{"index": 0, "errors": [{"reason": "backendError"}]}])
+    assert not cache.invalidate_on_errors(TABLE, [{"index": 0, "errors": ["Some BQ Error"]}])
+    bad_value = {"reason": "invalid", "message": "Cannot convert value to integer (bad value): abc"}
+    assert not cache.invalidate_on_errors(TABLE, [{"index": 0, "errors": [bad_value]}])
+    assert len(cache) == 1
+    assert cache.invalidate_on_errors(TABLE, [{"index": 0, "errors": [{"reason": "invalid", "message": "no such field: x."}]}])
+    assert len(cache) == 0
+    cache.get_table(client, TABLE)
+    assert cache.invalidate_on_errors(TABLE, [{"index": 0, "errors": [{"reason": "notFound", "message": "Table gone"}]}])
+    assert len(cache) == 0
+
+
+def test_prewarm_logs_failures():
+    cache = TableCache()
+    client = fake_client()
+    get_table = client.get_table.side_effect
+
+    def get_or_fail(table_name):
+        if table_name == "p.d.gone":
+            raise RuntimeError("404 Not found")
+        return get_table(table_name)
+
+    client.get_table.side_effect = get_or_fail
+
+    assert cache.prewarm(client, [TABLE, "p.d.gone", TABLE]) == 1
+    assert cache.fresh(TABLE) is not None
+
+
+@pytest.mark.asyncio
+async def test_manager_serves_schema_from_cache_and_invalidates_on_insert_errors():
+    client = fake_client()
+    client.insert_rows_json.return_value = [{"index": 0, "errors": [{"reason": "invalid", "message": "no such field: x."}]}]
+    manager = BigQueryManager(client, tables=TableCache())
+
+    schema = await manager.get_row_schema(TABLE)
+    assert await manager.get_row_schema(TABLE) is schema
+    assert (await manager.get_table(TABLE)).table_id == "events"
+    assert client.get_table.call_count == 1
+
+    await manager.insert_to_bq(TABLE, [{"id": 1, "x": 2}])
+    await manager.get_table(TABLE)
+
+    assert client.get_table.call_count == 2
+
+
+def test_configure_with_zero_ttl_disables_the_shared_cache():
+    client = fake_client()
+    bigquery_metadata.table_cache.invalidate()
+    bigquery_metadata.configure(ttl=0)
+    try:
+        bigquery_metadata.table_cache.get_table(client, TABLE)
+        bigquery_metadata.table_cache.get_table(client, TABLE)
+    finally:
+        bigquery_metadata.configure(ttl=300.0)
+
+    assert client.get_table.call_count == 2
+    assert len(bigquery_metadata.table_cache) == 0
@@ -0,0 +1,211 @@
+# tests/test_bigquery_retry.py
+"""
+Unit tests for row-level insert retries and the dead-letter sink.
+"""
+
+import json
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+import requests
+from google.api_core import exceptions as google_exceptions
+
+import deadline  # the module bigquery_retry imports (app/ is on the test pythonpath)
+from app.cloud_tools.bigquery_retry import DeadLetterSink, RetryPolicy
+from app.cloud_tools.google_bigquerymanager import BigQueryManager
+
+TABLE = "p.d.t"
+ROWS = [{"id": i} for i in range(6)]
+FAST = RetryPolicy(max_attempts=3, initial_backoff=0.0)
+
+
+def row_error(index, reason):
+    return {"index": index, "errors": [{"reason": reason, "message": reason}]}
+
+
+@pytest.fixture
+def client():
+    return MagicMock()
+
+
+@pytest.fixture
+def uploads():
+    """Captures dead-letter uploads: remote name -> NDJSON records."""
+    captured = {}
+
+    def upload_file(local_path, remote_name):
+        with open(local_path, encoding="utf-8") as f:
+            captured[remote_name] = [json.loads(line) for line in f]
+        return True
+
+    with patch("app.cloud_tools.google_bucketmanager.BucketManager") as bucket_manager:
+        bucket_manager.return_value.upload_file.side_effect = upload_file
+        yield captured
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(initial_backoff=1.0, max_backoff=4.0, multiplier=2.0)
+
+    delays = [policy.backoff(attempt) for attempt in (1, 2, 3, 10) for _ in range(50)]
+
+    assert all(0.0 <= delay <= 4.0 for delay in delays)
+    assert max(policy.backoff(1) for _ in range(50)) <= 1.0
+    assert len(set(delays)) > 1
+
+
+def test_retryable_reasons():
+    policy = RetryPolicy()
+
+    assert policy.retryable([{"reason": "backendError"}])
+    assert policy.retryable([{"reason": "stopped"}])
+    assert not policy.retryable([{"reason": "invalid"}])
+    assert not policy.retryable([{"reason": "backendError"}, {"reason": "invalid"}])
+    assert not policy.retryable(["Some BQ Error"])
+    assert policy.retryable_exception(google_exceptions.ServiceUnavailable("down"))
+    assert not policy.retryable_exception(google_exceptions.BadRequest("bad"))
+
+
+@pytest.mark.asyncio
+async def test_resubmits_only_failed_rows_with_their_insert_ids(client):
+    client.insert_rows_json.side_effect = [
+        [row_error(1, "backendError"), row_error(4, "rateLimitExceeded")],
+        [],
+    ]
+
+    errors = await BigQueryManager(client).insert_to_bq(TABLE, ROWS, batch_size=10, retry=FAST)
+
+    assert errors is None
+    first, second = client.insert_rows_json.call_args_list
+    assert second.args == (TABLE, [ROWS[1], ROWS[4]])
+    first_ids = first.kwargs["row_ids"]
+    assert len(set(first_ids)) == len(ROWS)
+    assert second.kwargs["row_ids"] == [first_ids[1], first_ids[4]]
+
+
+@pytest.mark.asyncio
+async def test_permanent_errors_are_dead_lettered_and_ingest_continues(client, uploads):
+    client.insert_rows_json.side_effect = [
+        [row_error(0, "invalid"), row_error(2, "stopped")],
+        [],
+        [row_error(1, "backendError")],
+        [row_error(0, "backendError")],
+        [row_error(0, "backendError")],
+    ]
+    sink = DeadLetterSink("dl-bucket")
+
+    errors = await BigQueryManager(client).insert_to_bq(TABLE, ROWS, batch_size=3, retry=FAST, dead_letter=sink)
+
+    assert [error["index"] for error in errors] == [0, 4]
+    assert client.insert_rows_json.call_count == 5
+    (records,) = uploads.values()
+    assert [record["row"] for record in records] == [ROWS[0], ROWS[4]]
+    assert [record["attempts"] for record in records] == [1, 3]
+    assert records[0]["errors"] == [{"reason": "invalid", "message": "invalid"}]
+    assert sink.rows == 0
+
+
+@pytest.mark.asyncio
+async def test_without_dead_letter_the_first_failed_batch_stops(client):
+    client.insert_rows_json.return_value = [row_error(1, "invalid")]
+
+    errors = await BigQueryManager(client).insert_to_bq(TABLE, ROWS, batch_size=3, retry=FAST)
+
+    assert errors == [row_error(1, "invalid")]
+    client.insert_rows_json.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_transient_request_errors_retry_the_whole_batch(client):
+    client.insert_rows_json.side_effect = [google_exceptions.ServiceUnavailable("down"), []]
+
+    errors = await BigQueryManager(client).insert_to_bq(TABLE, ROWS, retry=FAST)
+
+    assert errors is None
+    first, second = client.insert_rows_json.call_args_list
+    assert first.kwargs["row_ids"] == second.kwargs["row_ids"]
+
+
+@pytest.mark.parametrize(
+    "error",
+    [requests.exceptions.ConnectionError("reset"), requests.exceptions.ReadTimeout("slow"), ConnectionResetError()],
+    ids=["connection", "read-timeout", "reset"],
+)
+@pytest.mark.asyncio
+async def test_transport_errors_retry_the_whole_batch(client, error):
+    client.insert_rows_json.side_effect = [error, []]
+
+    errors = await BigQueryManager(client).insert_to_bq(TABLE, ROWS, retry=FAST)
+
+    assert errors is None
+    assert client.insert_rows_json.call_count == 2
+
+
+def test_exhausted_deadline_is_not_retried():
+    assert not RetryPolicy.retryable_exception(deadline.DeadlineExceeded("bigquery.insert"))
+
+
+@pytest.mark.asyncio
+async def test_bad_request_fails_the_batch_without_retry(client, uploads):
+    client.insert_rows_json.side_effect = google_exceptions.BadRequest("too large")
+
+    errors = await BigQueryManager(client).insert_to_bq(
+        TABLE, ROWS, retry=FAST, dead_letter=DeadLetterSink("dl-bucket")
+    )
+
+    assert len(errors) == len(ROWS)
+    assert errors[0]["errors"][0]["reason"] == "badRequest"
+    client.insert_rows_json.assert_called_once()
+    assert len(next(iter(uploads.values()))) == len(ROWS)
+
+
+@pytest.mark.asyncio
+async def test_insert_stream_dead_letters_and_keeps_streaming(client, uploads):
+    client.insert_rows_json.side_effect = [[row_error(0, "invalid")], [], []]
+    rows = ((row, 10) for row in ROWS)
+
+    errors = await BigQueryManager(client).insert_stream(
+        TABLE, rows, batch_size=2, max_in_flight=1, retry=FAST, dead_letter=DeadLetterSink("dl-bucket")
+    )
+
+    assert errors == [row_error(0, "invalid")]
+    assert client.insert_rows_json.call_count == 3
+    assert len(uploads) == 1
+
+
+@pytest.mark.asyncio
+async def test_dead_letter_without_retry_receives_failed_rows(client, uploads):
+    client.insert_rows_json.side_effect = [[row_error(1, "invalid")], [row_error(0, "invalid")], []]
+
+    errors = await BigQueryManager(client).insert_to_bq(TABLE, ROWS, batch_size=2, dead_letter=DeadLetterSink("dl-bucket"))
+
+    assert errors == [row_error(1, "invalid"), row_error(2, "invalid")]
+    assert client.insert_rows_json.call_count == 3
+    assert [record["row"] for record in next(iter(uploads.values()))] == [ROWS[1], ROWS[2]]
+
+
+@pytest.mark.asyncio
+async def test_insert_stream_without_retry_dead_letters_with_stream_indexes(client, uploads):
+    client.insert_rows_json.side_effect = [[], [row_error(1, "invalid")], [row_error(0, "invalid")]]
+    rows = ((row, 10) for row in ROWS)
+
+    errors = await BigQueryManager(client).insert_stream(
+        TABLE, rows, batch_size=2, max_in_flight=1, dead_letter=DeadLetterSink("dl-bucket")
+    )
+
+    assert errors == [row_error(3, "invalid"), row_error(4, "invalid")]
+    assert [record["row"] for record in next(iter(uploads.values()))] == [ROWS[3], ROWS[4]]
+
+
+def test_failed_dead_letter_upload_keeps_the_local_file():
+    sink = DeadLetterSink("dl-bucket")
+    sink.add(TABLE, [{"id": 1}], [[{"reason": "invalid"}]], 1)
+
+    with patch("app.cloud_tools.google_bucketmanager.BucketManager") as bucket_manager:
+        bucket_manager.return_value.upload_file.return_value = False
+        assert sink.flush() is None
+
+    (local_path,) = [call.args[0] for call in bucket_manager.return_value.upload_file.call_args_list]
+    with open(local_path, encoding="utf-8") as f:
+        assert json.loads(f.read())["row"] == {"id": 1}
+    os.remove(local_path)
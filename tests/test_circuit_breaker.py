@@ -0,0 +1,211 @@
+# tests/test_circuit_breaker.py
+"""
+Unit tests for the circuit breakers and how the managers react to an open one.
+"""
+
+import asyncio
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+import requests
+from google.api_core import exceptions as google_exceptions
+
+import circuit_breaker  # the module cloud_tools imports (app/ is on the test pythonpath)
+import deadline
+from app.cloud_tools.bigquery_buffer import DEFERRED_ROWS, WriteBuffer
+from app.cloud_tools.google_bigquerymanager import BigQueryManager
+from app.discord_hook import send_discord_message
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, is_outage
+from custom_exceptions import CircuitOpenError
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def closed_breakers():
+    yield
+    circuit_breaker.reset_all()
+
+
+def fail(breaker, n=1, error=None):
+    for _ in range(n):
+        breaker.allow()
+        breaker.record(0.01, error or google_exceptions.ServiceUnavailable("down"))
+
+
+def succeed(breaker, n=1, elapsed=0.01):
+    for _ in range(n):
+        breaker.allow()
+        breaker.record(elapsed)
+
+
+def test_opens_on_failure_rate_and_recovers_through_a_probe():
+    clock = Clock()
+    breaker = CircuitBreaker("test-cycle", min_calls=4, failure_rate=0.5, open_seconds=30, clock=clock)
+
+    succeed(breaker, 2)
+    fail(breaker, 1)
+    assert breaker.state == CLOSED
+    fail(breaker, 1)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as rejected:
+        breaker.allow()
+    assert rejected.value.retry_after == 30
+
+    clock.now += 30
+    breaker.allow()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.allow()  # one probe at a time
+    breaker.record(0.01)
+    assert breaker.state == CLOSED
+    assert circuit_breaker.BREAKER_TRANSITIONS.value(breaker="test-cycle", state=OPEN) == 1
+    assert circuit_breaker.BREAKER_STATE.value(breaker="test-cycle") == 0
+
+
+def test_failed_probe_reopens():
+    clock = Clock()
+    breaker = CircuitBreaker("test-probe", min_calls=2, open_seconds=5, clock=clock)
+    fail(breaker, 2)
+
+    clock.now += 5
+    fail(breaker, 1)
+
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == 5
+
+
+def test_slow_calls_open_the_breaker():
+    breaker = CircuitBreaker("test-slow", min_calls=5, slow_call_seconds=2.0, slow_rate=0.8, clock=Clock())
+
+    succeed(breaker, 4, elapsed=3.0)
+    assert breaker.state == CLOSED
+    succeed(breaker, 1, elapsed=3.0)
+    assert breaker.state == OPEN
+
+
+def test_old_failures_leave_the_window():
+    clock = Clock()
+    breaker = CircuitBreaker("test-window", min_calls=4, window=10, clock=clock)
+
+    fail(breaker, 3)
+    clock.now += 11
+    succeed(breaker, 3)
+    fail(breaker, 1)
+
+    assert breaker.state == CLOSED
+
+
+def test_only_outages_count_as_failures():
+    request = httpx.Request("POST", "https://example.invalid")
+
+    assert is_outage(google_exceptions.ServiceUnavailable("down"))
+    assert is_outage(google_exceptions.TooManyRequests("slow down"))
+    assert is_outage(google_exceptions.RetryError("gave up", None))
+    assert is_outage(TimeoutError())
+    assert is_outage(httpx.ConnectError("refused", request=request))
+    assert is_outage(httpx.HTTPStatusError("503", request=request, response=httpx.Response(503, request=request)))
+    assert not is_outage(httpx.HTTPStatusError("404", request=request, response=httpx.Response(404, request=request)))
+    assert not is_outage(google_exceptions.BadRequest("bad row"))
+    assert not is_outage(google_exceptions.NotFound("no table"))
+    assert not is_outage(FileNotFoundError("local file"))
+
+    breaker = CircuitBreaker("test-client-errors", min_calls=2, clock=Clock())
+    fail(breaker, 5, google_exceptions.BadRequest("bad row"))
+    assert breaker.state == CLOSED
+
+
+def timing_out(timeout=None):
+    raise requests.exceptions.ReadTimeout("read timed out")
+
+
+def test_timeouts_capped_by_the_request_deadline_are_not_failures():
+    clock = Clock()
+    breaker = CircuitBreaker("test-deadline", min_calls=2, open_seconds=30, clock=clock)
+    deadline.start_request(60.0)
+    try:
+        for _ in range(2):
+            with pytest.raises(requests.exceptions.ReadTimeout):
+                breaker.call(timing_out, **deadline.timeout_kwargs(5.0))
+        assert breaker.state == OPEN
+
+        breaker.reset()
+        deadline.start_request(0.5)
+        for _ in range(3):
+            with pytest.raises(requests.exceptions.ReadTimeout):
+                breaker.call(timing_out, **deadline.timeout_kwargs(5.0))
+        assert breaker.state == CLOSED
+
+        fail(breaker, 2)
+        clock.now += 30
+        with pytest.raises(requests.exceptions.ReadTimeout):
+            breaker.call(timing_out, **deadline.timeout_kwargs(5.0))
+        assert breaker.state == HALF_OPEN
+        succeed(breaker)  # the abandoned probe gave its slot back
+        assert breaker.state == CLOSED
+    finally:
+        deadline.end_request()
+
+
+@pytest.mark.asyncio
+async def test_open_bigquery_circuit_fails_inserts_fast():
+    client = MagicMock()
+    shared = circuit_breaker.breaker("bigquery")
+    shared.min_calls = 1
+    try:
+        fail(shared, 1)
+    finally:
+        shared.min_calls = 10
+
+    with pytest.raises(CircuitOpenError):
+        await BigQueryManager(client).insert_to_bq("p.d.t", [{"id": 1}])
+    client.insert_rows_json.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_write_buffer_keeps_rows_while_the_circuit_is_open():
+    class OpenOnce:
+        def __init__(self):
+            self.calls = []
+
+        async def insert_to_bq(self, table_name, rows, batch_size=1000, retry=None, dead_letter=None):
+            if not self.calls:
+                self.calls.append(None)
+                raise CircuitOpenError("bigquery", 0.1)
+            self.calls.append(list(rows))
+
+    manager = OpenOnce()
+    buffer = WriteBuffer(max_rows=100, max_age=0.01, manager=manager)
+    before = DEFERRED_ROWS.value(table="p.d.t")
+
+    await buffer.add("p.d.t", [{"id": i} for i in range(3)])
+    await asyncio.sleep(0.05)
+    assert buffer.pending_rows == 3
+    assert buffer.buffered_bytes > 0
+
+    await asyncio.sleep(0.2)
+    assert manager.calls[1] == [{"id": i} for i in range(3)]
+    assert buffer.pending_rows == 0
+    assert buffer.buffered_bytes == 0
+    assert DEFERRED_ROWS.value(table="p.d.t") == before + 3
+
+
+@pytest.mark.asyncio
+async def test_open_discord_circuit_drops_the_message():
+    client = MagicMock()
+    shared = circuit_breaker.breaker("discord")
+    shared.min_calls = 1
+    try:
+        fail(shared, 1, httpx.ConnectError("refused"))
+    finally:
+        shared.min_calls = 10
+
+    assert await send_discord_message("https://discord.invalid/hook", "hello", client=client) is False
+    client.post.assert_not_called()
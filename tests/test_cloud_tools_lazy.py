@@ -0,0 +1,56 @@
+# tests/test_cloud_tools_lazy.py
+"""
+Checks that importing the cloud_tools package does not import any google-cloud SDK
+until one of its managers is actually used.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent / "app"
+SDK_MODULES = ("google.cloud.bigquery", "google.cloud.storage", "google.cloud.secretmanager")
+
+
+def loaded_sdks(statement: str) -> set[str]:
+    """Runs ``statement`` in a fresh interpreter and returns which SDK modules got imported."""
+    script = f"import sys\n{statement}\nprint(','.join(m for m in {SDK_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run(
+        [sys.executable, "-c", script], cwd=APP_DIR, capture_output=True, text=True, check=True
+    )
+    return set(filter(None, proc.stdout.strip().split(",")))
+
+
+def test_package_import_is_sdk_free():
+    """`import cloud_tools` must not pay for any SDK."""
+    assert loaded_sdks("import cloud_tools") == set()
+
+
+@pytest.mark.parametrize(
+    "attribute, expected_sdk",
+    [
+        ("BigQueryManager", "google.cloud.bigquery"),
+        ("BucketManager", "google.cloud.storage"),
+        ("get_secret", "google.cloud.secretmanager"),
+    ],
+)
+def test_attribute_access_imports_only_its_sdk(attribute, expected_sdk):
+    """Touching one manager imports its SDK and nothing else."""
+    assert loaded_sdks(f"import cloud_tools\ncloud_tools.{attribute}") == {expected_sdk}
+
+
+def test_unknown_attribute_raises():
+    """Names outside the lazy table behave like normal missing attributes."""
+    import app.cloud_tools as cloud_tools
+
+    with pytest.raises(AttributeError):
+        _ = cloud_tools.NotAManager
+
+
+def test_all_lists_exactly_the_lazy_names():
+    """__all__ is spelled out for linters and must stay in step with the lazy table."""
+    import app.cloud_tools as cloud_tools
+
+    assert sorted(cloud_tools.__all__) == sorted(cloud_tools._LAZY_ATTRIBUTES)
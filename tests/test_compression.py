@@ -0,0 +1,109 @@
+# tests/test_compression.py
+"""
+Unit tests for gzip request bodies to BigQuery and GCS.
+"""
+
+import gzip
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import bigquery
+
+import compression  # the module cloud_tools imports (app/ is on the test pythonpath)
+from app.cloud_tools.google_bigquerymanager import BigQueryManager
+from app.cloud_tools.google_bucketmanager import BucketManager
+
+ROWS = [{"id": i, "name": f"row {i}", "status": "ok", "ts": "2025-01-01T00:00:00Z"} for i in range(200)]
+
+
+@pytest.fixture(autouse=True)
+def uncompressed():
+    yield
+    compression.configure([], level=1, min_bytes=1024, min_saving=0.1)
+
+
+def test_bodies_are_compressed_only_when_enabled_and_worth_it():
+    body = json.dumps(ROWS).encode()
+    assert compression.compress("bigquery", body) == (body, None)
+
+    compression.configure(["bigquery"])
+    packed, encoding = compression.compress("bigquery", body)
+    assert encoding == "gzip" and gzip.decompress(packed) == body
+    assert len(packed) * 5 < len(body)
+    assert compression.BYTES.value(target="bigquery", stage="plain") >= len(body)
+
+    assert compression.compress("bigquery", b"{}") == (b"{}", None)
+    noise = bytes(range(256)) * 8
+    assert compression.compress("bigquery", gzip.compress(noise)) == (gzip.compress(noise), None)
+    assert compression.compress("gcs", body) == (body, None)
+
+
+def test_compressed_files_are_skipped():
+    assert compression.compressible("rows.ndjson")
+    assert compression.compressible("notes")
+    assert not compression.compressible("rows.json.gz")
+    assert not compression.compressible("photo.png")
+
+
+@pytest.mark.asyncio
+async def test_insert_all_is_sent_gzipped():
+    compression.configure(["bigquery"])
+    client = bigquery.Client(project="my_project", credentials=AnonymousCredentials())
+
+    with patch.object(client, "_call_api", return_value={}) as call_api:
+        assert not await BigQueryManager(client=client).insert_to_bq("my_project.d.t", ROWS)
+
+    kwargs = call_api.call_args.kwargs
+    assert kwargs["headers"]["Content-Encoding"] == "gzip"
+    assert kwargs["content_type"] == "application/json"
+    body = json.loads(gzip.decompress(kwargs["data"]))
+    assert [row["json"] for row in body["rows"]] == ROWS
+
+
+def test_upload_stores_a_gzip_encoded_object(tmp_path):
+    compression.configure(["gcs"])
+    local = tmp_path / "rows.ndjson"
+    local.write_text("\n".join(json.dumps(row) for row in ROWS), encoding="utf-8")
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    sent = {}
+
+    def upload_from_filename(path, **_):
+        with open(path, "rb") as f:
+            sent["data"] = f.read()
+        sent["path"] = path
+
+    blob.upload_from_filename.side_effect = upload_from_filename
+
+    assert BucketManager("bucket", client=client).upload_file(str(local), "rows.ndjson")
+
+    assert gzip.decompress(sent["data"]) == local.read_bytes()
+    assert blob.content_encoding == "gzip"
+    assert blob.content_type == "application/octet-stream"
+    assert not (tmp_path / sent["path"]).exists()
+
+
+def test_precompressed_upload_is_sent_as_is(tmp_path):
+    compression.configure(["gcs"])
+    local = tmp_path / "rows.json.gz"
+    local.write_bytes(gzip.compress(json.dumps(ROWS).encode()))
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+
+    assert BucketManager("bucket", client=client).upload_file(str(local), "rows.json.gz")
+
+    blob.upload_from_filename.assert_called_once_with(str(local))
+
+
+def test_ranged_reads_skip_inflation():
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    blob.download_as_bytes.return_value = b"data"
+    bucket = BucketManager("bucket", client=client)
+
+    bucket.read_bytes("whole.txt")
+    assert "raw_download" not in blob.download_as_bytes.call_args.kwargs
+    bucket.read_bytes("part.txt", 0, 9)
+    assert blob.download_as_bytes.call_args.kwargs["raw_download"] is True
@@ -0,0 +1,127 @@
+# tests/test_concurrency_limit.py
+"""
+Unit tests for the adaptive (AIMD) concurrency limits.
+"""
+
+import asyncio
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+import concurrency_limit  # the module cloud_tools imports (app/ is on the test pythonpath)
+from app.cloud_tools.google_bigquerymanager import BigQueryManager
+from concurrency_limit import AdaptiveLimiter, is_throttle, throttled_rows
+
+
+def test_limit_grows_additively_and_halves_once_per_burst():
+    limiter = AdaptiveLimiter("test-aimd", initial=4, max_limit=10)
+
+    slots = [limiter.acquire() for _ in range(4)]
+    for slot in slots:
+        limiter.release(slot)
+    # Grows while at least half of the limit is in use: 4 -> 4.25 -> 4.49.
+    assert limiter.limit == pytest.approx(4 + 1 / 4 + 1 / 4.25)
+
+    before = limiter.limit
+    slots = [limiter.acquire() for _ in range(3)]
+    for slot in slots:
+        limiter.release(slot, google_exceptions.TooManyRequests("slow down"))
+    assert limiter.limit == pytest.approx(before / 2)
+    assert concurrency_limit.DECREASES.value(backend="test-aimd", cause="throttle") == 1
+
+
+def test_throttling_is_recognised():
+    forbidden = google_exceptions.Forbidden("quota", errors=[{"reason": "rateLimitExceeded"}])
+
+    assert is_throttle(google_exceptions.TooManyRequests("429"))
+    assert is_throttle(forbidden)
+    assert not is_throttle(google_exceptions.Forbidden("denied", errors=[{"reason": "accessDenied"}]))
+    assert not is_throttle(google_exceptions.BadRequest("bad"))
+    assert throttled_rows([{"index": 0, "errors": [{"reason": "rateLimitExceeded"}]}])
+    assert not throttled_rows([{"index": 0, "errors": [{"reason": "invalid"}]}])
+    assert not throttled_rows(None)
+
+
+def test_latency_inflation_cuts_the_limit():
+    limiter = AdaptiveLimiter("test-latency", initial=4, latency_tolerance=3.0)
+    for _ in range(5):
+        limiter.release(limiter.acquire())
+    limit = limiter.limit
+
+    slot = limiter.acquire()
+    slot.started -= 10.0
+    limiter.release(slot)
+
+    assert limiter.limit == pytest.approx(limit / 2)
+    assert concurrency_limit.DECREASES.value(backend="test-latency", cause="latency") == 1
+
+
+def test_threads_wait_for_a_slot():
+    limiter = AdaptiveLimiter("test-threads", initial=1)
+    held = limiter.acquire()
+    acquired = threading.Event()
+
+    def worker():
+        with limiter.slot():
+            acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.05)
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0.01)
+
+    limiter.release(held)
+    assert acquired.wait(1.0)
+    thread.join()
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_coroutines_stay_within_the_limit():
+    limiter = AdaptiveLimiter("test-async", initial=2, max_limit=2)
+    running = peak = 0
+
+    async def call():
+        nonlocal running, peak
+        async with limiter.async_slot():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*(call() for _ in range(8)))
+
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = AdaptiveLimiter("test-cancel", initial=1)
+    held = await limiter.acquire_async()
+    waiter = asyncio.create_task(limiter.acquire_async())
+    await asyncio.sleep(0)
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    limiter.release(held)
+
+    assert limiter.in_flight == 0
+    assert not limiter._waiters  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_rows_shrink_the_insert_limit():
+    shared = concurrency_limit.limiter("bigquery.insert")
+    before = shared.limit
+    client = MagicMock()
+    client.insert_rows_json.return_value = [{"index": 0, "errors": [{"reason": "rateLimitExceeded"}]}]
+    try:
+        await BigQueryManager(client).insert_to_bq("p.d.t", [{"id": 1}])
+        assert shared.limit == pytest.approx(max(before / 2, shared.min_limit))
+    finally:
+        shared.limit = before
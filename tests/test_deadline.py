@@ -0,0 +1,90 @@
+# tests/test_deadline.py
+"""
+Unit tests for the per-request deadline and the timeouts derived from it.
+"""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import deadline  # the module cloud_tools imports (app/ is on the test pythonpath)
+from app.cloud_tools.bigquery_retry import RetryPolicy
+from app.cloud_tools.google_bigquerymanager import BigQueryManager
+from app.cloud_tools.google_bucketmanager import BucketManager
+
+TABLE = "p.d.t"
+
+
+@pytest.fixture(autouse=True)
+def no_deadline():
+    yield
+    deadline.end_request()
+
+
+def test_budget_keeps_the_reserve():
+    request = deadline.start_request(10.0, reserve=2.0)
+
+    assert 7.9 < request.budget() <= 8.0
+    assert 9.9 < request.remaining() <= 10.0
+    assert deadline.rpc_timeout(3.0) == 3.0
+    assert 7.9 < deadline.rpc_timeout() <= 8.0
+    assert deadline.timeout_kwargs(3.0) == {"timeout": 3.0}
+    assert 9.9 < deadline.notify_timeout(60.0) <= 10.0
+
+
+def test_spent_budget_refuses_new_calls():
+    deadline.start_request(1.0, reserve=1.0)
+    before = deadline.DEADLINE_EXCEEDED.value(operation="gcs.upload")
+
+    with pytest.raises(deadline.DeadlineExceeded):
+        deadline.timeout_kwargs(operation="gcs.upload")
+    with pytest.raises(TimeoutError):
+        deadline.check("gcs.upload")
+
+    assert deadline.DEADLINE_EXCEEDED.value(operation="gcs.upload") == before + 2
+    assert deadline.notify_timeout(10.0) > 0
+
+
+def test_without_a_request_defaults_are_kept():
+    assert deadline.current() is None
+    assert deadline.rpc_timeout(5.0) == 5.0
+    assert deadline.rpc_timeout() is None
+    assert deadline.timeout_kwargs() == {}
+    assert deadline.notify_timeout(10.0) == 10.0
+    deadline.check()
+
+
+def test_deadline_follows_the_request_into_coroutines():
+    request = deadline.start_request(30.0)
+
+    async def seen():
+        return deadline.current()
+
+    assert asyncio.run(seen()) is request
+
+
+def test_gcs_calls_get_the_remaining_budget():
+    client = MagicMock()
+    blob = client.bucket.return_value.blob.return_value
+    deadline.start_request(20.0, reserve=5.0)
+
+    BucketManager("bucket", client=client).delete_file("a.txt")
+
+    (timeout,) = blob.delete.call_args.kwargs.values()
+    assert 14.0 < timeout <= 15.0
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_when_the_backoff_does_not_fit():
+    client = MagicMock()
+    client.insert_rows_json.return_value = [{"index": 0, "errors": [{"reason": "backendError"}]}]
+    deadline.start_request(2.0, reserve=1.0)
+
+    with patch.object(RetryPolicy, "backoff", return_value=5.0):
+        errors = await BigQueryManager(client).insert_to_bq(TABLE, [{"id": 1}], retry=RetryPolicy(max_attempts=5))
+
+    assert [error["index"] for error in errors] == [0]
+    client.insert_rows_json.assert_called_once()
+    timeout = client.insert_rows_json.call_args.kwargs["timeout"]
+    assert 0.0 < timeout <= 1.0
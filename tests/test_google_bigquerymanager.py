@@ -14,7 +14,7 @@ from google.api_core import exceptions as google_exceptions
 from unittest.mock import patch, MagicMock
 
 # Adjust import path as needed
-from app.cloud_tools.google_bigquerymanager import BigQueryManager, batch_generator
+from app.cloud_tools.google_bigquerymanager import BigQueryManager, batch_generator, sized_batches
 
 # --- Test Data ---
 TEST_TABLE = "my_project.my_dataset.my_table"
@@ -153,6 +153,38 @@ async def test_query_execution_error(mock_bq_client):
     mock_query_job.result.assert_called_once_with()
 
 
+@pytest.mark.asyncio
+async def test_query_many_keeps_order_and_caps_concurrency(mock_bq_client):
+    """query_many submits at most max_concurrency jobs at once and returns results in input order."""
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    running = {"now": 0, "peak": 0}
+
+    def submit(query_str):
+        running["now"] += 1
+        running["peak"] = max(running["peak"], running["now"])
+        job = MagicMock(spec=bigquery.QueryJob)
+        job.done.side_effect = lambda: job.done.call_count >= 2
+
+        def result():
+            running["now"] -= 1
+            if query_str == "bad":
+                raise google_exceptions.BadRequest("syntax error")
+            return [bigquery.Row((query_str,), {"q": 0})]
+
+        job.result.side_effect = result
+        return job
+
+    mock_client.query.side_effect = submit
+    queries = [f"SELECT {i}" for i in range(6)] + ["bad"]
+
+    results = await manager.query_many(queries, max_concurrency=2, return_exceptions=True)
+
+    assert results[:6] == [[{"q": q}] for q in queries[:6]]
+    assert isinstance(results[6], google_exceptions.BadRequest)
+    assert running["peak"] <= 2
+
+
 # This is a standard sync function - no asyncio mark needed
 def test_batch_generator():
     """Tests the batch_generator utility function."""
@@ -163,4 +195,275 @@ def test_batch_generator():
     # Batch generator doesn't check for 0 size in user's code, range(0,10,0) would loop forever
     # Add check if desired:
     # with pytest.raises(ValueError):
-    #     list(batch_generator(data, 0))
\ No newline at end of file
+    #     list(batch_generator(data, 0))
+
+
+def test_sized_batches_caps_rows_and_bytes():
+    """Batches close on whichever of the row or byte cap is hit first."""
+    rows = [({"i": i}, 40) for i in range(10)]
+    assert [len(b) for b in sized_batches(rows, max_rows=4, max_bytes=1000)] == [4, 4, 2]
+    assert [len(b) for b in sized_batches(rows, max_rows=100, max_bytes=100)] == [2, 2, 2, 2, 2]
+    # A row larger than the byte cap still goes out, alone.
+    assert list(sized_batches([({"big": 1}, 500), ({"i": 2}, 1)], 10, 100)) == [[{"big": 1}], [{"i": 2}]]
+
+
+@pytest.mark.asyncio
+async def test_insert_stream_success(mock_bq_client):
+    """All rows from a lazy iterable are inserted in capped batches."""
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    mock_client.insert_rows_json.return_value = []
+
+    rows = (({"col1": i}, 10) for i in range(7))
+    errors = await manager.insert_stream(TEST_TABLE, rows, batch_size=3)
+
+    assert errors is None
+    sent = [call[0][1] for call in mock_client.insert_rows_json.call_args_list]
+    assert sorted(row["col1"] for batch in sent for row in batch) == list(range(7))
+    assert sorted(len(batch) for batch in sent) == [1, 3, 3]
+
+
+@pytest.mark.asyncio
+async def test_insert_stream_bounds_read_ahead(mock_bq_client):
+    """The source is only read when an insert slot is free."""
+    import threading
+
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    release = threading.Event()
+    consumed = []
+    read_ahead = []
+
+    def slow_insert(table, batch):
+        read_ahead.append(len(consumed))
+        release.wait(0.05)
+        return []
+
+    def source():
+        for i in range(20):
+            consumed.append(i)
+            yield {"col1": i}, 10
+
+    mock_client.insert_rows_json.side_effect = slow_insert
+    errors = await manager.insert_stream(TEST_TABLE, source(), batch_size=2, max_in_flight=2)
+
+    assert errors is None
+    assert len(consumed) == 20
+    # With 2 inserts in flight of 2 rows each, the reader is never more than 3 batches ahead.
+    assert max(reads - 2 * i for i, reads in enumerate(read_ahead)) <= 6
+
+
+@pytest.mark.asyncio
+async def test_insert_stream_stops_on_row_errors(mock_bq_client):
+    """Row errors stop reading the source and are returned."""
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    returned_errors = [{"index": 0, "errors": ["Some BQ Error"]}]
+    mock_client.insert_rows_json.return_value = returned_errors
+    consumed = []
+
+    def source():
+        for i in range(100):
+            consumed.append(i)
+            yield {"col1": i}, 10
+
+    errors = await manager.insert_stream(TEST_TABLE, source(), batch_size=2, max_in_flight=1)
+
+    assert errors == returned_errors
+    assert mock_client.insert_rows_json.call_count == 1
+    assert len(consumed) < 100
+
+
+@pytest.mark.asyncio
+async def test_insert_uses_serializer_with_real_client():
+    """A genuine client gets a pre-encoded insertAll body; row errors keep the insert_rows_json shape."""
+    from google.auth.credentials import AnonymousCredentials
+    from app import serialization
+
+    if serialization.backend == "json":
+        pytest.skip("no fast JSON backend installed")
+    client = bigquery.Client(project="my_project", credentials=AnonymousCredentials())
+    response = {"insertErrors": [{"index": "1", "errors": [{"reason": "invalid"}]}]}
+
+    with patch.object(client, "_call_api", return_value=response) as call_api:
+        errors = await BigQueryManager(client=client).insert_to_bq(TEST_TABLE, SAMPLE_DATA)
+
+    assert errors == [{"index": 1, "errors": [{"reason": "invalid"}]}]
+    kwargs = call_api.call_args.kwargs
+    assert kwargs["path"] == "/projects/my_project/datasets/my_dataset/tables/my_table/insertAll"
+    body = serialization.loads(kwargs["data"])
+    assert [row["json"] for row in body["rows"]] == SAMPLE_DATA
+    assert len({row["insertId"] for row in body["rows"]}) == len(SAMPLE_DATA)
+
+
+def test_raw_insert_internals_match_the_installed_library():
+    """The private Client/Connection API that _call_insert_all relies on is still there."""
+    import inspect
+
+    from google.cloud.bigquery._http import Connection
+
+    call_api = inspect.signature(bigquery.Client._call_api).parameters
+    assert {"retry", "span_name", "span_attributes", "headers"} <= set(call_api)
+    assert any(p.kind is inspect.Parameter.VAR_KEYWORD for p in call_api.values())
+    assert {"method", "path", "data", "content_type", "headers", "timeout"} <= set(
+        inspect.signature(Connection.api_request).parameters
+    )
+
+
+def test_raw_insert_internals_are_checked_once():
+    from app.cloud_tools import google_bigquerymanager
+
+    google_bigquerymanager._raw_insert_available.cache_clear()
+    assert google_bigquerymanager._raw_insert_available()
+    assert google_bigquerymanager._raw_insert_available.cache_info().hits == 0
+    assert google_bigquerymanager._raw_insert_available()
+    assert google_bigquerymanager._raw_insert_available.cache_info().hits == 1
+
+
+@pytest.mark.asyncio
+async def test_raw_insert_falls_back_to_insert_rows_json(monkeypatch):
+    """With internals that changed in the installed library, inserts go through the public API."""
+    from google.auth.credentials import AnonymousCredentials
+    from app.cloud_tools import google_bigquerymanager
+
+    class Changed(bigquery.Client):
+        def _call_api(self, retry, **kwargs):  # no span_name, span_attributes or headers
+            raise AssertionError("not called")
+
+    google_bigquerymanager._raw_insert_available.cache_clear()
+    monkeypatch.setattr(google_bigquerymanager, "_RAW_INSERT_CLIENT", Changed)
+    monkeypatch.setattr(google_bigquerymanager.serialization, "backend", "orjson")
+    client = Changed(project="my_project", credentials=AnonymousCredentials())
+    try:
+        with patch.object(client, "insert_rows_json", return_value=[]) as insert_rows_json:
+            assert await BigQueryManager(client=client).insert_to_bq(TEST_TABLE, SAMPLE_DATA) is None
+    finally:
+        google_bigquerymanager._raw_insert_available.cache_clear()
+
+    assert insert_rows_json.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_raw_insert_errors_are_not_mistaken_for_a_missing_api(monkeypatch):
+    """A TypeError from the raw path reaches the caller and does not switch later inserts off it."""
+    from google.auth.credentials import AnonymousCredentials
+    from app.cloud_tools import google_bigquerymanager
+
+    monkeypatch.setattr(google_bigquerymanager.serialization, "backend", "orjson")
+    client = bigquery.Client(project="my_project", credentials=AnonymousCredentials())
+    manager = BigQueryManager(client=client)
+    with patch.object(client, "_call_api", side_effect=[TypeError("bad row"), {}]) as call_api, patch.object(
+        client, "insert_rows_json", return_value=[]
+    ) as insert_rows_json:
+        with pytest.raises(TypeError, match="bad row"):
+            await manager._send(TEST_TABLE, SAMPLE_DATA)
+        assert await manager.insert_to_bq(TEST_TABLE, SAMPLE_DATA) is None
+
+    assert call_api.call_count == 2
+    insert_rows_json.assert_not_called()
+
+
+@pytest.fixture
+def staging_bucket():
+    """Captures staged files instead of uploading them."""
+    staged = {}
+
+    def upload(local_path, remote_name):
+        import gzip
+
+        with gzip.open(local_path, "rb") as f:
+            staged[remote_name] = f.read()
+        return True
+
+    with patch("app.cloud_tools.google_bucketmanager.BucketManager") as MockBucket:
+        MockBucket.return_value.upload_file.side_effect = upload
+        yield {"staged": staged, "bucket": MockBucket.return_value}
+
+
+def finished_job(error_result=None):
+    job = MagicMock(state="DONE", error_result=error_result, errors=[error_result] if error_result else None)
+    job.job_id = "job-1"
+    return job
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_streams_small_inputs(mock_bq_client, staging_bucket):
+    """Inputs below the threshold go through insert_rows_json, nothing is staged."""
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    mock_client.insert_rows_json.return_value = []
+
+    errors = await manager.bulk_load(TEST_TABLE, iter(SAMPLE_DATA), "stage-bucket")
+
+    assert errors is None
+    mock_client.insert_rows_json.assert_called_once_with(TEST_TABLE, SAMPLE_DATA)
+    mock_client.load_table_from_uri.assert_not_called()
+    assert staging_bucket["staged"] == {}
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_stages_gzip_ndjson_and_runs_one_job(mock_bq_client, staging_bucket):
+    """Large inputs are split into gzip NDJSON files and loaded by a single job."""
+    import json
+
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    mock_client.load_table_from_uri.return_value = finished_job()
+    rows = ({"col1": i, "col2": "x" * 20} for i in range(1000))
+
+    errors = await manager.bulk_load(
+        TEST_TABLE, rows, "stage-bucket", load_threshold_bytes=1000, max_file_bytes=10_000
+    )
+
+    assert errors is None
+    assert len(staging_bucket["staged"]) > 1
+    lines = b"".join(staging_bucket["staged"][name] for name in sorted(staging_bucket["staged"])).splitlines()
+    assert [json.loads(line)["col1"] for line in lines] == list(range(1000))
+    uris, table = mock_client.load_table_from_uri.call_args[0]
+    assert table == TEST_TABLE
+    assert uris == [f"gs://stage-bucket/{name}" for name in sorted(staging_bucket["staged"])]
+    config = mock_client.load_table_from_uri.call_args.kwargs["job_config"]
+    assert config.source_format == bigquery.SourceFormat.NEWLINE_DELIMITED_JSON
+    assert staging_bucket["bucket"].delete_file.call_count == len(uris)
+    mock_client.insert_rows_json.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_returns_job_errors(mock_bq_client, staging_bucket):
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    mock_client.load_table_from_uri.return_value = finished_job({"reason": "invalid", "message": "bad row"})
+
+    errors = await manager.bulk_load(TEST_TABLE, SAMPLE_DATA, "stage-bucket", load_threshold_bytes=10)
+
+    assert errors == [{"index": None, "errors": [{"reason": "invalid", "message": "bad row"}]}]
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_keeps_staged_files_while_job_runs(mock_bq_client, staging_bucket):
+    """On timeout the job is still reading its sources, so they are not deleted."""
+    manager = BigQueryManager()
+    mock_client = mock_bq_client["mock_client_instance"]
+    job = MagicMock(state="RUNNING")
+    job.done.return_value = False
+    mock_client.load_table_from_uri.return_value = job
+
+    with pytest.raises(TimeoutError):
+        await manager.bulk_load(TEST_TABLE, SAMPLE_DATA, "stage-bucket", load_threshold_bytes=10, timeout=0.05)
+
+    assert job.done.call_count >= 1
+    staging_bucket["bucket"].delete_file.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_cleans_up_failed_staging(mock_bq_client, staging_bucket):
+    manager = BigQueryManager()
+    staging_bucket["bucket"].upload_file.side_effect = [True, False]
+    rows = [{"col1": i} for i in range(100)]
+
+    with pytest.raises(OSError, match="Staging upload"):
+        await manager.bulk_load(TEST_TABLE, rows, "stage-bucket", load_threshold_bytes=10, max_file_bytes=200)
+
+    staging_bucket["bucket"].delete_file.assert_called_once()
+    mock_bq_client["mock_client_instance"].load_table_from_uri.assert_not_called()
+
@@ -117,6 +117,15 @@ def test_upload_file_exception_handling(mock_gcs_client, exception_to_raise):
     # Removed assertions checking log.warning or lack of log.info
 
 
+def test_upload_file_reports_outcome(mock_gcs_client):
+    """upload_file returns True on success and False when it swallowed an error."""
+    manager = BucketManager(TEST_BUCKET_NAME)
+    assert manager.upload_file(LOCAL_FILE_PATH, FULL_REMOTE_PATH) is True
+
+    mock_gcs_client["mock_blob_instance"].upload_from_filename.side_effect = ConnectionError("down")
+    assert manager.upload_file(LOCAL_FILE_PATH, FULL_REMOTE_PATH) is False
+
+
 def test_download_file_success(mock_gcs_client):
     """Tests the successful download_file path."""
     manager = BucketManager(TEST_BUCKET_NAME)
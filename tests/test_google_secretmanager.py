@@ -5,7 +5,8 @@ from unittest.mock import patch, MagicMock
 import pytest
 
 # Adjust this import path to where your functions actually reside
-from app.cloud_tools.google_secretmanager import get_secret, get_secret_env
+from app.cloud_tools.google_secretmanager import clear_secret_cache, get_secret, get_secret_env, prefetch_secrets
+from app.cloud_tools.shared_clients import clear_clients
 
 # --- Constants for Tests ---
 TEST_SECRET_ID = "my-test-secret"
@@ -147,3 +148,33 @@ def test_get_secret_env_passes_version(mock_get_secret_call):
     mock_get_secret_call.assert_called_once_with(
         TEST_SECRET_ID, TEST_PROJECT_ID, SPECIFIC_VERSION  # Check specific version was passed
     )
+
+
+# --- Tests for prefetch_secrets ---
+
+@pytest.fixture
+def clean_secret_state():
+    """Drops prefetched secrets and shared clients around a test."""
+    clear_secret_cache()
+    clear_clients()
+    yield
+    clear_secret_cache()
+    clear_clients()
+
+
+def test_prefetch_secrets_serves_from_memory(mock_sm_client, clean_secret_state):
+    """Prefetched secrets are fetched once with one shared client, then served from memory."""
+    values = prefetch_secrets(["a", "b"], TEST_PROJECT_ID)
+
+    assert values == {"a": "RAW_SECRET_DATA", "b": "RAW_SECRET_DATA"}
+    mock_sm_client["MockSecretClient"].assert_called_once_with()
+    assert mock_sm_client["mock_client_instance"].access_secret_version.call_count == 2
+
+    assert get_secret("a", TEST_PROJECT_ID) == "RAW_SECRET_DATA"
+    assert mock_sm_client["mock_client_instance"].access_secret_version.call_count == 2
+
+
+def test_prefetch_secrets_empty(mock_sm_client, clean_secret_state):
+    """Nothing to prefetch means no client and no RPC."""
+    assert prefetch_secrets([], TEST_PROJECT_ID) == {}
+    mock_sm_client["MockSecretClient"].assert_not_called()
@@ -0,0 +1,144 @@
+# tests/test_hedging.py
+"""
+Unit tests for hedged reads.
+"""
+
+import asyncio
+import itertools
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from app import hedging
+from app.cloud_tools import google_bucketmanager
+from app.cloud_tools.google_bucketmanager import BucketManager
+from app.hedging import HEDGES, Hedger
+
+
+def warmed(operation, latency=0.01, **options):
+    hedger = Hedger(operation, enabled=True, budget_ratio=1.0, **options)
+    for _ in range(hedger.min_samples):
+        hedger.observe(latency)
+    return hedger
+
+
+def slow_first(delay=0.3):
+    """The first call is slow, later calls answer at once; returns the call number."""
+    counter = itertools.count()
+
+    def read():
+        n = next(counter)
+        if n == 0:
+            time.sleep(delay)
+        return n
+
+    return read
+
+
+def test_delay_follows_the_latency_percentile():
+    hedger = Hedger("test-delay", enabled=True, percentile=0.9, min_samples=10)
+    for ms in range(1, 10):
+        hedger.observe(ms / 1000)
+    assert hedger.delay() is None
+
+    hedger.observe(0.1)
+    assert hedger.delay() == 0.1
+    hedger.observe(0.001)
+    assert hedger.delay() == pytest.approx(0.009)
+
+
+def test_slow_attempt_is_hedged_and_the_loser_discarded():
+    hedger = warmed("test-sync")
+    discarded = []
+    done = threading.Event()
+
+    def discard(result):
+        discarded.append(result)
+        done.set()
+
+    assert hedger.call(slow_first(), discard=discard) == 1
+    assert done.wait(1.0)
+    assert discarded == [0]
+    assert HEDGES.value(operation="test-sync", outcome="won") == 1
+
+
+def test_hedges_stay_within_the_budget():
+    hedger = warmed("test-budget")
+    hedger.budget_ratio = 0.0
+
+    assert hedger.call(slow_first(0.05)) == 0
+    assert HEDGES.value(operation="test-budget", outcome="over_budget") == 1
+    assert HEDGES.value(operation="test-budget", outcome="sent") == 0
+
+
+def test_both_attempts_failing_raises():
+    hedger = warmed("test-fail")
+
+    def read():
+        time.sleep(0.05)
+        raise OSError("unavailable")
+
+    with pytest.raises(OSError, match="unavailable"):
+        hedger.call(read)
+
+
+def test_disabled_hedger_calls_through():
+    hedger = Hedger("test-off")
+    caller = threading.get_ident()
+
+    assert hedger.call(threading.get_ident) == caller
+
+
+@pytest.mark.asyncio
+async def test_async_loser_is_cancelled():
+    hedger = warmed("test-async")
+    started = []
+
+    async def attempt():
+        started.append(len(started))
+        if len(started) == 1:
+            await asyncio.sleep(10)
+        return len(started)
+
+    assert await asyncio.wait_for(hedger.run(attempt), 1.0) == 2
+    await asyncio.sleep(0)
+    assert HEDGES.value(operation="test-async", outcome="won") == 1
+
+
+def test_hedged_download_keeps_only_the_winners_file(tmp_path, monkeypatch):
+    calls = itertools.count()
+
+    def download_to_filename(path, **_):
+        n = next(calls)
+        if n == 0:
+            time.sleep(0.3)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"attempt {n}")
+
+    client = MagicMock()
+    client.bucket.return_value.blob.return_value.download_to_filename.side_effect = download_to_filename
+    monkeypatch.setattr(google_bucketmanager, "HEDGED_DOWNLOADS", warmed("gcs.download"))
+    target = tmp_path / "file.txt"
+
+    BucketManager("bucket", client=client).download_file("remote.txt", str(target))
+    time.sleep(0.4)
+
+    assert target.read_text(encoding="utf-8") == "attempt 1"
+    assert os.listdir(tmp_path) == ["file.txt"]
+
+
+def test_configure_resizes_the_latency_window_of_existing_hedgers():
+    existing = hedging.hedger("test.window")
+    for _ in range(10):
+        existing.observe(0.01)
+
+    hedging.configure(window=4)
+    try:
+        assert list(existing._latencies) == [0.01] * 4
+        with pytest.raises(TypeError):
+            hedging.configure(windw=4)
+    finally:
+        hedging.configure(window=200)
@@ -0,0 +1,111 @@
+# tests/test_lifecycle.py
+"""
+Unit tests for the Lifecycle hook registry and its background event loop.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.lifecycle import Lifecycle
+
+
+@pytest.fixture
+def lc():
+    """A fresh Lifecycle, shut down after the test."""
+    instance = Lifecycle()
+    yield instance
+    instance.shutdown(timeout=5)
+
+
+def test_startup_runs_hooks_concurrently(lc):
+    """Two slow hooks (one sync, one async) overlap instead of running back to back."""
+    calls = []
+
+    @lc.on_startup
+    async def async_hook():
+        await asyncio.sleep(0.2)
+        calls.append("async")
+
+    @lc.on_startup
+    def sync_hook():
+        time.sleep(0.2)
+        calls.append("sync")
+
+    start = time.perf_counter()
+    lc.startup(timeout=5)
+
+    assert sorted(calls) == ["async", "sync"]
+    assert time.perf_counter() - start < 0.35
+
+
+def test_slow_startup_hook_does_not_raise(lc):
+    """A hook outliving the startup timeout keeps running instead of failing the cold start."""
+    finished = threading.Event()
+
+    @lc.on_startup
+    def slow():
+        time.sleep(0.2)
+        finished.set()
+
+    lc.startup(timeout=0.01)
+
+    assert not finished.is_set()
+    assert finished.wait(2)
+
+
+def test_startup_runs_once_and_survives_failing_hook(lc):
+    """A failing hook is logged, the others still run, and a second startup is a no-op."""
+    calls = []
+
+    @lc.on_startup
+    def broken():
+        raise RuntimeError("boom")
+
+    @lc.on_startup
+    def ok():
+        calls.append("ok")
+
+    lc.startup(timeout=5)
+    lc.startup(timeout=5)
+
+    assert calls == ["ok"]
+
+
+def test_shutdown_runs_in_reverse_order(lc):
+    """Shutdown hooks run last-registered first, exactly once."""
+    calls = []
+    lc.on_shutdown(lambda: calls.append("first"))
+    lc.on_shutdown(lambda: calls.append("second"))
+
+    lc.shutdown(timeout=5)
+    lc.shutdown(timeout=5)
+
+    assert calls == ["second", "first"]
+
+
+def test_run_returns_result_and_reuses_loop(lc):
+    """Coroutines run on the same background loop across calls."""
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    assert lc.run(current_loop()) is lc.run(current_loop())
+
+
+def test_run_from_loop_thread_raises(lc):
+    """Blocking on the loop from inside the loop would deadlock, so it is refused."""
+
+    async def nested():
+        lc.run(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError):
+        lc.run(nested(), timeout=5)
+
+
+def test_run_timeout(lc):
+    """A coroutine exceeding the timeout raises TimeoutError."""
+    with pytest.raises(TimeoutError):
+        lc.run(asyncio.sleep(1), timeout=0.05)
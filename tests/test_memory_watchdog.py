@@ -0,0 +1,164 @@
+# tests/test_memory_watchdog.py
+"""
+Unit tests for the memory-pressure watchdog and the sizes that adapt to it.
+"""
+
+import threading
+
+import pytest
+
+import memory_watchdog  # the module cloud_tools imports (app/ is on the test pythonpath)
+from app.cloud_tools.google_bigquerymanager import _adaptive_ranges, sized_batches
+from app.cloud_tools.google_bucketmanager import upload_chunk_size
+from app.discord_hook import DiscordAttachment
+from app.memory_watchdog import MemoryWatchdog, cgroup_limit_bytes, cgroup_working_set
+
+MiB = 1024 * 1024
+
+
+class Usage:
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value
+
+
+@pytest.fixture
+def pressure(monkeypatch):
+    """Sets the shared watchdog's pressure (fraction of a 1000 MiB limit)."""
+    usage = Usage(0)
+    shared = memory_watchdog.watchdog
+    monkeypatch.setattr(shared, "reader", usage)
+    monkeypatch.setattr(shared, "limit_bytes", 1000 * MiB)
+    monkeypatch.setattr(shared, "level", "ok")
+    monkeypatch.setattr(shared, "interval", 0)
+
+    def set_pressure(value):
+        usage.value = int(value * 1000 * MiB)
+
+    return set_pressure
+
+
+def test_factor_shrinks_linearly_between_watermarks():
+    usage = Usage(0)
+    watchdog = MemoryWatchdog(limit_bytes=1000, high=0.5, critical=0.9, min_factor=0.2, interval=0, reader=usage)
+
+    usage.value = 400
+    assert watchdog.factor() == 1.0
+    assert watchdog.scaled(500) == 500
+    usage.value = 700
+    assert watchdog.factor() == pytest.approx(0.6)
+    assert watchdog.scaled(500, minimum=10) == 300
+    usage.value = 950
+    assert watchdog.scaled(500, minimum=200) == 200
+    assert watchdog.level == "critical"
+    assert watchdog.scaled(100, minimum=200) == 100
+
+
+def test_without_a_limit_there_is_no_pressure():
+    watchdog = MemoryWatchdog(interval=0, reader=Usage(10**12))
+    watchdog.limit_bytes = None  # no MEMORY_LIMIT_MB and an unlimited cgroup
+
+    assert watchdog.pressure() == 0.0
+    assert watchdog.scaled(500) == 500
+
+
+def test_cgroup_v2_files(tmp_path):
+    (tmp_path / "memory.max").write_text("536870912\n")
+    (tmp_path / "memory.current").write_text("300000000\n")
+    (tmp_path / "memory.stat").write_text("anon 1\ninactive_file 100000000\nactive_file 5\n")
+
+    assert cgroup_limit_bytes(tmp_path) == 536870912
+    assert cgroup_working_set(tmp_path) == 200000000
+
+    (tmp_path / "memory.max").write_text("max\n")
+    assert cgroup_limit_bytes(tmp_path) is None
+
+
+def test_cgroup_v1_files(tmp_path):
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "memory.limit_in_bytes").write_text("9223372036854771712\n")
+    (tmp_path / "memory" / "memory.usage_in_bytes").write_text("5000\n")
+    (tmp_path / "memory" / "memory.stat").write_text("total_inactive_file 1000\n")
+
+    assert cgroup_limit_bytes(tmp_path) is None
+    assert cgroup_working_set(tmp_path) == 4000
+    assert cgroup_working_set(tmp_path / "missing") is None
+
+
+def test_request_peak_is_reported():
+    usage = Usage(100 * MiB)
+    watchdog = MemoryWatchdog(limit_bytes=500 * MiB, interval=0, reader=usage)
+
+    request = watchdog.track()
+    usage.value = 300 * MiB
+    watchdog.sample()
+    usage.value = 150 * MiB
+    report = watchdog.report(request)
+    watchdog.untrack(request)
+
+    assert report["usage_mb"] == 150.0
+    assert report["request_peak_mb"] == 300.0
+    assert report["request_growth_mb"] == 200.0
+    assert report["limit_mb"] == 500.0
+    assert report["pressure"] == 0.3
+
+
+def test_insert_batches_shrink_under_pressure(pressure):
+    rows = [({"i": i}, 10) for i in range(100)]
+
+    assert [stop - start for start, stop in _adaptive_ranges(100, 50)] == [50, 50]
+    assert [len(batch) for batch in sized_batches(rows, 50)] == [50, 50]
+
+    pressure(0.95)
+    assert [stop - start for start, stop in _adaptive_ranges(100, 500)] == [50, 50]
+    assert [len(batch) for batch in sized_batches(rows, 500, max_bytes=10**9)] == [50, 50]
+
+
+def test_upload_chunks_shrink_under_pressure(pressure):
+    assert upload_chunk_size() is None
+
+    pressure(0.85)
+    chunk = upload_chunk_size()
+    assert chunk is not None and chunk < 100 * MiB
+    assert chunk % (256 * 1024) == 0
+
+
+def test_attachments_are_capped_under_pressure(pressure):
+    content = "x" * (2 * MiB) + "ValueError: the cause"
+
+    attachment = DiscordAttachment(content=content)
+    assert attachment.prepare()
+    assert len(attachment.buffer.getvalue()) == len(content)
+
+    pressure(0.95)
+    attachment = DiscordAttachment(content=content)
+    assert attachment.prepare()
+    data = attachment.buffer.getvalue()
+    assert len(data) < 1 * MiB
+    assert data.startswith(b"... [truncated]\n")
+    assert data.endswith(b"ValueError: the cause")
+
+
+def test_background_sampling_survives_failures(monkeypatch):
+    monkeypatch.setattr(memory_watchdog, "MAX_SAMPLE_BACKOFF", 0.02)
+    calls = []
+    recovered = threading.Event()
+
+    def reader():
+        calls.append(None)
+        if len(calls) <= 3:
+            raise OSError("cgroup file vanished")
+        recovered.set()
+        return 100 * MiB
+
+    watchdog = MemoryWatchdog(limit_bytes=1000 * MiB, interval=0.005, reader=reader)
+    watchdog.start()
+    try:
+        assert recovered.wait(2.0)
+    finally:
+        watchdog.stop()
+
+    assert watchdog.last_usage == 100 * MiB
+    assert memory_watchdog.SAMPLE_FAILURES.value() >= 3
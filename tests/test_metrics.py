@@ -0,0 +1,88 @@
+# tests/test_metrics.py
+"""
+Unit tests for the in-process metrics registry and its OpenMetrics exposition.
+"""
+
+import math
+
+import pytest
+
+from app.metrics import Counter, Gauge, Histogram, Metric, Registry
+
+
+@pytest.fixture
+def registry():
+    return Registry()
+
+
+def test_counter_renders_total_suffix(registry):
+    """Counters expose one `_total` sample per label set."""
+    sends = registry.register(Counter("webhook_sends", "Sends.", ["status"]))
+    sends.inc(status="ok")
+    sends.inc(2, status="ok")
+    sends.inc(status="failed")
+
+    text = registry.render()
+
+    assert "# TYPE webhook_sends counter" in text
+    assert 'webhook_sends_total{status="ok"} 3' in text
+    assert 'webhook_sends_total{status="failed"} 1' in text
+    assert text.endswith("# EOF\n")
+
+
+def test_counter_rejects_negative_and_wrong_labels(registry):
+    rows = registry.register(Counter("rows", "Rows.", ["table"]))
+    with pytest.raises(ValueError):
+        rows.inc(-1, table="t")
+    with pytest.raises(ValueError):
+        rows.inc(other="t")
+
+
+def test_gauge_moves_both_ways(registry):
+    inflight = registry.register(Gauge("inflight", "In flight."))
+    inflight.inc(3)
+    inflight.dec()
+    assert inflight.value() == 2
+    assert "inflight 2" in registry.render()
+
+
+def test_histogram_buckets_are_cumulative(registry):
+    """Bucket counts are cumulative, with +Inf equal to the count."""
+    latency = registry.register(Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0)))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        latency.observe(value)
+
+    text = registry.render()
+
+    assert 'latency_seconds_bucket{le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{le="1"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert "latency_seconds_count 4" in text
+    assert "latency_seconds_sum 5.65" in text
+    assert latency.quantile(0.5) == 0.1
+    assert math.isinf(latency.quantile(0.99))
+
+
+def test_register_is_get_or_create(registry):
+    """Re-declaring a metric returns the original; a conflicting definition is refused."""
+    first = registry.register(Counter("calls", "Calls."))
+    assert registry.register(Counter("calls", "Calls.")) is first
+    with pytest.raises(ValueError):
+        registry.register(Gauge("calls", "Calls."))
+
+
+def test_label_values_are_escaped(registry):
+    errors = registry.register(Counter("errors", "Errors.", ["reason"]))
+    errors.inc(reason='bad "quote"\n')
+    assert 'errors_total{reason="bad \\"quote\\"\\n"} 1' in registry.render()
+
+
+def test_metric_kinds_must_implement_samples_and_reset():
+    class Incomplete(Metric):
+        def samples(self):
+            return []
+
+    with pytest.raises(TypeError):
+        Metric("m", "doc")
+    with pytest.raises(TypeError):
+        Incomplete("m", "doc")
@@ -0,0 +1,86 @@
+# tests/test_notify_routing.py
+"""
+Unit tests for the notification routing table and the concurrent fan-out.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import notify_routing  # the module discord_hook imports (app/ is on the test pythonpath)
+from app import discord_hook
+from custom_exceptions import ConfigurationError
+from notify_routing import Route, parse_routes
+
+ONCALL = "https://hooks.invalid/oncall"
+DIGEST = "https://hooks.invalid/digest"
+
+
+@pytest.fixture(autouse=True)
+def no_routes():
+    yield
+    notify_routing.configure("")
+
+
+def test_routes_are_parsed():
+    routes = parse_routes(f" error, critical={ONCALL} ; warning+@0.5={DIGEST};*={DIGEST}?wait=true ")
+
+    assert routes == [
+        Route(ONCALL, frozenset({"error", "critical"})),
+        Route(DIGEST, frozenset(), 30, 0.5),
+        Route(f"{DIGEST}?wait=true", frozenset(), 0),
+    ]
+    assert routes[1].matches("fail") and routes[1].matches("warning") and not routes[1].matches("success")
+    assert routes[2].matches("debug")
+
+
+@pytest.mark.parametrize("spec", ["error", f"={ONCALL}", f"loud+={ONCALL}", f"error@x={ONCALL}", f"error@2={ONCALL}"])
+def test_malformed_routes_are_rejected(spec):
+    with pytest.raises(ConfigurationError):
+        parse_routes(spec)
+
+
+def test_destinations_follow_the_table(monkeypatch):
+    assert notify_routing.destinations("error", ONCALL) == [ONCALL]
+    assert notify_routing.destinations("error", "") == []
+
+    notify_routing.configure(f"error+={ONCALL};*={ONCALL};success@0.1={DIGEST}")
+    assert notify_routing.destinations("critical", "https://default.invalid") == [ONCALL]
+
+    monkeypatch.setattr(notify_routing.random, "random", lambda: 0.05)
+    assert notify_routing.destinations("success") == [ONCALL, DIGEST]
+    monkeypatch.setattr(notify_routing.random, "random", lambda: 0.5)
+    before = notify_routing.SAMPLED_OUT.value(msg_type="success")
+    assert notify_routing.destinations("success") == [ONCALL]
+    assert notify_routing.SAMPLED_OUT.value(msg_type="success") == before + 1
+
+
+class SlowClient:
+    """Answers every post after ``delay`` seconds; records what was sent where."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.posts = []
+
+    async def post(self, url, **kwargs):
+        self.posts.append((url, kwargs))
+        await asyncio.sleep(self.delay)
+        return httpx.Response(204, request=httpx.Request("POST", url))
+
+
+@pytest.mark.asyncio
+async def test_fan_out_is_concurrent(monkeypatch):
+    client = SlowClient(0.2)
+    monkeypatch.setattr(discord_hook, "get_http_client", lambda: client)
+
+    start = time.perf_counter()
+    sent = await discord_hook.notify_all(
+        [ONCALL, DIGEST], "boom", msg_type="error", attachment_content="Traceback ...", attachment_filename="e.log"
+    )
+
+    assert sent == [True, True]
+    assert time.perf_counter() - start < 0.35
+    assert sorted(url for url, _ in client.posts) == [DIGEST, ONCALL]
+    assert all("files" in kwargs for _, kwargs in client.posts)
@@ -0,0 +1,108 @@
+# tests/test_profiling.py
+"""
+Unit tests for the per-request sampling profiler.
+"""
+
+import asyncio
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import profiling
+
+
+def busy_loop(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+def test_profiler_captures_collapsed_stacks():
+    """Samples of the calling thread end in the function that was burning CPU."""
+    with profiling.SamplingProfiler(interval=0.001) as profiler:
+        busy_loop(0.1)
+
+    assert profiler.samples > 10
+    assert any(stack.split(";")[-1].endswith(":busy_loop") for stack in profiler.stacks)
+    first_line = profiler.collapsed().splitlines()[0]
+    assert first_line.rsplit(" ", 1)[1].isdigit()
+
+
+def test_profiler_samples_work_done_on_the_loop_and_executor_threads():
+    """Work the request hands to the lifecycle loop shows up under the thread that did it."""
+
+    async def work():
+        busy_loop(0.1)
+        await asyncio.get_running_loop().run_in_executor(None, busy_loop, 0.1)
+
+    with profiling.SamplingProfiler(interval=0.001, thread_prefixes=profiling.BACKGROUND_THREADS) as profiler:
+        profiling.lifecycle.run(work())
+
+    roots = {stack.split(";")[0] for stack in profiler.stacks if stack.endswith(":busy_loop")}
+    assert "[lifecycle-loop]" in roots
+    assert any(root.startswith("[asyncio_") for root in roots)
+    assert not any(stack.endswith("selectors.py:select") for stack in profiler.stacks)
+
+
+@pytest.mark.parametrize(
+    "headers, sample_rate, expect_profiler, expect_forced",
+    [
+        ({}, 0.0, False, False),
+        ({profiling.PROFILE_HEADER: "s3cret"}, 0.0, True, True),
+        ({profiling.PROFILE_HEADER: "1"}, 0.0, False, False),
+        ({}, 1.0, True, False),
+    ],
+    ids=["disabled", "header", "wrong-token", "sampled"],
+)
+def test_start_if_requested(headers, sample_rate, expect_profiler, expect_forced):
+    profiler = profiling.start_if_requested(headers, sample_rate, token="s3cret")
+    try:
+        assert (profiler is not None) is expect_profiler
+        if profiler:
+            assert profiler.forced is expect_forced
+    finally:
+        if profiler:
+            profiler.stop()
+
+
+def test_header_is_ignored_without_a_token():
+    assert profiling.start_if_requested({profiling.PROFILE_HEADER: ""}, 0.0) is None
+    assert profiling.start_if_requested({profiling.PROFILE_HEADER: "1"}, 0.0) is None
+
+
+def test_finish_skips_fast_sampled_requests():
+    """Sampled (not forced) requests below the slow threshold ship nothing."""
+    profiler = profiling.SamplingProfiler(interval=0.001).start()
+    busy_loop(0.02)
+    with patch.object(profiling.lifecycle, "submit") as mock_submit:
+        assert profiling.finish(profiler, elapsed_ms=20, slow_ms=1000, bucket_name="bucket") is None
+    mock_submit.assert_not_called()
+
+
+def test_finish_uploads_slow_requests_to_bucket():
+    """Slow sampled requests are uploaded under profiles/<service>/ in the background."""
+    profiler = profiling.SamplingProfiler(interval=0.001).start()
+    busy_loop(0.02)
+    with patch.object(profiling.lifecycle, "submit") as mock_submit:
+        remote_name = profiling.finish(profiler, elapsed_ms=5000, slow_ms=1000, bucket_name="bucket")
+
+    assert remote_name.startswith("profiles/") and remote_name.endswith(".collapsed")
+    mock_submit.assert_called_once()
+    mock_submit.call_args[0][0].close()
+
+
+def test_finish_resolves_the_webhook_only_for_a_discord_fallback():
+    """A lazy webhook URL is not fetched when a bucket is set, and a failed fetch ships nothing."""
+    resolve = MagicMock(side_effect=RuntimeError("secret unavailable"))
+    profiler = profiling.SamplingProfiler(interval=0.001).start()
+    busy_loop(0.02)
+    with patch.object(profiling.lifecycle, "submit") as mock_submit:
+        assert profiling.finish(profiler, elapsed_ms=5000, slow_ms=1000, bucket_name="bucket", webhook_url=resolve)
+        resolve.assert_not_called()
+        mock_submit.call_args[0][0].close()
+        mock_submit.reset_mock()
+
+        assert profiling.finish(profiler, elapsed_ms=5000, slow_ms=1000, webhook_url=resolve) is None
+    resolve.assert_called_once()
+    mock_submit.assert_not_called()
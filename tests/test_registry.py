@@ -0,0 +1,40 @@
+# tests/test_registry.py
+"""
+Unit tests for the keyed registry behind circuit breakers, hedgers and concurrency limits.
+"""
+
+import pytest
+
+from app.concurrency_limit import AdaptiveLimiter
+from app.hedging import Hedger
+from app.registry import Registry
+
+
+def test_objects_are_created_once_with_defaults_and_options():
+    limiters = Registry(AdaptiveLimiter, defaults={"slow": {"latency_tolerance": 3.0}})
+    limiters.configure(max_limit=16.0)
+
+    assert limiters.get("slow") is limiters.get("slow")
+    assert limiters.get("slow").latency_tolerance == 3.0
+    assert limiters.get("fast").latency_tolerance is None
+    assert {limiter.max_limit for limiter in limiters} == {16.0}
+
+
+def test_configure_applies_to_existing_objects():
+    hedgers = Registry(Hedger, fixed=["enabled"])
+    hedger = hedgers.get("gcs.read", enabled=True)
+
+    hedgers.configure(percentile=0.9)
+
+    assert hedger.percentile == 0.9 and hedger.enabled
+    assert hedgers.get("gcs.read", enabled=False) is hedger
+
+
+@pytest.mark.parametrize("option", ["precentile", "operation", "enabled"])
+def test_unknown_and_fixed_options_are_rejected(option):
+    hedgers = Registry(Hedger, fixed=["enabled"])
+    hedger = hedgers.get("gcs.read")
+
+    with pytest.raises(TypeError, match=option):
+        hedgers.configure(**{option: 0.9})
+    assert hedger.percentile == 0.95
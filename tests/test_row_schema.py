@@ -0,0 +1,187 @@
+# tests/test_row_schema.py
+"""
+Unit tests for schema-bound BigQuery row encoding.
+"""
+
+import datetime
+import decimal
+import json
+from array import array
+from unittest.mock import MagicMock, patch
+
+import pytest
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import bigquery
+
+from app.cloud_tools.google_bigquerymanager import BigQueryManager
+from app.cloud_tools.row_schema import RowSchema, RowValidationError, as_json_rows
+
+SCHEMA = [
+    {"name": "id", "type": "INTEGER", "mode": "REQUIRED"},
+    {"name": "score", "type": "FLOAT", "mode": "REQUIRED"},
+    {"name": "name", "type": "STRING"},
+    {"name": "active", "type": "BOOLEAN"},
+    {"name": "amount", "type": "NUMERIC"},
+    {"name": "created", "type": "TIMESTAMP"},
+    {"name": "day", "type": "DATE"},
+    {"name": "blob", "type": "BYTES"},
+    {"name": "tags", "type": "STRING", "mode": "REPEATED"},
+    {"name": "meta", "type": "JSON"},
+    {"name": "owner", "type": "RECORD", "fields": [
+        {"name": "email", "type": "STRING", "mode": "REQUIRED"},
+        {"name": "roles", "type": "STRING", "mode": "REPEATED"},
+    ]},
+]
+ROW = {
+    "id": 1,
+    "score": 2.5,
+    "name": "grüße",
+    "active": True,
+    "amount": decimal.Decimal("1.10"),
+    "created": datetime.datetime(2025, 1, 2, 3, 4, 5),
+    "day": datetime.date(2025, 1, 2),
+    "blob": b"\x00\x01",
+    "tags": ["a", "b"],
+    "meta": {"k": [1, 2]},
+    "owner": {"email": "a@b.c", "roles": ["admin"]},
+}
+ENCODED = {
+    **ROW,
+    "amount": "1.10",
+    "created": "2025-01-02T03:04:05",
+    "day": "2025-01-02",
+    "blob": "AAE=",
+    "meta": '{"k":[1,2]}',
+}
+
+
+@pytest.fixture
+def schema():
+    return RowSchema.from_api_repr(SCHEMA, name="Event")
+
+
+def test_encode_validates_and_serializes_in_one_pass(schema):
+    assert json.loads(schema.encode(ROW)) == ENCODED
+
+
+def test_nullable_columns_are_omitted(schema):
+    assert json.loads(schema.encode({"id": 1, "score": 0})) == {"id": 1, "score": 0.0}
+
+
+@pytest.mark.parametrize(
+    "row, message",
+    [
+        ({"score": 1.0}, "id: REQUIRED value missing"),
+        ({"id": "1", "score": 1.0}, "id: expected INTEGER"),
+        ({"id": True, "score": 1.0}, "id: expected INTEGER"),
+        ({"id": 2**63, "score": 1.0}, "out of int64 range"),
+        ({"id": 1, "score": 1.0, "day": datetime.datetime(2025, 1, 1)}, "day: expected DATE"),
+        ({"id": 1, "score": 1.0, "amount": "abc"}, "amount: expected NUMERIC"),
+        ({"id": 1, "score": 1.0, "tags": "a"}, "tags: expected REPEATED"),
+        ({"id": 1, "score": 1.0, "owner": {"roles": []}}, "owner: email: REQUIRED value missing"),
+        ({"id": 1, "score": 1.0, "extra": 1}, "unknown columns"),
+    ],
+)
+def test_invalid_rows_raise(schema, row, message):
+    with pytest.raises(RowValidationError, match=message):
+        schema.encode(row)
+
+
+def test_unknown_columns_can_be_ignored():
+    schema = RowSchema.from_api_repr(SCHEMA, ignore_unknown=True)
+    assert json.loads(schema.encode({"id": 1, "score": 1.0, "extra": 1})) == {"id": 1, "score": 1.0}
+
+
+def test_nonfinite_floats_are_sent_as_strings(schema):
+    assert json.loads(schema.encode({"id": 1, "score": float("nan")}))["score"] == "NaN"
+
+
+def test_generated_model_is_slotted_and_encodes_like_a_dict(schema):
+    row = schema.model(**ROW)
+    assert not hasattr(row, "__dict__")
+    assert schema.model.__name__ == "Event"
+    assert schema.encode(row) == schema.encode(ROW)
+    assert schema.model(id=1, score=1.0).tags == []
+
+
+def test_column_batch_encodes_like_rows(schema):
+    rows = [dict(ROW, id=i, score=i / 2) for i in range(5)]
+    batch = schema.batch(rows)
+
+    assert len(batch) == 5
+    assert isinstance(batch.columns["id"], array)
+    assert [json.loads(row) for row in batch.encode_rows()] == [json.loads(schema.encode(row)) for row in rows]
+    body = json.loads(batch.encode_insert_all(row_ids=[str(i) for i in range(5)]))
+    assert [row["insertId"] for row in body["rows"]] == ["0", "1", "2", "3", "4"]
+    assert body["rows"][3]["json"]["id"] == 3
+
+
+def test_column_batch_slices(schema):
+    batch = schema.batch(dict(ROW, id=i) for i in range(10))
+    sliced = batch[2:5]
+    assert len(sliced) == 3
+    assert [row["id"] for row in sliced.to_dicts()] == [2, 3, 4]
+
+
+def test_column_batch_rejects_bad_rows_atomically(schema):
+    batch = schema.batch([ROW])
+    with pytest.raises(RowValidationError, match="score"):
+        batch.append(dict(ROW, score="high"))
+    assert len(batch) == 1
+    assert all(len(column) == 1 for column in batch.columns.values())
+
+    batch.append(dict(ROW, name=3))
+    with pytest.raises(RowValidationError, match="row 1: name"):
+        batch.encode_insert_all()
+
+
+def test_column_batch_rolls_back_out_of_range_integers():
+    schema = RowSchema.from_api_repr(
+        [{"name": "score", "type": "FLOAT", "mode": "REQUIRED"}, {"name": "id", "type": "INTEGER", "mode": "REQUIRED"}]
+    )
+    batch = schema.batch([{"score": 1.0, "id": 1}])
+    with pytest.raises(RowValidationError, match="id"):
+        batch.append({"score": 2.0, "id": 2**63})
+    batch.append({"score": 3.0, "id": 3})
+
+    assert batch.to_dicts() == [{"score": 1.0, "id": 1}, {"score": 3.0, "id": 3}]
+
+
+def test_column_batch_rejects_bools_in_number_columns(schema):
+    batch = schema.batch()
+    with pytest.raises(RowValidationError, match="id"):
+        batch.append(dict(ROW, id=True))
+    with pytest.raises(RowValidationError, match="score"):
+        batch.append(dict(ROW, score=False))
+    assert len(batch) == 0 and all(len(column) == 0 for column in batch.columns.values())
+
+
+def test_as_json_rows(schema):
+    rows = [ROW]
+    assert as_json_rows([{"a": 1}]) == [{"a": 1}]
+    assert as_json_rows([schema.model(**ROW)]) == [ENCODED]
+    assert as_json_rows(schema.batch(rows)) == [ENCODED]
+
+
+@pytest.mark.asyncio
+async def test_insert_to_bq_sends_schema_encoded_body(schema):
+    client = bigquery.Client(project="p", credentials=AnonymousCredentials())
+    batch = schema.batch(dict(ROW, id=i) for i in range(5))
+
+    with patch.object(client, "_call_api", return_value={}) as call_api:
+        errors = await BigQueryManager(client=client).insert_to_bq("p.d.t", batch, batch_size=2)
+
+    assert errors is None
+    assert call_api.call_count == 3
+    ids = [row["json"]["id"] for call in call_api.call_args_list for row in json.loads(call.kwargs["data"])["rows"]]
+    assert ids == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_insert_to_bq_converts_models_for_other_clients(schema):
+    client = MagicMock()
+    client.insert_rows_json.return_value = []
+
+    await BigQueryManager(client=client).insert_to_bq("p.d.t", [schema.model(**ROW)])
+
+    client.insert_rows_json.assert_called_once_with("p.d.t", [ENCODED])
@@ -0,0 +1,174 @@
+# tests/test_secret_settings.py
+"""
+Unit tests for Secret Manager backed settings.
+"""
+
+import threading
+import time
+
+import pytest
+
+from custom_exceptions import ConfigurationError  # the module secret_settings imports (app/ is on the test pythonpath)
+from app.secret_settings import LazySecrets, fetch_secrets, parse_reference
+from app.settings_model import Settings
+from app.settings_snapshot import FrozenSettings, build_snapshot
+
+ENV = {
+    "SERVICE_NAME": "svc",
+    "PROJECT_ID": "proj",
+    "REGION": "europe-west3",
+    "RUNTIME": "python312",
+    "TIMEOUT": "60",
+    "RUNTIME_SERVICE_ACCOUNT_EMAIL": "sa@example.com",
+    "DISCORD_HOOK_URL": "sm://discord-hook",
+    "PROFILE_BUCKET": "sm://profile-bucket@3",
+}
+
+
+@pytest.fixture
+def fetches(monkeypatch):
+    """Replaces the Secret Manager batch fetch and records each call."""
+    calls = []
+
+    def fake_fetch(references, project_id):
+        calls.append((dict(references), project_id))
+        time.sleep(0.01)
+        return {name: f"secret-{name}" for name in references}
+
+    monkeypatch.setattr("secret_settings.fetch_secrets", fake_fetch)
+    for key, value in ENV.items():
+        monkeypatch.setenv(key, value)
+    return calls
+
+
+def test_parse_reference():
+    assert parse_reference("sm://hook") == ("hook", "latest")
+    assert parse_reference("sm://hook@3") == ("hook", "3")
+    assert parse_reference("https://discord.invalid/hook") is None
+    assert parse_reference(60) is None
+    with pytest.raises(ValueError):
+        parse_reference("sm://@3")
+
+
+def test_secrets_are_fetched_on_first_access_in_one_batch(fetches):
+    settings = Settings(_env_file=None)
+
+    assert settings.timeout == 60
+    assert settings.project_id == "proj"
+    assert fetches == []
+
+    assert settings.discord_hook_url == "secret-discord_hook_url"
+    assert settings.profile_bucket == "secret-profile_bucket"
+    assert settings.discord_hook_url == "secret-discord_hook_url"
+    assert fetches == [({"discord_hook_url": "sm://discord-hook", "profile_bucket": "sm://profile-bucket@3"}, "proj")]
+
+
+def test_concurrent_first_access_fetches_once(fetches):
+    settings = Settings(_env_file=None)
+    seen = []
+
+    threads = [threading.Thread(target=lambda: seen.append(settings.discord_hook_url)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == ["secret-discord_hook_url"] * 8
+    assert len(fetches) == 1
+
+
+def test_project_id_cannot_be_a_reference(fetches, monkeypatch):
+    monkeypatch.setenv("PROJECT_ID", "sm://project")
+
+    with pytest.raises(ValueError):
+        Settings(_env_file=None)
+
+
+def test_snapshot_keeps_references_and_resolves_lazily(fetches):
+    snapshot = build_snapshot(Settings(_env_file=None), ENV)
+
+    assert snapshot["values"]["discord_hook_url"] == "sm://discord-hook"
+    settings = FrozenSettings(snapshot["values"])
+    assert settings.region == "europe-west3"
+    assert fetches == []
+    assert settings.profile_bucket == "secret-profile_bucket"
+    assert len(fetches) == 1
+    with pytest.raises(AttributeError):
+        settings.missing  # pylint: disable=pointless-statement
+
+
+def test_failed_fetch_is_retried(monkeypatch):
+    attempts = []
+
+    def flaky(references, project_id):
+        attempts.append(project_id)
+        if len(attempts) == 1:
+            raise RuntimeError("unavailable")
+        return {"hook": "value"}
+
+    monkeypatch.setattr("app.secret_settings.fetch_secrets", flaky)
+    secrets = LazySecrets({"hook": "sm://hook"}, "proj")
+
+    with pytest.raises(ConfigurationError, match=r"\['hook'\]") as raised:
+        secrets.resolve()
+    assert isinstance(raised.value.__cause__, RuntimeError)
+    assert secrets.resolve() == {"hook": "value"}
+    assert len(attempts) == 2
+
+
+def test_failed_fetch_names_the_settings_on_attribute_access(fetches, monkeypatch):
+    def unavailable(references, project_id):
+        raise RuntimeError("403 Permission denied")
+
+    monkeypatch.setattr("secret_settings.fetch_secrets", unavailable)
+    settings = Settings(_env_file=None)
+
+    with pytest.raises(ConfigurationError, match=r"\['discord_hook_url', 'profile_bucket'\].*Permission denied"):
+        settings.discord_hook_url  # pylint: disable=pointless-statement
+
+
+def test_fetch_secrets_batches_by_version(monkeypatch):
+    batches = []
+
+    def prefetch(secret_ids, project_id, version="latest"):
+        secret_ids = list(secret_ids)
+        batches.append((secret_ids, project_id, version))
+        return {secret_id: f"{secret_id}:{version}" for secret_id in secret_ids}
+
+    monkeypatch.setattr("cloud_tools.google_secretmanager.prefetch_secrets", prefetch)
+
+    values = fetch_secrets({"a": "sm://one", "b": "sm://two", "c": "sm://one@2"}, "proj")
+
+    assert values == {"a": "one:latest", "b": "two:latest", "c": "one:2"}
+    assert batches == [(["one", "two"], "proj", "latest"), (["one"], "proj", "2")]
+
+
+def test_unavailable_hook_secret_skips_the_notification(monkeypatch):
+    """A failed secret fetch for DISCORD_HOOK_URL is logged by handle_return, not raised."""
+    import notify_routing
+    from app import discord_hook
+
+    def failing_fetch(references, project_id):
+        raise RuntimeError("Secret Manager unavailable")
+
+    monkeypatch.setattr("secret_settings.fetch_secrets", failing_fetch)
+    for key, value in ENV.items():
+        monkeypatch.setenv(key, value)
+    settings = Settings(_env_file=None)
+    sent = []
+
+    async def notify_all(urls, *args, **kwargs):
+        sent.append(urls)
+
+    monkeypatch.setattr(discord_hook, "notify_all", notify_all)
+
+    result = discord_hook.handle_return(lambda: settings.discord_hook_url, "Error boom", "Traceback ...")
+    assert result["status"] == "failed"
+    assert sent == []
+
+    notify_routing.configure("*=https://hooks.invalid/all")
+    try:
+        discord_hook.handle_return(lambda: settings.discord_hook_url, "done")
+    finally:
+        notify_routing.configure("")
+    assert len(sent) == 1
@@ -0,0 +1,86 @@
+# tests/test_serialization.py
+"""
+Unit tests for the pluggable JSON backend.
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+
+import pytest
+
+from app import serialization
+
+ROW = {
+    "id": 7,
+    "name": "grüße 🚀",
+    "score": 1.5,
+    "tags": ["a", "b"],
+    "ts": datetime.datetime(2025, 1, 2, 3, 4, 5, 600000),
+    "day": datetime.date(2025, 1, 2),
+    "amount": decimal.Decimal("12.30"),
+    "ref": uuid.UUID(int=1),
+    "nested": {"ok": True, "none": None},
+}
+EXPECTED = {
+    **ROW,
+    "ts": "2025-01-02T03:04:05.600000",
+    "day": "2025-01-02",
+    "amount": "12.30",
+    "ref": "00000000-0000-0000-0000-000000000001",
+}
+
+
+@pytest.fixture
+def restore_backend():
+    previous = serialization.backend
+    yield
+    serialization.set_backend(previous)
+
+
+@pytest.mark.parametrize("name", serialization.available_backends())
+def test_backends_produce_identical_output(name, restore_backend):
+    serialization.set_backend("json")
+    reference = serialization.dumps(ROW)
+
+    serialization.set_backend(name)
+    encoded = serialization.dumps(ROW)
+
+    assert encoded == reference
+    assert json.loads(encoded) == EXPECTED
+    assert serialization.loads(encoded) == EXPECTED
+    assert serialization.dumps_str(ROW) == encoded.decode("utf-8")
+
+
+def test_output_is_compact_utf8(restore_backend):
+    serialization.set_backend("json")
+    assert serialization.dumps({"a": "ø", "b": [1, 2]}) == '{"a":"ø","b":[1,2]}'.encode("utf-8")
+
+
+def test_unsupported_type_raises(restore_backend):
+    for name in serialization.available_backends():
+        serialization.set_backend(name)
+        with pytest.raises(TypeError):
+            serialization.dumps({"x": object()})
+
+
+def test_auto_prefers_fastest_installed_backend(restore_backend):
+    assert serialization.set_backend("auto") == serialization.available_backends()[0]
+
+
+def test_unknown_backend_raises(restore_backend):
+    with pytest.raises(ValueError, match="Unknown JSON backend"):
+        serialization.set_backend("yaml")
+
+
+def test_missing_backend_raises_when_pinned_and_is_skipped_by_auto(restore_backend, monkeypatch):
+    def missing():
+        raise ImportError("not installed")
+
+    monkeypatch.setitem(serialization._FACTORIES, "orjson", missing)
+    monkeypatch.setitem(serialization._FACTORIES, "msgspec", missing)
+
+    with pytest.raises(ImportError):
+        serialization.set_backend("orjson")
+    assert serialization.set_backend("auto") == "json"
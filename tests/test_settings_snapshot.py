@@ -0,0 +1,91 @@
+# tests/test_settings_snapshot.py
+"""
+Unit tests for the build-time settings snapshot.
+"""
+
+import json
+
+import pytest
+
+from app import settings_snapshot
+from app.settings_model import Settings
+from app.settings_snapshot import FrozenSettings, build_snapshot, load_snapshot, write_snapshot
+
+ENV = {
+    "SERVICE_NAME": "svc",
+    "PROJECT_ID": "proj",
+    "REGION": "europe-west3",
+    "RUNTIME": "python312",
+    "TIMEOUT": "60",
+    "RUNTIME_SERVICE_ACCOUNT_EMAIL": "sa@example.com",
+    "DISCORD_HOOK_URL": "https://discord.invalid/webhook",
+    "WARM_CLIENTS": "bigquery, storage",
+}
+
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    for key in ENV:
+        monkeypatch.setenv(key, ENV[key])
+    path = tmp_path / "settings_snapshot.json"
+    write_snapshot(build_snapshot(Settings(_env_file=None), ENV), path)
+    return path
+
+
+def test_snapshot_round_trips_validated_values(snapshot_path):
+    settings = load_snapshot(snapshot_path, ENV)
+
+    assert isinstance(settings, FrozenSettings)
+    assert settings.model_dump() == Settings(_env_file=None).model_dump(mode="json")
+    assert settings.timeout == 60
+    assert settings.split_list(settings.warm_clients) == ["bigquery", "storage"]
+
+
+def test_snapshot_is_read_only(snapshot_path):
+    settings = load_snapshot(snapshot_path, ENV)
+
+    with pytest.raises(AttributeError):
+        settings.timeout = 1
+    with pytest.raises(AttributeError):
+        del settings.region
+
+
+@pytest.mark.parametrize(
+    "environ",
+    [
+        {**ENV, "TIMEOUT": "61"},
+        {**ENV, "table_cache_ttl": "10"},  # names are case-insensitive, as in Settings
+        {key: value for key, value in ENV.items() if key != "WARM_CLIENTS"},
+    ],
+)
+def test_changed_environment_makes_snapshot_stale(snapshot_path, environ):
+    assert load_snapshot(snapshot_path, environ) is None
+
+
+def test_unrelated_variables_do_not_matter(snapshot_path):
+    assert load_snapshot(snapshot_path, {**ENV, "K_REVISION": "svc-00042"}) is not None
+
+
+def test_changed_model_makes_snapshot_stale(snapshot_path, tmp_path, monkeypatch):
+    model = tmp_path / "settings_model.py"
+    model.write_bytes(settings_snapshot.MODEL_PATH.read_bytes() + b"\n# changed\n")
+    monkeypatch.setattr(settings_snapshot, "MODEL_PATH", model)
+
+    assert load_snapshot(snapshot_path, ENV) is None
+
+
+def test_project_env_in_working_directory_disables_snapshot(snapshot_path, tmp_path):
+    (tmp_path / "project.env").write_text('TIMEOUT="60"', encoding="utf-8")
+
+    assert load_snapshot(snapshot_path, ENV) is None
+
+
+def test_unreadable_or_old_snapshots_are_ignored(snapshot_path, tmp_path):
+    assert load_snapshot(tmp_path / "missing.json", ENV) is None
+
+    snapshot_path.write_text("{not json", encoding="utf-8")
+    assert load_snapshot(snapshot_path, ENV) is None
+
+    snapshot_path.write_text(json.dumps({"version": 0}), encoding="utf-8")
+    assert load_snapshot(snapshot_path, ENV) is None
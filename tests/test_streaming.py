@@ -0,0 +1,116 @@
+# tests/test_streaming.py
+"""
+Unit tests for incremental JSON ingestion.
+"""
+
+import io
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app import streaming
+
+ROWS = [{"id": i, "name": f"row {i}", "nested": {"values": [i, i + 1]}} for i in range(50)]
+
+
+def parse(body: bytes, chunk_size: int = 7, **kwargs) -> list[dict]:
+    return [row for row, _ in streaming.iter_json_rows(io.BytesIO(body), chunk_size, **kwargs)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_ndjson_across_chunk_boundaries(chunk_size):
+    body = "\n".join(json.dumps(row) for row in ROWS).encode() + b"\n\n"
+    assert parse(body, chunk_size) == ROWS
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_json_array_across_chunk_boundaries(chunk_size):
+    body = json.dumps(ROWS, indent=2).encode()
+    assert parse(body, chunk_size) == ROWS
+
+
+def test_sizes_match_source_text():
+    lines = [json.dumps(row) for row in ROWS[:3]]
+    sizes = [size for _, size in streaming.iter_json_rows(io.BytesIO("\n".join(lines).encode()), 5)]
+    assert sizes == [len(line) for line in lines]
+
+
+def test_multibyte_characters_split_across_chunks():
+    rows = [{"text": "æøå 🚀 " * 20}]
+    assert parse(json.dumps(rows, ensure_ascii=False).encode(), chunk_size=3) == rows
+
+
+def test_empty_bodies():
+    assert parse(b"") == []
+    assert parse(b"  \n ") == []
+    assert parse(b"[]") == []
+
+
+@pytest.mark.parametrize(
+    "body, message",
+    [
+        (b'[{"a": 1} {"a": 2}]', "Expected ','"),
+        (b'[{"a": 1},', "Unterminated"),
+        (b'{"a": 1}\n{"a": ', "Malformed"),
+        (b"[1, 2]", "JSON objects"),
+        (b'[{"a": 1}] {"b": 2}', "after the JSON array"),
+    ],
+)
+def test_malformed_bodies_raise(body, message):
+    with pytest.raises(ValueError, match=message):
+        parse(body)
+
+
+def test_oversized_row_raises_without_buffering_the_stream():
+    body = b'{"a": "' + b"x" * 10_000 + b'"}'
+    with pytest.raises(ValueError, match="exceeds"):
+        parse(body, chunk_size=256, max_row_bytes=1_000)
+
+
+def test_rows_are_yielded_before_the_stream_is_exhausted():
+    class Source(io.RawIOBase):
+        def __init__(self):
+            self.reads = 0
+
+        def readable(self):
+            return True
+
+        def read(self, size=-1):
+            self.reads += 1
+            return b'{"id": 1}\n' if self.reads < 1000 else b""
+
+    source = Source()
+    rows = streaming.iter_json_rows(source, chunk_size=10)
+    assert next(rows) == ({"id": 1}, 9)
+    assert source.reads < 5
+
+
+def test_wants_streaming():
+    assert streaming.wants_streaming("application/x-ndjson", {})
+    assert streaming.wants_streaming("application/json", {"stream": "1"})
+    assert not streaming.wants_streaming("application/json", {})
+    assert not streaming.wants_streaming("text/plain", {"stream": "1"})
+
+
+def test_ingest_counts_rows_and_inserts_them():
+    client = MagicMock()
+    client.insert_rows_json.return_value = []
+    body = "\n".join(json.dumps(row) for row in ROWS).encode()
+
+    with patch("cloud_tools.google_bigquerymanager.peek_client", return_value=client):
+        result = streaming.ingest(io.BytesIO(body), "p.d.t", batch_size=20, max_batch_bytes=10_000, max_in_flight=2)
+
+    assert result.rows == len(ROWS)
+    assert result.bytes == len(body) - (len(ROWS) - 1)
+    assert result.errors is None
+    assert sum(len(call[0][1]) for call in client.insert_rows_json.call_args_list) == len(ROWS)
+
+
+def test_ingest_surfaces_parse_errors():
+    client = MagicMock()
+    client.insert_rows_json.return_value = []
+
+    with patch("cloud_tools.google_bigquerymanager.peek_client", return_value=client):
+        with pytest.raises(ValueError, match="Malformed"):
+            streaming.ingest(io.BytesIO(b'{"id": 1}\n{"id": '), "p.d.t", 20, 10_000, 2)
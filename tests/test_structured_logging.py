@@ -0,0 +1,134 @@
+# tests/test_structured_logging.py
+"""
+Unit tests for the batched Cloud Logging JSON sink.
+"""
+
+import io
+import json
+
+import pytest
+from loguru import logger as log
+
+from app import structured_logging
+from app.structured_logging import SAMPLED_KEY, SOURCE_KEY, SPAN_KEY, TRACE_KEY, BatchedJsonSink, trace_fields
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+@pytest.fixture
+def sink():
+    stream = CountingStream()
+    sink = BatchedJsonSink(stream=stream, batch_size=100, flush_interval=60)
+    handler_id = log.add(sink, level="INFO", format="{message}")
+    yield sink
+    log.remove(handler_id)
+
+
+def entries(sink):
+    return [json.loads(line) for line in sink.stream.getvalue().splitlines()]
+
+
+def test_records_become_cloud_logging_entries(sink):
+    log.bind(table="p.d.t").warning("{} rows failed", 3)
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        log.exception("Insert failed")
+    assert sink.drain()
+
+    warning, error = entries(sink)
+    assert warning["severity"] == "WARNING"
+    assert warning["message"] == "3 rows failed"
+    assert warning["table"] == "p.d.t"
+    assert warning[SOURCE_KEY]["function"].endswith("test_records_become_cloud_logging_entries")
+    assert error["severity"] == "ERROR"
+    assert error["message"].startswith("Insert failed\nTraceback")
+    assert "ValueError: boom" in error["message"]
+
+
+def test_entries_are_written_in_batches(sink):
+    for i in range(10):
+        log.info("entry {}", i)
+    assert sink.drain()
+
+    assert [entry["message"] for entry in entries(sink)] == [f"entry {i}" for i in range(10)]
+    assert sink.stream.writes == 1
+
+
+def test_disabled_levels_are_not_queued(sink):
+    log.debug("hidden {}", 1)
+    assert sink.drain()
+
+    assert sink.stream.getvalue() == ""
+
+
+def test_full_queue_drops_records():
+    sink = BatchedJsonSink(stream=io.StringIO(), max_queue=0)
+    handler_id = log.add(sink, level="INFO", format="{message}")
+    before = structured_logging.LOG_RECORDS_DROPPED.value()
+    try:
+        log.info("dropped")
+    finally:
+        log.remove(handler_id)
+
+    assert structured_logging.LOG_RECORDS_DROPPED.value() == before + 1
+    assert sink.stream.getvalue() == ""
+
+
+def test_trace_fields_from_cloud_trace_header():
+    fields = trace_fields({"X-Cloud-Trace-Context": "105445aa7843bc8bf206b12000100000/1;o=1"}, "proj")
+
+    assert fields == {
+        TRACE_KEY: "projects/proj/traces/105445aa7843bc8bf206b12000100000",
+        SPAN_KEY: "0000000000000001",
+        SAMPLED_KEY: True,
+    }
+
+
+def test_trace_fields_from_traceparent():
+    header = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-00"
+    fields = trace_fields({"traceparent": header, "X-Cloud-Trace-Context": "other/1"}, "proj")
+
+    assert fields[TRACE_KEY] == "projects/proj/traces/4bf92f3577b34da6a3ce929d0e0e4736"
+    assert fields[SPAN_KEY] == "00f067aa0ba902b7"
+    assert fields[SAMPLED_KEY] is False
+    assert trace_fields({"traceparent": "garbage"}, "proj") == {}
+    assert trace_fields({}, "proj") == {}
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-zz"},
+        {"traceparent": "00-4bf92f3577b34da6a3ce929d0e0e4736-span-01"},
+        {"traceparent": "00-not-hex-at-all-but-thirty-two-chars-00f067aa0ba902b7-01"},
+        {"X-Cloud-Trace-Context": "105445aa7843bc8bf206b12000100000/span;o=1"},
+        {"X-Cloud-Trace-Context": "105445aa7843bc8bf206b12000100000/99999999999999999999;o=1"},
+        {"X-Cloud-Trace-Context": "not a trace"},
+    ],
+)
+def test_malformed_trace_headers_are_ignored(headers):
+    assert trace_fields(headers, "proj") == {}
+    with structured_logging.request_context(headers):
+        pass
+
+
+def test_request_context_correlates_records(sink, monkeypatch):
+    monkeypatch.setattr(structured_logging, "_project_id", "proj")
+
+    with structured_logging.request_context({"X-Cloud-Trace-Context": "abc/2;o=1"}):
+        log.info("inside")
+    log.info("outside")
+    assert sink.drain()
+
+    inside, outside = entries(sink)
+    assert inside[TRACE_KEY] == "projects/proj/traces/abc"
+    assert TRACE_KEY not in outside
@@ -0,0 +1,75 @@
+# tests/test_timing.py
+"""
+Unit tests for the per-request timing spans.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from app import timing
+
+
+@pytest.fixture
+def timer():
+    """An active request timer, closed after the test."""
+    active = timing.start_request()
+    yield active
+    timing.end_request(emit=False)
+
+
+def test_span_records_duration(timer):
+    """A span adds one measurement with a plausible duration."""
+    with timing.span("work"):
+        time.sleep(0.01)
+
+    stats = timer.breakdown()["spans"]["work"]
+    assert stats["count"] == 1
+    assert stats["total_ms"] >= 10
+    assert stats["errors"] == 0
+
+
+def test_span_counts_errors_and_reraises(timer):
+    """Exceptions propagate and are counted on the span."""
+    with pytest.raises(ValueError):
+        with timing.span("broken"):
+            raise ValueError("nope")
+
+    assert timer.breakdown()["spans"]["broken"]["errors"] == 1
+
+
+def test_timed_aggregates_sync_and_async_calls(timer):
+    """The decorator works for both function kinds and aggregates by name."""
+
+    @timing.timed("calls")
+    def sync_call():
+        return 1
+
+    @timing.timed("calls")
+    async def async_call():
+        await asyncio.sleep(0)
+        return 2
+
+    assert sync_call() == 1
+    assert asyncio.run(async_call()) == 2
+    assert timer.breakdown()["spans"]["calls"]["count"] == 2
+
+
+def test_no_active_request_is_a_noop():
+    """Spans outside a request record nothing and end_request returns an empty dict."""
+    assert timing.current_timer() is None
+    with timing.span("ignored"):
+        pass
+    assert timing.end_request() == {}
+
+
+def test_end_request_clears_timer(timer):
+    """end_request returns the breakdown and deactivates the timer."""
+    with timing.span("work"):
+        pass
+    breakdown = timing.end_request(emit=False)
+
+    assert "work" in breakdown["spans"]
+    assert breakdown["total_ms"] >= 0
+    assert timing.current_timer() is None